@@ -0,0 +1,285 @@
+"""benchmark.py - times every measure across list sizes, fractions of tied
+values and backends, and the same measure in scipy.stats where there is one.
+The timings are written as JSON, and two JSON files of timings can be compared
+to catch regressions (ex. before upgrading, or in review).
+
+Usage
+-----
+python benchmarks/benchmark.py --output baseline.json
+python benchmarks/benchmark.py --sizes 10 1000 --ties 0 0.5 --output new.json
+python benchmarks/benchmark.py --compare baseline.json new.json --threshold 0.25
+python benchmarks/benchmark.py --import-budget 0.05
+python benchmarks/benchmark.py --resampling-budget 15
+python benchmarks/benchmark.py --rolling
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+import rankingscompare as rc
+
+try:
+    import scipy
+    import scipy.stats
+except ImportError:
+    scipy = None
+
+
+SIZES = [10, 100, 1000, 10000, 100000, 1000000]
+TIES = [0, 0.1, 0.5, 0.9]
+MAX_PAIRWISE = 1000  # -- the O(n^2) backends take minutes past this
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def generate_case(n, ties, random):
+    """Two paired lists of n values where about [ties] of the values are tied,
+    and the items (0, ..., n - 1) of each list in rank order.
+    """
+    if ties == 0:
+        l1, l2 = random.permutation(n), random.permutation(n)
+    else:
+        distinct = max([1, int(round(n * (1 - ties)))])
+        l1, l2 = random.randint(distinct, size = n), \
+            random.randint(distinct, size = n)
+    return {'l1': l1, 'l2': l2, 'items1': np.argsort(-l1, kind = 'mergesort'),
+            'items2': np.argsort(-l2, kind = 'mergesort')}
+
+
+def with_backend(func, backend):
+    """func(l1, l2, backend = backend) as a function of a case.
+    """
+    return lambda case: func(case['l1'], case['l2'], backend = backend)
+
+
+def measures():
+    """(function name, backend, function of a case, largest n) for everything
+    that is timed.
+    """
+    timed = [
+        ('to_rank', 'numpy', lambda case: rc.to_rank(case['l1']), None),
+        ('spearman_rho', 'numpy',
+         lambda case: rc.spearman_rho(case['l1'], case['l2']), None),
+        ('spearman_footrule', 'numpy',
+         lambda case: rc.spearman_footrule(case['l1'], case['l2']), None),
+        ('top_down_correlation', 'numpy',
+         lambda case: rc.top_down_correlation(case['l1'], case['l2']), None),
+        ('average_overlap', 'python',
+         lambda case: rc.average_overlap(list(case['items1']),
+                                         list(case['items2']),
+                                         backend = 'python'), None),
+        ('average_overlap', 'numpy',
+         lambda case: rc.average_overlap(case['items1'], case['items2'],
+                                         backend = 'numpy'), None),
+        ('percent_overlap', 'python',
+         lambda case: rc.percent_overlap(list(case['items1']),
+                                         list(case['items2'])), None),
+        ('percent_overlap', 'numpy',
+         lambda case: rc.percent_overlap(case['items1'], case['items2']),
+         None),
+        ('rbo', 'auto', lambda case: rc.rbo(case['items1'], case['items2']),
+         None),
+        ('weighted_tau', 'knight',
+         lambda case: rc.weighted_tau(case['l1'], case['l2']), None)]
+    for name in ['tau_a', 'tau_b', 'tau_c', 'gamma', 'sommers_d',
+                 'ap_correlation']:
+        for backend in ['auto', 'knight', 'pairwise']:
+            timed.append((name, backend,
+                          with_backend(getattr(rc, name), backend),
+                          MAX_PAIRWISE if backend == 'pairwise' else None))
+    if scipy is not None:
+        timed += [
+            ('to_rank', 'scipy',
+             lambda case: scipy.stats.rankdata(case['l1']), None),
+            ('tau_b', 'scipy',
+             lambda case: scipy.stats.kendalltau(case['l1'], case['l2']),
+             None),
+            ('spearman_rho', 'scipy',
+             lambda case: scipy.stats.spearmanr(case['l1'], case['l2']), None),
+            ('weighted_tau', 'scipy',
+             lambda case: scipy.stats.weightedtau(case['l1'], case['l2']),
+             None)]
+    return timed
+
+
+def time_call(func, case, repeat = 3, min_time = 0.2):
+    """The fastest time of one call of func(case), in seconds, out of [repeat]
+    runs of enough calls to take at least [min_time] seconds.
+    """
+    timer = timeit.Timer(lambda: func(case))
+    number, elapsed = 1, timer.timeit(1)
+    if elapsed < min_time:
+        number = int(min_time / max([elapsed, 1e-9])) + 1
+    return min(timer.repeat(repeat, number)) / number
+
+
+def run(sizes = SIZES, ties = TIES, names = None, seed = 0, verbose = True):
+    """Time every measure (or just [names]) for every size and fraction of ties.
+
+    Returns
+    -------
+    dict of the environment, and a list of results, each a dict of the
+    function, backend, n, ties and seconds per call
+    """
+    random, results = np.random.RandomState(seed), []
+    for n in sizes:
+        for tie_fraction in ties:
+            case = generate_case(n, tie_fraction, random)
+            for name, backend, func, max_n in measures():
+                if (names and name not in names) or \
+                        (max_n is not None and n > max_n):
+                    continue
+                with np.errstate(all = 'ignore'):
+                    seconds = time_call(func, case)
+                results.append({'function': name, 'backend': backend,
+                                'n': n, 'ties': tie_fraction,
+                                'seconds': seconds})
+                if verbose:
+                    print('{0:>22} {1:>8} n={2:<8} ties={3:<4} {4:.3g}s'.format(
+                        name, backend, n, tie_fraction, seconds))
+    return {'python': platform.python_version(), 'numpy': np.__version__,
+            'scipy': scipy.__version__ if scipy is not None else None,
+            'platform': platform.platform(), 'results': results}
+
+
+def import_time(module = 'rankingscompare', repeat = 5):
+    """The fastest time to import [module] in a new interpreter, in seconds,
+    out of [repeat] cold starts. Only the import is timed (w/ python -X
+    importtime), not the start of the interpreter.
+    """
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+            cwd = ROOT, stderr = subprocess.PIPE, check = True,
+            universal_newlines = True).stderr
+        for line in output.splitlines():
+            fields = [field.strip() for field in line.split('|')]
+            if len(fields) == 3 and fields[2] == module:
+                times.append(int(fields[1]) / 1e6)
+    return min(times)
+
+
+def resampling_time(n = 10000, n_resamples = 10000, seed = 0):
+    """The time of a permutation test of tau_b w/ [n_resamples] shuffles of two
+    lists of n values w/o ties, in seconds.
+    """
+    random = np.random.RandomState(seed)
+    l1, l2 = random.permutation(n), random.permutation(n)
+    timer = timeit.Timer(lambda: rc.permutation_test(
+        'tau_b', l1, l2, n_resamples, seed = seed))
+    return timer.timeit(1)
+
+
+def rolling_times(n = 100000, window = 1000, sample = 1000, seed = 0):
+    """The times of rolling_tau_stats and of tau_stats on each window on its
+    own, of n values w/o ties, in seconds. tau_stats is timed on [sample]
+    evenly spaced windows, and scaled up to all of them.
+    """
+    random = np.random.RandomState(seed)
+    x, y = random.rand(n), random.rand(n)
+    rolling = timeit.Timer(
+        lambda: rc.rolling_tau_stats(x, y, window)).timeit(1)
+    starts = np.linspace(0, n - window, sample).astype(int)
+    each = timeit.Timer(lambda: [
+        rc.tau_stats(x[start:start + window], y[start:start + window])
+        for start in starts]).timeit(1)
+    return rolling, each * (n - window + 1) / sample
+
+
+def compare(baseline, current, threshold = 0.2):
+    """Compare two runs, matching up their results by function, backend, n and
+    ties. A result is a regression if it takes more than (1 + threshold) times
+    as long as in the baseline.
+
+    Returns
+    -------
+    list of (key, baseline seconds, current seconds, ratio) for the
+    regressions, the slowest relative to the baseline first
+    """
+    key = lambda result: (result['function'], result['backend'],
+                          result['n'], result['ties'])
+    before = dict((key(result), result['seconds'])
+                  for result in baseline['results'])
+    regressions = []
+    for result in current['results']:
+        if key(result) in before:
+            ratio = result['seconds'] / before[key(result)]
+            if ratio > 1 + threshold:
+                regressions.append((key(result), before[key(result)],
+                                    result['seconds'], ratio))
+    return sorted(regressions, key = lambda regression: -regression[-1])
+
+
+def main(args = None):
+    parser = argparse.ArgumentParser(
+        description = 'Time the measures, or compare two sets of timings.')
+    parser.add_argument('--sizes', type = int, nargs = '+', default = SIZES)
+    parser.add_argument('--ties', type = float, nargs = '+', default = TIES)
+    parser.add_argument('--functions', nargs = '+', default = None,
+                        help = 'only time these functions')
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--output', help = 'write the timings to this file')
+    parser.add_argument('--compare', nargs = 2,
+                        metavar = ('BASELINE', 'CURRENT'),
+                        help = 'compare two files of timings instead')
+    parser.add_argument('--threshold', type = float, default = 0.2,
+                        help = 'slowdown (0.2 = 20%%) that is a regression')
+    parser.add_argument('--import-budget', type = float, default = None,
+                        metavar = 'SECONDS',
+                        help = 'time importing the package instead, and fail '
+                        'if it takes longer than this')
+    parser.add_argument('--resampling-budget', type = float, default = None,
+                        metavar = 'SECONDS',
+                        help = 'time a permutation test of tau_b w/ 10,000 '
+                        'shuffles of 10,000 values instead, and fail if it '
+                        'takes longer than this')
+    parser.add_argument('--rolling', action = 'store_true',
+                        help = 'time rolling_tau_stats over 100,000 values '
+                        'w/ a window of 1,000 instead, and fail if it is not '
+                        'faster than tau_stats on each window')
+    args = parser.parse_args(args)
+    if args.rolling:
+        rolling, each = rolling_times()
+        print('rolling_tau_stats n=100000 window=1000: {0:.3g}s (tau_stats '
+              'per window {1:.3g}s)'.format(rolling, each))
+        return 1 if rolling >= each else 0
+    if args.resampling_budget is not None:
+        seconds = resampling_time()
+        print('permutation_test n=10000 x 10000: {0:.3g}s (budget '
+              '{1:.3g}s)'.format(seconds, args.resampling_budget))
+        return 1 if seconds > args.resampling_budget else 0
+    if args.import_budget is not None:
+        seconds = import_time()
+        print('import rankingscompare: {0:.3g}s (budget {1:.3g}s)'.format(
+            seconds, args.import_budget))
+        return 1 if seconds > args.import_budget else 0
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        for (name, backend, n, ties), before, after, ratio in regressions:
+            print('{0:>22} {1:>8} n={2:<8} ties={3:<4} {4:.3g}s -> {5:.3g}s '
+                  '({6:.2f}x)'.format(name, backend, n, ties, before, after,
+                                      ratio))
+        print('{0} regression(s) past {1:.0%}'.format(len(regressions),
+                                                       args.threshold))
+        return 1 if regressions else 0
+    timings = run(args.sizes, args.ties, args.functions, args.seed)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(timings, f, indent = 2, sort_keys = True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
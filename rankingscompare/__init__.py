@@ -1,23 +1,95 @@
-from rbo import (
-    average_overlap,
-    percent_overlap
-)
-from spearman import (
-    spearman_footrule,
-    spearman_rho,
-    top_down_correlation
-)
-from tau import (
-    ap_correlation,
-    gamma,
-    sommers_d,
-    tau_a,
-    tau_b,
-    tau_c
-)
-from utilities import (
-    conjoint,
-    ties,
-    to_rank,
-    unique
-)
+"""rankingscompare - rank correlation and similarity statistics.
+
+The public names are loaded lazily: importing the package only imports the
+submodule (and numpy) that a name comes from the first time the name is used,
+so that short-lived processes that import it start quickly.
+"""
+
+import importlib
+
+# -- public name -> the submodule it's defined in. The submodules of functions
+# of the same name are private (ex. _rbo.py for rbo), since importing a
+# submodule binds it to the package, which would replace the function
+_EXPORTS = {
+    'choose_backend': 'backends',
+    'get_thresholds': 'backends',
+    'load_thresholds': 'backends',
+    'set_thresholds': 'backends',
+    'ragged_gamma': 'batch',
+    'ragged_sommers_d': 'batch',
+    'ragged_spearman_footrule': 'batch',
+    'ragged_spearman_rho': 'batch',
+    'ragged_tau_b': 'batch',
+    'ragged_tau_stats': 'batch',
+    'calibrate': '_calibrate',
+    'compare_all': 'compare',
+    'Vocabulary': 'encoding',
+    'external_tau_stats': 'external',
+    'instrument': 'instrumentation',
+    'count_lower_left': 'knights_algo',
+    'count_swaps': 'knights_algo',
+    'knights_algorithm': 'knights_algo',
+    'ranked_above_in_both': 'knights_algo',
+    'weighted_swaps': 'knights_algo',
+    'compare_to_reference': '_pairwise',
+    'pairwise': '_pairwise',
+    'evaluate': 'pipeline',
+    'run_pipeline': 'pipeline',
+    'RankedList': 'rankedlist',
+    'average_overlap': '_rbo',
+    'overlap_at_depth': '_rbo',
+    'percent_overlap': '_rbo',
+    'rbo': '_rbo',
+    'bootstrap_ci': 'resampling',
+    'permutation_test': 'resampling',
+    'rolling_spearman_rho': 'rolling',
+    'rolling_tau_b': 'rolling',
+    'rolling_tau_stats': 'rolling',
+    'spearman_footrule': 'spearman',
+    'spearman_rho': 'spearman',
+    'top_down_correlation': 'spearman',
+    'open_store': 'store',
+    'score_stores': 'store',
+    'ap_correlation': 'tau',
+    'ap_correlation_ties': 'tau',
+    'gamma': 'tau',
+    'gamma_from_table': 'tau',
+    'sommers_d': 'tau',
+    'sommers_d_from_table': 'tau',
+    'tau_a': 'tau',
+    'tau_b': 'tau',
+    'tau_b_from_table': 'tau',
+    'tau_c': 'tau',
+    'tau_c_from_table': 'tau',
+    'tau_stats': 'tau',
+    'tau_stats_from_table': 'tau',
+    'weighted_tau': 'tau',
+    'batch_footrule_topk': 'topk',
+    'batch_kendall_topk': 'topk',
+    'footrule_topk': 'topk',
+    'kendall_topk': 'topk',
+    'conjoint': 'utilities',
+    'ties': 'utilities',
+    'to_rank': 'utilities',
+    'to_savage_scores': 'utilities',
+    'unique': 'utilities',
+}
+_SUBMODULES = set(_EXPORTS.values())
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        if name in _SUBMODULES:
+            return importlib.import_module('.' + name, __name__)
+        raise AttributeError('module {0!r} has no attribute {1!r}'.format(
+            __name__, name))
+    value = getattr(importlib.import_module('.' + _EXPORTS[name], __name__),
+                    name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
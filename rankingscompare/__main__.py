@@ -0,0 +1,69 @@
+"""__main__.py - the rankingscompare command:
+
+    rankingscompare evaluate pairs.jsonl results.jsonl --measures rbo tau_b
+    rankingscompare calibrate --output thresholds.json
+
+(or python -m rankingscompare ...)
+"""
+
+import argparse
+import sys
+
+
+def main(args = None):
+    parser = argparse.ArgumentParser(prog = 'rankingscompare')
+    commands = parser.add_subparsers(dest = 'command')
+    commands.required = True
+    evaluate = commands.add_parser(
+        'evaluate', help = 'compare every pair of ranked lists in a JSONL or '
+        'CSV file')
+    evaluate.add_argument('input', help = 'JSONL or CSV file, - for stdin')
+    evaluate.add_argument('output', nargs = '?', default = '-',
+                          help = 'JSONL or CSV file (default is stdout)')
+    evaluate.add_argument('--measures', nargs = '+',
+                          default = ['average_overlap', 'rbo'])
+    evaluate.add_argument('--input-format', choices = ['jsonl', 'csv'])
+    evaluate.add_argument('--output-format', choices = ['jsonl', 'csv'])
+    evaluate.add_argument('--list1', default = 'list1',
+                          help = 'field of the first list (default is list1)')
+    evaluate.add_argument('--list2', default = 'list2',
+                          help = 'field of the second list (default is list2)')
+    evaluate.add_argument('--separator', default = ' ',
+                          help = 'separator of the items in a CSV cell '
+                          '(default is a space)')
+    evaluate.add_argument('--p', type = float, default = 0.9,
+                          help = 'persistence of rbo (default is 0.9)')
+    evaluate.add_argument('--batch-size', type = int, default = 1000)
+    evaluate.add_argument('--processes', type = int, default = 1,
+                          help = 'worker processes, 0 for one per CPU '
+                          '(default is 1)')
+    evaluate.add_argument('--max-in-flight', type = int, default = None,
+                          help = 'most batches in the pool at once (default '
+                          'is twice the number of processes)')
+    commands.add_parser(
+        'calibrate', help = 'measure and save the backend crossover lengths',
+        add_help = False)
+    # -- the calibrate arguments are parsed by _calibrate.main
+    args, rest = parser.parse_known_args(args)
+    if args.command == 'calibrate':
+        from ._calibrate import main as calibrate_main
+        return calibrate_main(rest)
+    if rest:
+        parser.error('unrecognized arguments: {0}'.format(' '.join(rest)))
+    from .pipeline import MEASURES, run_pipeline
+    for measure in args.measures:
+        if measure not in MEASURES:
+            parser.error('unknown measure {0}, choose from {1}'.format(
+                measure, ', '.join(MEASURES)))
+    run_pipeline(args.input, args.output, args.measures,
+                 input_format = args.input_format,
+                 output_format = args.output_format, list1 = args.list1,
+                 list2 = args.list2, separator = args.separator, p = args.p,
+                 batch_size = args.batch_size,
+                 processes = args.processes or None,
+                 max_in_flight = args.max_in_flight)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""_calibrate.py - measures where the fast backend of each measure overtakes the
+simple one on this machine, and saves those crossover lengths for backends.py.
+
+Usage
+-----
+rankingscompare calibrate [--output thresholds.json]
+(or python -m rankingscompare calibrate ...)
+"""
+
+import argparse
+import timeit
+import numpy as np
+from .backends import (BACKENDS, DEFAULT_THRESHOLDS, get_thresholds,
+                       save_thresholds, set_thresholds, thresholds_path)
+from .batch import ragged_spearman_rho, ragged_tau_stats
+from ._rbo import overlap_at_depth
+from .tau import ap_correlation, tau_stats
+
+SIZES = [2, 3, 4, 6, 8, 12, 16, 24, 32, 48, 64, 96, 128, 192, 256]
+BATCH_ROWS = 1000  # -- pairs per batch, for the ragged measures (see batch.py)
+
+
+def calibration_cases(measure, n, kind, random):
+    """Pairs of inputs of length n to time [measure] on: w/o ties and w/ about
+    half of the values tied for the rank correlations (batches of BATCH_ROWS
+    pairs for the ragged measures), and integer codes that half overlap for
+    overlap_at_depth. kind is list or array.
+    """
+    if measure.startswith('ragged'):
+        return [(random.rand(BATCH_ROWS, n), random.rand(BATCH_ROWS, n)),
+                (random.randint(n // 2 + 1, size = (BATCH_ROWS, n)),
+                 random.randint(n // 2 + 1, size = (BATCH_ROWS, n)))]
+    if measure == 'overlap_at_depth':
+        cases = [(random.permutation(2 * n)[:n], random.permutation(2 * n)[:n])]
+    else:
+        cases = [(random.permutation(n), random.permutation(n)),
+                 (random.randint(n // 2 + 1, size = n),
+                  random.randint(n // 2 + 1, size = n))]
+    if kind == 'list':
+        cases = [(l1.tolist(), l2.tolist()) for l1, l2 in cases]
+    return cases
+
+
+def time_backend(measure, backend, case, number):
+    """The fastest time of [number] calls of measure w/ [backend] on a case.
+    """
+    func = {'tau_stats': tau_stats, 'ap_correlation': ap_correlation,
+            'overlap_at_depth': overlap_at_depth, 'ragged_tau_stats':
+            ragged_tau_stats, 'ragged_ranks': ragged_spearman_rho}[measure]
+    l1, l2 = case
+    timer = timeit.Timer(lambda: func(l1, l2, backend = backend))
+    return min(timer.repeat(3, number)) / number
+
+
+def crossover(measure, kind, sizes = SIZES, seed = 0, number = 20):
+    """The shortest length in sizes at which the fast backend of [measure] is
+    at least as fast as the simple one on every case (see calibration_cases),
+    and also at the next size, or twice the largest size if there isn't one.
+    The sizes are timed in increasing order until the crossover is found, so
+    the O(n^2) backends aren't timed on long inputs.
+    """
+    simple, fast = BACKENDS[measure]
+    random = np.random.RandomState(seed)
+    candidate = None
+    for n in sorted(sizes):
+        cases = calibration_cases(measure, n, kind, random)
+        if all(time_backend(measure, fast, case, number) <=
+               time_backend(measure, simple, case, number) for case in cases):
+            if candidate is not None:
+                return candidate
+            candidate = n
+        else:
+            candidate = None
+    return candidate if candidate is not None else 2 * sorted(sizes)[-1]
+
+
+def calibrate(sizes = SIZES, path = None, save = True, seed = 0,
+              verbose = False):
+    """Measure the crossover length of every measure and type of input (see
+    backends.DEFAULT_THRESHOLDS), and use them from now on.
+
+    Parameters
+    ----------
+    sizes : list of ints (default is SIZES)
+        the lengths to time the backends at
+    path : str (default is None)
+        file to save the thresholds to, by default backends.thresholds_path()
+    save : bool (default is True)
+        whether to save the thresholds, to use them in later sessions too
+    seed : int (default is 0)
+        seed of the random inputs
+    verbose : bool (default is False)
+        print each crossover as it is measured
+
+    Returns
+    -------
+    dict of measure -> input type -> crossover length
+    """
+    thresholds = {}
+    for measure in sorted(DEFAULT_THRESHOLDS):
+        thresholds[measure] = {}
+        for kind in sorted(DEFAULT_THRESHOLDS[measure]):
+            thresholds[measure][kind] = crossover(measure, kind, sizes, seed)
+            if verbose:
+                print('{0:>18} {1:>6} {2}'.format(
+                    measure, kind, thresholds[measure][kind]))
+    set_thresholds(thresholds)
+    if save:
+        save_thresholds(thresholds, path)
+    return get_thresholds()
+
+
+def main(args = None):
+    parser = argparse.ArgumentParser(
+        prog = 'rankingscompare calibrate',
+        description = 'Measure and save the backend crossover lengths.')
+    parser.add_argument('--output', default = None,
+                        help = 'file to save the thresholds to (default is '
+                        '{0})'.format(thresholds_path()))
+    parser.add_argument('--seed', type = int, default = 0)
+    args = parser.parse_args(args)
+    calibrate(path = args.output, seed = args.seed, verbose = True)
+    print('saved to {0}'.format(args.output or thresholds_path()))
+    return 0
+
+
+if __name__ == '__main__':
+    main()
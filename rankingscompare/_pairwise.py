@@ -0,0 +1,241 @@
+"""_pairwise.py - correlation matrices between every pair of many rankings, and
+correlations between one reference ranking and many candidate rankings.
+"""
+
+import itertools
+import multiprocessing
+import numpy as np
+from .batch import TENSOR_BYTES
+from .instrumentation import instrumented
+from .knights_algo import (count_lower_left, count_swaps,
+                           ranked_above_in_both, row_ties)
+from .rankedlist import RankedList, ranked
+from .tau import ap_from_counts, tau_b, tau_b_from_stats
+from .utilities import *
+
+
+_rankings = None  # -- the ranked rows, in each worker process
+
+
+def _set_rankings(rankings):
+    """Share the ranked rows with pairwise_tile (the pool initializer).
+    """
+    global _rankings
+    _rankings = rankings
+
+
+def pairwise_tile(tile):
+    """Compute [method] for every pair of rows (i, j), where i <= j, i is in the
+    first range of rows and j is in the second range. Returns the tile, and the
+    values for (i, j) and (j, i), both indexed by [i, j].
+    """
+    method, (start_i, stop_i), (start_j, stop_j) = tile
+    values = np.full((stop_i - start_i, stop_j - start_j), np.nan)
+    transposed = values.copy()
+    for i, j in itertools.product(range(start_i, stop_i),
+                                  range(start_j, stop_j)):
+        if i > j:
+            continue
+        ranks_i, ranks_j = _rankings[i], _rankings[j]
+        if method == 'tau_b':
+            value = transposed_value = tau_b(ranks_i, ranks_j)
+        else:
+            above = ranked_above_in_both(ranks_i, ranks_j)
+            value = ap_from_counts(above, ranks_i.ranks)
+            transposed_value = ap_from_counts(above, ranks_j.ranks)
+        values[i - start_i, j - start_j] = value
+        transposed[i - start_i, j - start_j] = transposed_value
+    return tile, values, transposed
+
+
+@instrumented
+def pairwise(rankings, method = 'spearman_rho', reverse = True, ranks = False,
+             processes = 1, tile_size = 64):
+    """Compute a rank correlation (or distance) between every pair of rows of an
+    (m x n) array, returning an (m x m) matrix where entry [i, j] is the value
+    of [method] for rows i and j, in that order.
+
+    Each row is ranked once (and, for tau_b and AP correlation, its tie groups
+    are found once, see rankedlist.RankedList). Spearman's rho is then a single
+    matrix product of the centered ranks, and the footrule is computed in tiles
+    of rows at a time. Kendall's tau-b and AP correlation are computed for every
+    pair of rows with the O(n log n) Knight's algorithm, in square tiles of row
+    pairs that are spread across a pool of processes.
+
+    Parameters
+    ----------
+    rankings : 2-D list or array
+        m lists of n values, one per row
+    method : str (default is spearman_rho)
+        spearman_rho -> Spearman's rho, see spearman.spearman_rho
+        spearman_footrule -> raw Spearman's footrule, see spearman_footrule
+        tau_b -> Kendall's tau-b, see tau.tau_b
+        ap_correlation -> AP correlation of row i compared to row j as the
+            definitive list, see tau.ap_correlation
+    reverse : bool (default is True)
+        whether to rank values in descending order (True) or ascending order
+    ranks : bool (default is False)
+        Are the rows values, or ranks? False indicates that these are values,
+        True indicates that the rows contain ranks.
+    processes : int (default is 1)
+        number of worker processes to use for tau_b and ap_correlation, None to
+        use one per CPU
+    tile_size : int (default is 64)
+        number of rows in each tile
+
+    Returns
+    -------
+    (m x m) array of floats (ints for spearman_footrule)
+    """
+    assert method in ['spearman_rho', 'spearman_footrule', 'tau_b',
+                      'ap_correlation'], 'incorrect method'
+    rankings = np.asarray(rankings)
+    assert rankings.ndim == 2, 'rankings must be a 2-D array'
+    if not ranks:
+        rankings = to_rank(rankings, reverse = reverse)
+    m = len(rankings)
+    tiles = list(itertools.combinations_with_replacement(
+        [(start, min([start + tile_size, m]))
+         for start in range(0, m, tile_size)], 2))
+    if method == 'spearman_rho':
+        centered = rankings - rankings.mean(axis = 1, keepdims = True)
+        norms = np.sqrt(np.square(centered).sum(axis = 1))
+        return centered.dot(centered.T) / np.outer(norms, norms)
+    if method == 'spearman_footrule':
+        footrules = np.empty((m, m), dtype = np.int64)
+        # -- the differences of a tile are (tile x tile x n), so they're
+        # summed a chunk of columns at a time, w/ at most about TENSOR_BYTES
+        # in each chunk
+        width = max([1, TENSOR_BYTES // (8 * tile_size ** 2)])
+        for (start_i, stop_i), (start_j, stop_j) in tiles:
+            total = 0
+            for start in range(0, rankings.shape[1], width):
+                total = total + np.absolute(
+                    rankings[start_i:stop_i, None, start:start + width] -
+                    rankings[None, start_j:stop_j, start:start + width]
+                ).sum(-1)
+            footrules[start_i:stop_i, start_j:stop_j] = total
+            footrules[start_j:stop_j, start_i:stop_i] = \
+                footrules[start_i:stop_i, start_j:stop_j].T
+        return footrules
+    result = np.empty((m, m))
+    tiles = [(method, rows_i, rows_j) for rows_i, rows_j in tiles]
+    rankings = [RankedList(row, reverse = False) for row in rankings]
+    if processes == 1:
+        _set_rankings(rankings)
+        results = map(pairwise_tile, tiles)
+    else:
+        pool = multiprocessing.Pool(processes, _set_rankings, (rankings,))
+        results = pool.imap_unordered(pairwise_tile, tiles)
+    try:
+        for (_, (start_i, stop_i), (start_j, stop_j)), values, transposed in \
+                results:
+            computed = np.subtract.outer(np.arange(start_i, stop_i),
+                                         np.arange(start_j, stop_j)) <= 0
+            result[start_i:stop_i, start_j:stop_j][computed] = values[computed]
+            result[start_j:stop_j, start_i:stop_i].T[computed] = \
+                transposed[computed]
+    finally:
+        if processes == 1:
+            _set_rankings(None)
+        else:
+            pool.close()
+            pool.join()
+    return result
+
+
+@instrumented
+def compare_to_reference(reference, candidates, method = 'tau_b',
+                         reverse = True, ranks = False):
+    """Compute a rank correlation (or distance) between one reference ranking
+    and each row of an (m x n) array of candidate rankings of the same n items,
+    ex. a production ranking and thousands of A/B candidates.
+
+    The reference is ranked once (see rankedlist.RankedList), and every
+    candidate is relabeled into the reference's rank order w/ one gather of
+    all of the rows. Spearman's rho and the footrule are then a matrix-vector
+    product (or difference) w/ the reference's ranks. Kendall's tau-b is one
+    row-wise inversion count (see knights_algo.count_swaps), and AP correlation
+    one row-wise count of the items ranked above each item in both (see
+    knights_algo.count_lower_left). If the reference has ties, the pairs of
+    items that are tied in it are taken out w/ a second count over the
+    candidates' codes offset by the reference's tie group, so that only the
+    items of the same group can be out of order.
+
+    Parameters
+    ----------
+    reference : list or RankedList
+        n values (the definitive list for AP correlation)
+    candidates : 2-D list or array
+        m lists of n values, one per row, paired w/ reference item by item
+    method : str (default is tau_b)
+        tau_b -> Kendall's tau-b, see tau.tau_b
+        ap_correlation -> AP correlation of each candidate compared to the
+            reference as the definitive list, see tau.ap_correlation
+        spearman_rho -> Spearman's rho, see spearman.spearman_rho
+        spearman_footrule -> raw Spearman's footrule, see spearman_footrule
+    reverse : bool (default is True)
+        whether to rank values in descending order (True) or ascending order
+    ranks : bool (default is False)
+        Are the reference and candidates values, or ranks? False indicates that
+        these are values, True indicates that they contain ranks.
+
+    Returns
+    -------
+    array of m floats (ints for spearman_footrule), one per candidate
+    """
+    assert method in ['spearman_rho', 'spearman_footrule', 'tau_b',
+                      'ap_correlation'], 'incorrect method'
+    candidates = np.asarray(candidates)
+    assert candidates.ndim == 2, 'candidates must be a 2-D array'
+    reference = ranked(reference, reverse and not ranks)
+    assert len(reference) == candidates.shape[1], \
+        'each candidate must rank the same items as the reference'
+    if method in ['spearman_rho', 'spearman_footrule']:
+        candidate_ranks = candidates if ranks else to_rank(candidates,
+                                                           reverse = reverse)
+        if method == 'spearman_footrule':
+            return np.absolute(candidate_ranks - reference.ranks).sum(axis = 1)
+        centered = candidate_ranks - candidate_ranks.mean(axis = 1,
+                                                          keepdims = True)
+        reference_centered = reference.ranks - reference.ranks.mean()
+        return centered.dot(reference_centered) / (
+            np.sqrt(np.square(centered).sum(axis = 1)) *
+            np.sqrt(np.square(reference_centered).sum()))
+    # -- candidates' rank codes (0 for the items ranked first), in reference
+    # order, and each item's tie group in the reference
+    order = reference.order
+    codes = to_rank(candidates, ties = 'same', reverse = reverse and not
+                    ranks).astype(np.int64)[:, order] - 1
+    groups = reference.rank_codes[order]
+    grouped = groups * candidates.shape[1] + codes
+    if method == 'tau_b':
+        n = len(order)
+        pairs = n * (n - 1) // 2
+        discordant = count_swaps(codes)
+        l1_ties, x_distinct = row_ties(codes)
+        joint_ties = 0
+        if reference.has_ties:
+            discordant = discordant - count_swaps(grouped)
+            joint_ties = row_ties(grouped)[0]
+        counts = reference.tie_counts
+        l2_ties = int((counts * (counts - 1) // 2).sum())
+        concordant = pairs - discordant - l1_ties - l2_ties + joint_ties
+        m = np.minimum(x_distinct, len(counts))
+        return tau_b_from_stats((pairs, concordant, discordant, l1_ties,
+                                 l2_ties, joint_ties, m))
+    # -- the items ranked above each item in both, less the items above it
+    # that are tied w/ it in the reference: those in its group w/ a smaller
+    # code, i.e. all of the items before it in the grouped codes but the ones
+    # in the groups above it
+    above = count_lower_left(codes)
+    if reference.has_ties:
+        above = above - (count_lower_left(grouped) -
+                         reference.tie_starts[groups])
+    candidate_ranks = candidates if ranks else to_rank(candidates,
+                                                       reverse = reverse)
+    candidate_ranks = np.asarray(candidate_ranks, dtype = np.float64)[:, order]
+    compared = candidate_ranks != 1
+    prob_concordant = np.where(compared, above, 0) / np.where(
+        compared, candidate_ranks - 1, 1)
+    return 2 * prob_concordant.sum(axis = 1) / compared.sum(axis = 1) - 1
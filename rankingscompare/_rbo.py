@@ -0,0 +1,210 @@
+"""_rbo.py - implementing Rank-Biased Overlap, proposed by Webber et al. [2010],
+and other set-based functions.
+"""
+
+import itertools
+import numbers
+import numpy as np
+from .backends import choose_backend
+from .instrumentation import instrumented, note_backend
+from .utilities import *
+
+
+@instrumented
+def percent_overlap(items1, items2, k = None):
+    """Simply the length of the intersection divided by the length of the union
+    of two sets of items for the first k items in the lists of items. By default
+    k is set to the maximum of the longer list of items.
+    """
+    if k is None:
+        k = max([len(items1), len(items2)])
+    assert k > 0 and k <= max([len(items1), len(items2)]), 'k is out of bounds!'
+    if encoded(items1) and encoded(items2):
+        return len(np.intersect1d(items1[:k], items2[:k])) / \
+            len(np.union1d(items1[:k], items2[:k]))
+    items1_set, items2_set = set(items1[:k]), set(items2[:k])
+    return len(items1_set & items2_set) / len(items1_set | items2_set)
+
+
+@instrumented
+def overlap_at_depth(items1, items2, k = None, backend = 'auto'):
+    """The number of items shared by the first d items of each list, for every
+    depth d = 1, ..., k, computed in a single pass down the lists that keeps a
+    running count of the overlap as each depth adds (at most) one item to each
+    list. By default k is the length of the longer list; past the end of the
+    shorter list only the longer list adds items.
+
+    For integer codes (see encoding.Vocabulary), an item is instead shared from
+    the later of its first positions in the two lists on, so the overlaps are a
+    cumulative count of those depths, w/o any hashing.
+
+    Parameters
+    ----------
+    items1 : list or array of ints
+        ranked list of items, in rank order
+    items2 : list or array of ints
+        ranked list of items, in rank order
+    k : int (default is None)
+        the depth to go down to, at most the length of the longer list
+    backend : str (default is auto)
+        auto -> numpy for integer codes at least as deep as a crossover depth,
+            which depends on whether they're lists or arrays, python
+            otherwise. See backends.py.
+        python -> one pass down the lists w/ sets of the items seen so far
+        numpy -> cumulative count of the depths of the shared integer codes
+
+    Returns
+    -------
+    array of ints of length k, the overlap at depths 1, ..., k
+    """
+    assert backend in ['auto', 'python', 'numpy'], 'incorrect backend'
+    if k is None:
+        k = max([len(items1), len(items2)])
+    assert k > 0 and k <= max([len(items1), len(items2)]), 'k is out of bounds!'
+    explicit = backend != 'auto'
+    if not explicit:
+        backend = choose_backend('overlap_at_depth', items1, k)
+        # -- only lists that start w/ an int could be integer codes
+        if backend == 'numpy' and not encoded(items1) and not all(
+                isinstance(items[0], numbers.Integral)
+                for items in [items1, items2] if len(items)):
+            backend = 'python'
+    if backend == 'numpy' and not (encoded(items1) and encoded(items2)):
+        codes1, codes2 = np.asarray(items1[:k]), np.asarray(items2[:k])
+        if encoded(codes1) and encoded(codes2):
+            items1, items2 = codes1, codes2
+        else:
+            assert not explicit, 'the numpy backend needs integer codes'
+            backend = 'python'
+    note_backend(backend)
+    if backend == 'numpy':
+        codes1, first1 = np.unique(items1[:k], return_index = True)
+        codes2, first2 = np.unique(items2[:k], return_index = True)
+        _, shared1, shared2 = np.intersect1d(
+            codes1, codes2, assume_unique = True, return_indices = True)
+        depths = np.maximum(first1[shared1], first2[shared2])
+        return np.cumsum(np.bincount(depths, minlength = k)).astype(np.int64)
+    seen1, seen2 = set(), set()
+    overlap, overlaps = 0, np.empty(k, dtype = np.int64)
+    for depth in range(k):
+        if depth < len(items1) and items1[depth] not in seen1:
+            seen1.add(items1[depth])
+            overlap += items1[depth] in seen2
+        if depth < len(items2) and items2[depth] not in seen2:
+            seen2.add(items2[depth])
+            overlap += items2[depth] in seen1
+        overlaps[depth] = overlap
+    return overlaps
+
+
+@instrumented
+def average_overlap(items1, items2, k = None, curve = False,
+                    backend = 'auto'):
+    """Compute the average overlap (AO) between two ranked lists of items. Items
+    must be in rank order, starting at 1. [k] is the depth to go down to when
+    computing the AO - the maximum is the max of the lengths of the two lists,
+    the min is 1.
+
+    Proposed simultaneously by Fagin et al. [2003] and Wu and Crestani [2003],
+    it is called the 'intersection metric' and 'average accuracy' by those
+    authors, respectively. This is a similarity score between two sets of ranked
+    items, not a correlation coeffcient like Kendall's tau or Spearman's rho.
+    It works with non-conjoint data and is top-weighted. It is not a measure
+    however on indefinite lists, it is a measure on their prefixes. The AO score
+    is contained in the interval [0, 1], with higher numbers indicating more
+    similar lists of ranked items.
+
+    The overlaps at every depth come from one pass down the lists (see
+    overlap_at_depth), so computing the AO is O(k).
+
+    Parameters
+    ----------
+    items1 : list or array of ints
+        ranked list of items, in rank order
+    items2 : list or array of ints
+        ranked list of items, in rank order
+    k : int (default is None)
+        the depth to go down to, by default the length of the longer list
+    curve : bool (default is False)
+        if True, also return the agreement (overlap / depth) at every depth
+    backend : str (default is auto)
+        how to find the overlaps, see overlap_at_depth
+
+    Returns
+    -------
+    average overlap : float in [0, 1], or a tuple of the average overlap and an
+    array of the agreements at depths 1, ..., k if curve is True
+    """
+    if k is None:
+        k = max([len(items1), len(items2)])
+    agreements = overlap_at_depth(items1, items2, k, backend) / \
+        np.arange(1, k + 1)
+    if curve:
+        return np.mean(agreements), agreements
+    return np.mean(agreements)
+
+
+@instrumented
+def rbo(items1, items2, p = 0.9, measure = 'ext', backend = 'auto'):
+    """Rank-Biased Overlap (RBO), proposed by Webber et al. [2010]. RBO is the
+    expected average overlap of two indefinite ranked lists, where the depth at
+    which the lists are compared is random: the user looks at the next item with
+    probability p (the persistence). Like average overlap, it is top-weighted
+    and works with non-conjoint data, but it is a measure on the indefinite
+    lists rather than on their prefixes. Only prefixes of the lists are known,
+    so RBO can either be bounded (RBO_min, RBO_min + RBO_res) or extrapolated
+    from the prefixes (RBO_ext). Lists of different lengths are handled as in
+    Webber et al. [2010], section 4.3.
+
+    The overlaps at every depth come from one pass down the lists (see
+    overlap_at_depth), so computing RBO is O(k) for lists of length k.
+
+    Parameters
+    ----------
+    items1 : list or array of ints
+        ranked list of items, in rank order
+    items2 : list or array of ints
+        ranked list of items, in rank order
+    p : float (default is 0.9)
+        persistence, in (0, 1). Smaller values are more top-weighted: the top d
+        items get a weight of 1 - p^(d - 1) + (1 - p) / p * d * (ln(1 / (1 - p))
+        - sum of p^i / i for i = 1, ..., d - 1)
+    measure : str (default is ext)
+        min -> RBO_min, the lower bound, assuming that none of the unseen items
+            match
+        res -> RBO_res, the residual, the most that the unseen items could add
+            to RBO_min
+        ext -> RBO_ext, extrapolating the agreement of the prefixes to the rest
+            of the lists
+        bounds -> a tuple of (RBO_min, RBO_min + RBO_res)
+    backend : str (default is auto)
+        how to find the overlaps, see overlap_at_depth
+
+    Returns
+    -------
+    Rank-biased overlap : float in [0, 1] (or a tuple of floats for bounds)
+    """
+    assert measure in ['min', 'res', 'ext', 'bounds'], 'incorrect measure'
+    assert 0 < p < 1, 'p must be in (0, 1)'
+    assert len(items1) > 0 and len(items2) > 0, 'lists must not be empty'
+    s, l = sorted([len(items1), len(items2)])
+    overlaps = overlap_at_depth(items1, items2, backend = backend)
+    x_s, x_l = overlaps[s - 1], overlaps[l - 1]
+    depths = np.arange(1, l + 1)
+    weights = np.power(p, depths)
+    if measure == 'ext':
+        unseen = x_s * (depths - s) / (s * depths) * (depths > s)
+        seen = np.sum((overlaps / depths + unseen) * weights)
+        return (1 - p) / p * seen + ((x_l - x_s) / l + x_s / s) * p ** l
+    rbo_min = (1 - p) / p * (np.sum((overlaps - x_l) / depths * weights) -
+                             x_l * np.log(1 - p))
+    if measure == 'min':
+        return rbo_min
+    f = l + s - x_l  # -- depth by which every unseen item could match
+    tail = np.power(p, np.arange(1, f + 1)) / np.arange(1, f + 1)
+    rbo_res = p ** s + p ** l - p ** f - (1 - p) / p * (
+        s * tail[s:].sum() + l * tail[l:].sum() +
+        x_l * (np.log(1 / (1 - p)) - tail.sum()))
+    if measure == 'res':
+        return rbo_res
+    return rbo_min, rbo_min + rbo_res
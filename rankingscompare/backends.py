@@ -0,0 +1,110 @@
+"""backends.py - picks the backend of a measure from the length and type of its
+input. The simple backends (ex. comparing every pair of values) have next to no
+overhead, so they are the fastest on short lists, and the O(n log n) or
+vectorized backends take over past a crossover length. The crossovers depend on
+the machine, so they can be measured w/ _calibrate.py and saved.
+"""
+
+import copy
+import json
+import os
+
+
+THRESHOLDS_VARIABLE = 'RANKINGSCOMPARE_THRESHOLDS'
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.rankingscompare',
+                            'thresholds.json')
+
+# -- measure -> (simple backend, fast backend)
+BACKENDS = {'tau_stats': ('pairwise', 'knight'),
+            'ap_correlation': ('pairwise', 'knight'),
+            'overlap_at_depth': ('python', 'numpy'),
+            'ragged_tau_stats': ('tensor', 'knight'),
+            'ragged_ranks': ('tensor', 'sort')}
+
+# -- measure -> input type -> the shortest length to use the fast backend for.
+# Indexing into arrays from python is slower than into lists, so the simple
+# backends lose sooner on arrays (and RankedLists). The ragged measures (see
+# batch.py) only ever choose for arrays of many pairs of the same length.
+DEFAULT_THRESHOLDS = {'tau_stats': {'list': 32, 'array': 24},
+                      'ap_correlation': {'list': 24, 'array': 24},
+                      'overlap_at_depth': {'list': 128, 'array': 48},
+                      'ragged_tau_stats': {'array': 256},
+                      'ragged_ranks': {'array': 64}}
+
+_thresholds = None  # -- loaded the first time a backend is chosen
+
+
+def thresholds_path():
+    """The file the thresholds are loaded from and saved to: the path in the
+    RANKINGSCOMPARE_THRESHOLDS environment variable, or
+    ~/.rankingscompare/thresholds.json.
+    """
+    return os.environ.get(THRESHOLDS_VARIABLE) or DEFAULT_PATH
+
+
+def load_thresholds(path = None):
+    """Load the thresholds saved at [path] (by default thresholds_path()), and
+    use them from now on. Measures and input types that aren't in the file keep
+    their default thresholds, and so does everything if there isn't a file.
+    """
+    global _thresholds
+    path = thresholds_path() if path is None else path
+    loaded = copy.deepcopy(DEFAULT_THRESHOLDS)
+    if os.path.exists(path):
+        with open(path) as f:
+            for measure, by_kind in json.load(f).items():
+                if measure in loaded:
+                    loaded[measure].update(by_kind)
+    _thresholds = loaded
+    return copy.deepcopy(loaded)
+
+
+def save_thresholds(thresholds, path = None):
+    """Save thresholds (a dict like DEFAULT_THRESHOLDS) to [path], by default
+    thresholds_path().
+    """
+    path = thresholds_path() if path is None else path
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(path, 'w') as f:
+        json.dump(thresholds, f, indent = 2, sort_keys = True)
+
+
+def set_thresholds(thresholds):
+    """Use thresholds (a dict like DEFAULT_THRESHOLDS, or part of one) from now
+    on, w/o saving them.
+    """
+    global _thresholds
+    current = get_thresholds()
+    for measure, by_kind in thresholds.items():
+        assert measure in BACKENDS, 'unknown measure {0}'.format(measure)
+        current[measure].update(by_kind)
+    _thresholds = current
+
+
+def get_thresholds():
+    """A copy of the thresholds in use.
+    """
+    if _thresholds is None:
+        load_thresholds()
+    return copy.deepcopy(_thresholds)
+
+
+def input_kind(values):
+    """list for lists and tuples, array for everything else (arrays and
+    RankedLists).
+    """
+    return 'list' if isinstance(values, (list, tuple)) else 'array'
+
+
+def choose_backend(measure, values, n = None):
+    """The backend to use for [measure] on [values]: the fast backend if the
+    length n (by default len(values)) is at least the threshold for the type of
+    values, and the simple backend otherwise.
+    """
+    if _thresholds is None:
+        load_thresholds()
+    simple, fast = BACKENDS[measure]
+    n = len(values) if n is None else n
+    return fast if n >= _thresholds[measure][input_kind(values)] else simple
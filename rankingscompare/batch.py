@@ -0,0 +1,276 @@
+"""batch.py - the rank correlations of millions of short pairs of lists of
+different lengths (ex. the results of every query) in one call. The pairs are
+grouped by length, and each group is scored at once.
+"""
+
+import numpy as np
+from .backends import choose_backend
+from .instrumentation import instrumented, note_backend
+from .knights_algo import batch_tau_stats
+from .spearman import pearson_r
+from .tau import gamma_from_stats, sommers_d_from_stats, tau_b_from_stats
+from .utilities import *
+
+TENSOR_BYTES = 2 ** 24  # -- about the most memory the signs of a chunk take
+
+
+def length_groups(x, y, offsets = None, lengths = None):
+    """The number of pairs, and for each length of the pairs (rows of the pairs
+    of that length, (rows x length) array of x, the same of y). The pairs are
+    either every row of two 2-D arrays, the slices offsets[i]:offsets[i + 1]
+    of two flat arrays, or the first lengths[i] values of each row of two
+    padded 2-D arrays.
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    assert x.shape == y.shape, 'x and y must be paired w/ the same shape'
+    assert offsets is None or lengths is None, \
+        'give either offsets or lengths, not both'
+    if offsets is not None:
+        assert x.ndim == 1, 'x and y must be flat arrays w/ offsets'
+        offsets = np.asarray(offsets, dtype = np.int64)
+        assert offsets[0] == 0 and offsets[-1] == len(x), \
+            'offsets must run from 0 to the length of x'
+        lengths = np.diff(offsets)
+    else:
+        assert x.ndim == 2, 'x and y must be 2-D arrays w/o offsets'
+        if lengths is None:
+            lengths = np.full(len(x), x.shape[1], dtype = np.int64)
+        lengths = np.asarray(lengths, dtype = np.int64)
+        assert len(lengths) == len(x) and np.all(lengths <= x.shape[1]), \
+            'lengths must be one per row, at most the width of x'
+    groups = []
+    for length in np.unique(lengths):
+        rows = np.flatnonzero(lengths == length)
+        if offsets is not None:
+            index = offsets[rows][:, None] + np.arange(length)
+            groups.append((rows, x[index], y[index]))
+        else:
+            groups.append((rows, x[rows, :length], y[rows, :length]))
+    return len(lengths), groups
+
+
+def signs(value, values):
+    """The signs of value - values, as int8s.
+    """
+    return (value > values).view(np.int8) - (value < values).view(np.int8)
+
+
+def sign_rows(X, Y):
+    """For each item i of two (rows x n) arrays, the signs of X[:, i] - X[:, j]
+    and of Y[:, i] - Y[:, j] for every item j after it, as (n - i - 1 x rows)
+    arrays of int8s: the upper triangles of the pairwise sign tensors of every
+    row, w/ the rows along the last axis so that every comparison and sum runs
+    over all of the rows at once.
+    """
+    X, Y = np.ascontiguousarray(X.T), np.ascontiguousarray(Y.T)
+    for i in range(len(X) - 1):
+        yield i, signs(X[i], X[i + 1:]), signs(Y[i], Y[i + 1:])
+
+
+def tensor_tau_stats(X, Y):
+    """The tau_stats of each pair of rows of two (rows x n) arrays, from the
+    signs of the differences of every pair of values (see sign_rows): the sum
+    of the products of the signs is concordant - discordant, and the zeros are
+    the ties.
+    """
+    rows, n = X.shape
+    agreement, l1_ties, l2_ties, joint_ties = [np.zeros(rows, dtype = np.int64)
+                                               for _ in range(4)]
+    # -- a value is distinct if no value before it is equal to it
+    repeated_x, repeated_y = np.zeros((2, n, rows), dtype = bool)
+    for i, sign_x, sign_y in sign_rows(X, Y):
+        agreement += (sign_x * sign_y).sum(axis = 0, dtype = np.int32)
+        tied_x, tied_y = sign_x == 0, sign_y == 0
+        l1_ties += tied_x.sum(axis = 0, dtype = np.int32)
+        l2_ties += tied_y.sum(axis = 0, dtype = np.int32)
+        joint_ties += (tied_x & tied_y).sum(axis = 0, dtype = np.int32)
+        repeated_x[i + 1:] |= tied_x
+        repeated_y[i + 1:] |= tied_y
+    pairs = n * (n - 1) // 2
+    untied = pairs - l1_ties - l2_ties + joint_ties
+    m = np.minimum(n - repeated_x.sum(axis = 0), n - repeated_y.sum(axis = 0))
+    return pairs, (untied + agreement) // 2, (untied - agreement) // 2, \
+        l1_ties, l2_ties, joint_ties, m
+
+
+def chunks(X, Y):
+    """Chunks of rows of two (rows x n) arrays, w/ at most about TENSOR_BYTES in
+    the signs of a chunk.
+    """
+    size = max([1, TENSOR_BYTES // (16 * X.shape[1])])
+    for start in range(0, len(X), size):
+        yield slice(start, start + size), X[start:start + size], \
+            Y[start:start + size]
+
+
+def group_tau_stats(X, Y, backend):
+    """The tau_stats of each pair of rows of two (rows x n) arrays, w/ the signs
+    of every pair of values (tensor) or Knight's algorithm on the codes of the
+    rows (knight).
+    """
+    if backend == 'knight':
+        return batch_tau_stats(to_rank(X, 'same', False) - 1,
+                               to_rank(Y, 'same', False) - 1)
+    stats = [np.empty(len(X), dtype = np.int64) for _ in range(7)]
+    for rows, X_chunk, Y_chunk in chunks(X, Y):
+        for stat, chunk_stat in zip(stats, tensor_tau_stats(X_chunk, Y_chunk)):
+            stat[rows] = chunk_stat
+    return stats
+
+
+def group_centered_ranks(X, Y, backend):
+    """The midranks of each row of two (rows x n) arrays, less their mean (n +
+    1) / 2, from the signs of the differences of every pair of values (tensor)
+    or from to_rank (sort). The midrank of a value is 1 + the number of values
+    below it + half the number of other values equal to it, which is (n + 1) /
+    2 + half the sum of the signs of its differences w/ every other value.
+    """
+    n = X.shape[1]
+    if backend == 'sort':
+        return to_rank(X, reverse = False) - (n + 1) / 2, \
+            to_rank(Y, reverse = False) - (n + 1) / 2
+    centered = [np.empty(X.shape), np.empty(Y.shape)]
+    for rows, X_chunk, Y_chunk in chunks(X, Y):
+        sums = np.zeros((2, n, len(X_chunk)), dtype = np.int32)
+        for i, sign_x, sign_y in sign_rows(X_chunk, Y_chunk):
+            for k, sign in enumerate([sign_x, sign_y]):
+                sums[k, i] += sign.sum(axis = 0, dtype = np.int32)
+                sums[k, i + 1:] -= sign
+        for ranks, row_sums in zip(centered, sums):
+            ranks[rows] = row_sums.T / 2
+    return centered
+
+
+@instrumented
+def ragged_tau_stats(x, y, offsets = None, lengths = None, backend = 'auto'):
+    """The statistics of tau_stats for each of a batch of pairs of lists of
+    different lengths, ex. the two systems' scores of the results of every
+    query. The pairs are grouped by length, and every pair of a group is
+    scored at once: short lists w/ the signs of the differences of every pair
+    of values (the pairwise sign tensors), which is O(n^2) but has no per-pair
+    overhead, and longer lists w/ Knight's algorithm on every row at once (see
+    knights_algo.batch_tau_stats).
+
+    Parameters
+    ----------
+    x : array
+        the first list of every pair: a 2-D array w/ one list per row, padded
+        past each list's length if lengths are given, or a flat array of every
+        list one after the other if offsets are given
+    y : array
+        the second list of every pair, laid out like x
+    offsets : array of ints (default is None)
+        where each pair starts in flat x and y, and the length of x at the end
+        (m + 1 offsets for m pairs)
+    lengths : array of ints (default is None)
+        the length of each pair of padded rows of x and y
+    backend : str (default is auto)
+        auto -> tensor for lists shorter than a crossover length, knight
+            otherwise, see backends.py
+        tensor -> sign tensors, O(n^2) time per pair
+        knight -> Knight's algorithm, O(n log n)
+
+    Returns
+    -------
+    the same tuple as tau_stats, where every statistic is an array w/ one value
+    per pair
+    """
+    assert backend in ['auto', 'tensor', 'knight'], 'incorrect backend'
+    size, groups = length_groups(x, y, offsets, lengths)
+    stats = [np.zeros(size, dtype = np.int64) for _ in range(7)]
+    for rows, X, Y in groups:
+        if X.shape[1] == 0:
+            continue
+        group_backend = choose_backend('ragged_tau_stats', X, X.shape[1]) \
+            if backend == 'auto' else backend
+        note_backend(group_backend)
+        for stat, group_stat in zip(stats, group_tau_stats(X, Y,
+                                                           group_backend)):
+            stat[rows] = group_stat
+    return tuple(stats)
+
+
+@instrumented
+def ragged_tau_b(x, y, offsets = None, lengths = None, backend = 'auto'):
+    """tau-b of each of a batch of pairs of lists of different lengths, see
+    ragged_tau_stats for the parameters. NaN for pairs w/ fewer than 2 values.
+    """
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        return tau_b_from_stats(ragged_tau_stats(x, y, offsets, lengths,
+                                                 backend))
+
+
+@instrumented
+def ragged_gamma(x, y, offsets = None, lengths = None, backend = 'auto'):
+    """Goodman - Kruskal Gamma of each of a batch of pairs of lists of
+    different lengths, see ragged_tau_stats for the parameters.
+    """
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        return gamma_from_stats(ragged_tau_stats(x, y, offsets, lengths,
+                                                 backend))
+
+
+@instrumented
+def ragged_sommers_d(x, y, offsets = None, lengths = None,
+                     dependent = 'symmetric', backend = 'auto'):
+    """Somers' D of each of a batch of pairs of lists of different lengths, see
+    tau.sommers_d for dependent, and ragged_tau_stats for the rest.
+    """
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        return sommers_d_from_stats(ragged_tau_stats(x, y, offsets, lengths,
+                                                     backend), dependent)
+
+
+def ragged_ranks(metric, x, y, offsets, lengths, backend):
+    """spearman_rho or spearman_footrule of each of a batch of pairs of lists,
+    from their centered ranks (see group_centered_ranks).
+    """
+    assert backend in ['auto', 'tensor', 'sort'], 'incorrect backend'
+    size, groups = length_groups(x, y, offsets, lengths)
+    if metric == 'spearman_rho':
+        result = np.full(size, np.nan)
+    else:
+        result = np.zeros(size)
+    for rows, X, Y in groups:
+        if X.shape[1] < 2:
+            continue
+        group_backend = choose_backend('ragged_ranks', X, X.shape[1]) \
+            if backend == 'auto' else backend
+        note_backend(group_backend)
+        x_ranks, y_ranks = group_centered_ranks(X, Y, group_backend)
+        if metric == 'spearman_rho':
+            with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                result[rows] = pearson_r(x_ranks, y_ranks)
+        else:
+            result[rows] = np.absolute(x_ranks - y_ranks).sum(axis = 1)
+    return result
+
+
+@instrumented
+def ragged_spearman_rho(x, y, offsets = None, lengths = None,
+                        backend = 'auto'):
+    """Spearman's rho of each of a batch of pairs of lists of different
+    lengths, see ragged_tau_stats for x, y, offsets and lengths. The ranks of
+    short lists are the sums of the signs of their differences (tensor), and
+    those of longer lists come from to_rank on every row at once (sort). NaN
+    for pairs w/ fewer than 2 values.
+
+    Returns
+    -------
+    array of Spearman's rho, one per pair
+    """
+    return ragged_ranks('spearman_rho', x, y, offsets, lengths, backend)
+
+
+@instrumented
+def ragged_spearman_footrule(x, y, offsets = None, lengths = None,
+                             backend = 'auto'):
+    """The raw Spearman's footrule of each of a batch of pairs of lists of
+    different lengths, see ragged_spearman_rho. Midranks of ties can make it
+    a multiple of 1/2, so it is a float.
+
+    Returns
+    -------
+    array of Spearman's footrules, one per pair
+    """
+    return ragged_ranks('spearman_footrule', x, y, offsets, lengths, backend)
@@ -0,0 +1,63 @@
+"""compare.py - every measure for one pair of rankings, sharing the work.
+"""
+
+import collections
+import warnings
+import numpy as np
+from .instrumentation import instrumented
+from .knights_algo import knights_algorithm
+from .rankedlist import ranked
+from .spearman import pearson_r
+from .tau import *
+from .utilities import *
+
+
+Comparison = collections.namedtuple('Comparison', [
+    'tau_a', 'tau_b', 'tau_c', 'gamma', 'sommers_d_l1', 'sommers_d_l2',
+    'sommers_d', 'spearman_rho', 'spearman_footrule'])
+
+
+@instrumented
+def compare_all(l1, l2, reverse = True):
+    """Compute Kendall's tau-a, tau-b and tau-c, Goodman - Kruskal Gamma,
+    Somers' D (w/ each list dependent, and symmetric), Spearman's rho and the
+    raw Spearman's footrule for two lists of values.
+
+    Calling each of those functions separately runs tau_stats at least seven
+    times and ranks each list twice. Here, the tie groups of each list are found
+    once, and are used both by Knight's algorithm (one sort and merge pass for
+    all of the tau-family statistics) and to fill in the ranks in O(n).
+
+    tau-a and tau-c don't warn that they don't adjust for ties here, since
+    tau-b is returned alongside them.
+
+    Parameters
+    ----------
+    l1: list or RankedList
+        a list of values
+    l2: list or RankedList
+        a list of values
+    reverse: bool (default is True)
+        rank values in descending order (True) or ascending order (False)
+
+    Returns
+    -------
+    Comparison, a namedtuple of each of the measures, as floats
+    """
+    assert len(l1) == len(l2), 'l1 and l2 must be paired data w/ equal length'
+    l1, l2 = ranked(l1, reverse), ranked(l2, reverse)
+    stats = knights_algorithm(l1, l2)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        tau_a_value = tau_a_from_stats(stats)
+        tau_c_value = tau_c_from_stats(stats, len(l1))
+    return Comparison(
+        tau_a = float(tau_a_value),
+        tau_b = float(tau_b_from_stats(stats)),
+        tau_c = float(tau_c_value),
+        gamma = float(gamma_from_stats(stats)),
+        sommers_d_l1 = float(sommers_d_from_stats(stats, 'l1')),
+        sommers_d_l2 = float(sommers_d_from_stats(stats, 'l2')),
+        sommers_d = float(sommers_d_from_stats(stats)),
+        spearman_rho = float(pearson_r(l1.ranks, l2.ranks)),
+        spearman_footrule = float(np.absolute(l1.ranks - l2.ranks).sum()))
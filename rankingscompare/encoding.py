@@ -0,0 +1,96 @@
+"""encoding.py - dictionary encoding of item IDs (URLs, document IDs, etc.) as
+dense integer codes, so that ranked lists of items are hashed once, and the
+set-based measures (see _rbo.py) can compare integer arrays instead.
+"""
+
+import numpy as np
+import pickle
+from .utilities import *
+
+
+class Vocabulary(object):
+    """A mapping of item IDs to dense integer codes 0, 1, ..., in the order the
+    items are first seen. One vocabulary is shared by every list that is
+    compared, so that the same item always gets the same code. It can be saved
+    and loaded, to keep the codes (and skip hashing the items again) across
+    batches.
+
+    Parameters
+    ----------
+    items : list (default is empty)
+        items to add to the vocabulary
+    """
+
+    def __init__(self, items = ()):
+        self._codes, self._items = {}, []
+        self.encode(items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item):
+        return item in self._codes
+
+    def __getstate__(self):
+        return self._items
+
+    def __setstate__(self, items):
+        self._items = list(items)
+        self._codes = dict(zip(self._items, range(len(self._items))))
+
+    @property
+    def items(self):
+        """The items, in the order of their codes.
+        """
+        return list(self._items)
+
+    def encode(self, items, grow = True):
+        """The codes of a list of items, as an array of ints. Items that aren't
+        in the vocabulary are added to it if grow is True, and are otherwise
+        given negative codes -1, -2, ..., one per distinct unknown item, in
+        the order they're first seen. The negative codes are only consistent
+        within one call, so encode lists that are compared together (see
+        encode_batch).
+        """
+        codes, known = self._codes, self._items
+        unknown = {}
+        encoded = np.empty(len(items), dtype = np.int64)
+        for i, item in enumerate(items):
+            code = codes.get(item)
+            if code is None:
+                if grow:
+                    code = codes[item] = len(known)
+                    known.append(item)
+                else:
+                    code = unknown.setdefault(item, -1 - len(unknown))
+            encoded[i] = code
+        return encoded
+
+    def encode_batch(self, lists, grow = True):
+        """The codes of each of a batch of lists of items, see encode.
+        """
+        lengths = [len(items) for items in lists]
+        encoded = self.encode([item for items in lists for item in items],
+                              grow)
+        return np.split(encoded, np.cumsum(lengths)[:-1])
+
+    def decode(self, codes):
+        """The items of a list of codes, None for the negative codes of
+        unknown items.
+        """
+        return [self._items[code] if code >= 0 else None for code in codes]
+
+    def save(self, path):
+        """Save the vocabulary to the file at [path].
+        """
+        with open(path, 'wb') as f:
+            pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        """Load a vocabulary saved w/ save from the file at [path].
+        """
+        with open(path, 'rb') as f:
+            vocabulary = pickle.load(f)
+        assert isinstance(vocabulary, cls), 'not a saved Vocabulary'
+        return vocabulary
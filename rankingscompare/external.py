@@ -0,0 +1,279 @@
+"""external.py - Knight's algorithm for pairs of rankings that don't fit in
+memory, w/ an external merge sort: the data is only ever in memory one run or
+a few blocks at a time, and is otherwise read and written sequentially in
+temporary .npy files.
+"""
+
+import os
+import shutil
+import tempfile
+import numpy as np
+from numpy.lib.format import open_memmap
+from .instrumentation import instrumented
+from .knights_algo import count_swaps
+
+# -- (x, y) pairs are stored as x + yj: numpy orders complex numbers by their
+# real, then imaginary part, w/ the speed of a native type
+PAIR = np.complex128
+ITEM_BYTES = 96  # -- roughly the most memory sorting a run takes per pair
+
+
+class TieCounter(object):
+    """Counts the tied pairs and the distinct values of a sorted stream of
+    values, given for each block of the stream which values start a new group
+    of equal values.
+    """
+
+    def __init__(self):
+        self.tied, self.groups, self.current = 0, 0, 0
+
+    def close(self, size):
+        if size > 0:
+            self.tied += size * (size - 1) // 2
+            self.groups += 1
+
+    def update(self, new):
+        """Add a block of the stream, where new[i] is True if the i-th value
+        differs from the value before it.
+        """
+        starts = np.flatnonzero(new)
+        if len(starts) == 0:
+            self.current += len(new)
+            return
+        self.close(self.current + starts[0])
+        sizes = np.diff(starts).astype(np.int64)
+        self.tied += int((sizes * (sizes - 1) // 2).sum())
+        self.groups += len(sizes)
+        self.current = len(new) - starts[-1]
+
+    def finish(self):
+        """(tied pairs, distinct values) of the whole stream.
+        """
+        self.close(self.current)
+        self.current = 0
+        return self.tied, self.groups
+
+
+def changes(block, previous):
+    """True for each value of a block of a stream that differs from the value
+    before it, where [previous] is the last value of the block before (None
+    for the first block).
+    """
+    new = np.empty(len(block), dtype = bool)
+    new[0] = previous is None or block[0] != previous
+    new[1:] = block[1:] != block[:-1]
+    return new
+
+
+def write_run(directory, values):
+    """Save an array to a new .npy file in directory, returning its path.
+    """
+    handle, path = tempfile.mkstemp(suffix = '.npy', dir = directory)
+    os.close(handle)
+    np.save(path, values)
+    return path
+
+
+def read_blocks(path, block_size):
+    """The values of the .npy file at [path], [block_size] at a time.
+    """
+    values = np.load(path, mmap_mode = 'r')
+    for start in range(0, len(values), block_size):
+        yield np.array(values[start:start + block_size])
+
+
+def merge_runs(path1, path2, directory, block_size):
+    """Merge two sorted runs, saved as .npy files, into a new run, reading and
+    writing [block_size] values at a time. Equal values from path1 go first.
+    Each step merges all of the buffered values up to the smaller of the last
+    buffered values of the two runs, w/ every value's position in the merged
+    run coming from a searchsorted into the other run's values.
+
+    Returns
+    -------
+    (path of the merged run, the number of pairs of a value from path1 and a
+    later value from path2 that is smaller than it)
+    """
+    run1 = np.load(path1, mmap_mode = 'r')
+    run2 = np.load(path2, mmap_mode = 'r')
+    handle, path = tempfile.mkstemp(suffix = '.npy', dir = directory)
+    os.close(handle)
+    merged = open_memmap(path, mode = 'w+', dtype = run1.dtype,
+                         shape = (len(run1) + len(run2),))
+    i, j, written, inversions = 0, 0, 0, 0
+    buffer1, buffer2 = run1[:0], run2[:0]
+    while i < len(run1) or j < len(run2):
+        if len(buffer1) == 0:
+            buffer1 = np.array(run1[i:i + block_size])
+        if len(buffer2) == 0:
+            buffer2 = np.array(run2[j:j + block_size])
+        if len(buffer1) == 0 or len(buffer2) == 0:
+            # -- one run is used up, copy the rest of the other
+            rest = buffer1 if len(buffer2) == 0 else buffer2
+            merged[written:written + len(rest)] = rest
+            written += len(rest)
+            if len(buffer2) == 0:
+                i += len(rest)
+            else:
+                j += len(rest)
+            buffer1, buffer2 = run1[:0], run2[:0]
+            continue
+        # -- w/ the smaller last value as the limit, later values can't be
+        # smaller than anything taken now
+        take1 = np.searchsorted(buffer1, buffer2[-1:], 'right')[0]
+        if take1 < len(buffer1):
+            take2 = len(buffer2)
+        else:
+            take1 = len(buffer1)
+            take2 = np.searchsorted(buffer2, buffer1[-1:], 'left')[0]
+        taken1, taken2 = buffer1[:take1], buffer2[:take2]
+        below = np.searchsorted(taken1, taken2, 'right')
+        inversions += int((len(run1) - i) * take2 - below.sum())
+        block = np.empty(take1 + take2, dtype = run1.dtype)
+        block[below + np.arange(take2)] = taken2
+        block[np.searchsorted(taken2, taken1, 'left') + np.arange(take1)] = \
+            taken1
+        merged[written:written + len(block)] = block
+        written, i, j = written + len(block), i + take1, j + take2
+        buffer1, buffer2 = buffer1[take1:], buffer2[take2:]
+    merged.flush()
+    del merged, run1, run2
+    os.remove(path1)
+    os.remove(path2)
+    return path, inversions
+
+
+def merge_all(paths, directory, block_size):
+    """Merge sorted runs, in order, into one, two at a time.
+
+    Returns
+    -------
+    (path of the merged run, the number of pairs of values that are out of
+    order between the runs)
+    """
+    inversions = 0
+    while len(paths) > 1:
+        merged = []
+        for k in range(0, len(paths) - 1, 2):
+            path, count = merge_runs(paths[k], paths[k + 1], directory,
+                                     block_size)
+            merged.append(path)
+            inversions += count
+        paths = merged + paths[len(paths) - len(paths) % 2:]
+    return paths[0], inversions
+
+
+def exact_floats(values):
+    """A block of values as float64s, which have to be the same values: the
+    pairs are sorted as complex numbers, so integers past 2 ** 53 would be
+    rounded, and distinct values merged.
+    """
+    if values.dtype.kind in 'iu' and values.dtype.itemsize > 4 and \
+            len(values) > 0:
+        assert -2 ** 53 <= values.min() and values.max() <= 2 ** 53, \
+            'integer values must be at most 2 ** 53 in absolute value'
+    floats = values.astype(np.float64)
+    if values.dtype.kind not in 'iu' and \
+            not np.can_cast(values.dtype, np.float64):
+        assert np.all(floats == values), 'values must be exact as float64s'
+    return floats
+
+
+def as_vector(values):
+    """A 1-D array of values, or a read-only memory map of a .npy file.
+    """
+    if isinstance(values, str):
+        values = np.load(values, mmap_mode = 'r')
+    values = np.asarray(values)
+    assert values.ndim == 1, 'values must be 1-D'
+    return values
+
+
+@instrumented
+def external_tau_stats(x, y, memory = 2 ** 30, directory = None):
+    """The statistics of tau_stats for two lists of values that don't have to
+    fit in memory, ex. .npy files of scores of every item of a catalog, in
+    O(n log n) time and w/ at most about [memory] bytes in memory at a time.
+
+    This is Knight's algorithm w/ an external merge sort. The pairs are cut
+    into runs that fit in memory, each run is sorted by x, then y, and the runs
+    are merged into one sorted file. The y values are then read back in that
+    order, one run at a time, and each run is sorted w/ count_swaps counting
+    its discordant pairs. Merging those runs counts the discordant pairs
+    between runs, w/ a searchsorted of each block of the later run into the
+    earlier one. The tied pairs are counted from the groups of equal values
+    in the sorted files as they are read.
+
+    Parameters
+    ----------
+    x : str or array
+        .npy file of a 1-D array, or an array (ex. a memory map) of values,
+        which are sorted as float64s, so integers must be at most 2 ** 53
+    y : str or array
+        values paired w/ x, the same length
+    memory : int (default is 2 ** 30)
+        the most memory to use, in bytes, roughly
+    directory : str (default is None)
+        where to write the temporary runs, which take about 32 bytes per pair
+        on disk. By default, the system's temporary directory.
+
+    Returns
+    -------
+    the same tuple as tau_stats: (pairs, concordant, discordant, l1_ties,
+    l2_ties, joint_ties, m)
+    """
+    x, y = as_vector(x), as_vector(y)
+    assert len(x) == len(y), 'x and y must be paired data w/ equal length'
+    n = len(x)
+    run_size = max([2, memory // ITEM_BYTES])
+    block_size = max([1, run_size // 4])
+    directory = tempfile.mkdtemp(dir = directory)
+    try:
+        # -- sorted runs of (x, y), merged into one file
+        runs = []
+        for start in range(0, n, run_size):
+            pairs = np.empty(min([run_size, n - start]), dtype = PAIR)
+            pairs.real = exact_floats(x[start:start + run_size])
+            pairs.imag = exact_floats(y[start:start + run_size])
+            pairs.sort(kind = 'stable')
+            runs.append(write_run(directory, pairs))
+            del pairs
+        if n == 0:
+            return 0, 0, 0, 0, 0, 0, 0
+        path = merge_all(runs, directory, block_size)[0]
+        # -- ties in x and in both, and runs of y in that order
+        x_ties, joint_ties, runs, discordant = TieCounter(), TieCounter(), \
+            [], 0
+        previous = None
+        for pairs in read_blocks(path, run_size):
+            new_x = changes(pairs.real, None if previous is None else
+                            previous.real)
+            x_ties.update(new_x)
+            joint_ties.update(changes(pairs, previous))
+            previous = pairs[-1]
+            y_values = pairs.imag.copy()
+            del pairs
+            codes = np.unique(y_values, return_inverse = True)[1]
+            discordant += count_swaps(codes.ravel())
+            del codes
+            runs.append(write_run(directory, np.sort(y_values)))
+        os.remove(path)
+        path, between = merge_all(runs, directory, block_size)
+        discordant += between
+        # -- ties in y
+        y_ties, previous = TieCounter(), None
+        for values in read_blocks(path, run_size):
+            y_ties.update(changes(values, previous))
+            previous = values[-1]
+        (l1_ties, x_distinct), (l2_ties, y_distinct) = x_ties.finish(), \
+            y_ties.finish()
+        joint_ties = joint_ties.finish()[0]
+    finally:
+        shutil.rmtree(directory, ignore_errors = True)
+    # -- python ints, like the other backends, so that nothing overflows
+    discordant, l1_ties, l2_ties, joint_ties = int(discordant), int(l1_ties), \
+        int(l2_ties), int(joint_ties)
+    pairs = n * (n - 1) // 2
+    concordant = pairs - discordant - l1_ties - l2_ties + joint_ties
+    return pairs, concordant, discordant, l1_ties, l2_ties, joint_ties, \
+        int(min([x_distinct, y_distinct]))
@@ -0,0 +1,167 @@
+"""instrumentation.py - opt-in counts, sizes, timings and backends of the calls
+to each measure and kernel, to find out where the time goes.
+
+Instrumentation is off unless the RANKINGSCOMPARE_INSTRUMENT environment
+variable is set (to anything but 0), or inside an instrument() block. While it's
+off, an instrumented function costs one extra function call and a check of a
+global flag.
+"""
+
+import contextlib
+import cProfile
+import functools
+import os
+import timeit
+
+
+ENVIRONMENT_VARIABLE = 'RANKINGSCOMPARE_INSTRUMENT'
+
+_enabled = os.environ.get(ENVIRONMENT_VARIABLE, '0') not in ['', '0']
+_records = {}  # -- function name -> record, see snapshot
+_active = []  # -- the calls being recorded, innermost last
+_hook = None
+
+
+def _size(value):
+    """The number of values in the first argument of a call, None if it doesn't
+    have a length.
+    """
+    size = getattr(value, 'size', None)
+    if isinstance(size, int):
+        return size
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+def _record(name, func, args, kwargs):
+    """Call func, recording the call under [name].
+    """
+    size = _size(args[0]) if args else None
+    call = {'backend': kwargs.get('backend')}
+    _active.append(call)
+    start = timeit.default_timer()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        seconds = timeit.default_timer() - start
+        _active.pop()
+        record = _records.get(name)
+        if record is None:
+            record = _records[name] = {'calls': 0, 'seconds': 0.0,
+                                       'items': 0, 'max_size': 0,
+                                       'backends': {}}
+        record['calls'] += 1
+        record['seconds'] += seconds
+        if size is not None:
+            record['items'] += size
+            record['max_size'] = max([record['max_size'], size])
+        backend = call['backend']
+        if backend is not None:
+            record['backends'][backend] = record['backends'].get(backend, 0) + 1
+        if _hook is not None:
+            _hook(name, seconds, size, backend)
+
+
+def instrumented(func):
+    """Decorator that records the calls to [func] while instrumentation is on.
+    The wrapper keeps func's name, so it shows up as func in cProfile too.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        return _record(name, func, args, kwargs)
+
+    return wrapper
+
+
+def note_backend(backend):
+    """Record which backend (or algorithm) the instrumented call that is running
+    chose, ex. when it was picked automatically.
+    """
+    if _enabled and _active:
+        _active[-1]['backend'] = backend
+
+
+def enabled():
+    """True if instrumentation is on.
+    """
+    return _enabled
+
+
+def enable():
+    """Turn instrumentation on.
+    """
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Turn instrumentation off, keeping what was recorded.
+    """
+    global _enabled
+    _enabled = False
+
+
+def set_hook(hook):
+    """Call hook(name, seconds, size, backend) after every recorded call (ex. to
+    send the timings elsewhere), None to stop.
+    """
+    global _hook
+    _hook = hook
+
+
+def snapshot():
+    """A copy of what has been recorded so far.
+
+    Returns
+    -------
+    dict of function name -> dict of the number of calls, the total seconds
+    spent in them, the total and the largest size of their first argument, and
+    the number of calls that used each backend
+    """
+    return dict((name, dict(record, backends = dict(record['backends'])))
+                for name, record in _records.items())
+
+
+def reset():
+    """Forget everything that has been recorded.
+    """
+    _records.clear()
+
+
+@contextlib.contextmanager
+def instrument(reset_records = True):
+    """Turn instrumentation on inside a with block, and back to what it was
+    after. Yields snapshot, to look at the records at the end of the block.
+    """
+    global _enabled
+    was_enabled = _enabled
+    if reset_records:
+        reset()
+    _enabled = True
+    try:
+        yield snapshot
+    finally:
+        _enabled = was_enabled
+
+
+@contextlib.contextmanager
+def profile(path = None):
+    """Run cProfile, and instrumentation, inside a with block. Yields the
+    cProfile.Profile, and saves its stats to [path] at the end of the block if
+    given (ex. to look at w/ pstats or snakeviz).
+    """
+    profiler = cProfile.Profile()
+    with instrument(reset_records = False):
+        profiler.enable()
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+            if path is not None:
+                profiler.dump_stats(path)
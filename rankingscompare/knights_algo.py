@@ -1,76 +1,398 @@
-from __future__ import division, print_function
-
 """Implementing Knight's algorithm to replace the tau_stats function. Instead
 of running in O(n^2), we will be able to get concordances, discordances, ties,
 etc. in O(n log n) time.
 """
 
 import numpy as np
-from utilities import *
+from .instrumentation import instrumented
+from .rankedlist import RankedList, ranked
+from .utilities import *
 
 
 ################################################################################
 # Knight's algorithm for computing tau-a, b, c, etc.
 ################################################################################
 
+SMALL_BLOCK = 16  # -- a power of 2, the blocks count_swaps compares pairwise
 
-def merge(B, C):
-    """Merge sorted arrays B and C into a new sorted array D. O(len(B + C)),
-    also report the number of inversions that have occured thus far.
-    """
-    D, discordances_at_column, rows_remaining = [], 0, len(B)
-    concordances, discordances, ties = len(B) * len(C), 0, 0
-    while len(B) > 0 and len(C) > 0:
-        first_B, first_C = B[0], C[0]
-        if first_B <= first_C:
-            D.append(B.pop(0))
-            discordances += discordances_at_column
-            rows_remaining -= 1
-            if first_B == first_C:
-                ties += 1
-        else:
-            D.append(C.pop(0))
-            discordances_at_column += 1
-    if B:
-        D.extend(B)
-        discordances += discordances_at_column * rows_remaining
-    elif C:
-        D.extend(C)
-    concordances = concordances - discordances - ties
-    return D, concordances, discordances, ties
-
-
-def mergesort_tau(array):
-    """Iterative implementation of the merge sort algorithm, which takes
-    O(n log n) time, that also counts the number of concordances, discordances,
-    and ties in an array (where the correct order is ascending order). Returns
-    a tuple of concordances, discordances, and ties.
+
+@instrumented
+def count_swaps(codes):
+    """The number of swaps a merge sort of [codes] into ascending order has to
+    make, which is the number of pairs i < j where codes[i] > codes[j]. Equal
+    values are never swapped. A 2-D array of codes is sorted one row at a time.
+
+    This is a bottom-up merge sort: each pass merges every pair of adjacent
+    sorted blocks at once by sorting each block. Every code is packed w/ its
+    position in the list (code * 2 ** bits + position), and since a merge sort
+    only ever moves elements within their block, sorting the packed codes of a
+    block merges its two halves stably, and the same packed codes are sorted
+    again in every pass. When two sorted blocks are merged, every element of
+    the right block moves left by the number of elements in the left block
+    that are greater than it, so the number of swaps made in a pass is how far
+    the right blocks moved in total. There are log(n) passes, for O(n log n)
+    in total. Every row of a 2-D array is merged at once. The first few passes
+    are replaced by comparing every pair of codes in blocks of SMALL_BLOCK,
+    which is faster than sorting such short blocks.
+
+    Parameters
+    ----------
+    codes : array of ints
+        1-D or 2-D array of dense non-negative integer codes, such as the
+        inverse returned by np.unique(..., return_inverse = True)
+
+    Returns
+    -------
+    number of swaps : int, or an array of ints w/ one per row of a 2-D array
     """
-    sorted_array = [[item] for item in array]
-    i, n = 0, len(sorted_array)
-    total_concordances, total_discordances, total_ties = 0, 0, 0
-    while n > 1:
-        while i < (n // 2):
-            sorted_array[i], concordances, discordances, ties = merge(
-                sorted_array[i], sorted_array.pop(i + 1))
-            i += 1
-            total_concordances += concordances
-            total_discordances += discordances
-            total_ties += ties
-        i, n = 0, len(sorted_array)
-    return total_concordances, total_discordances, total_ties
+    codes = np.asarray(codes, dtype = np.int64)
+    batch = codes.ndim == 2
+    codes = codes if batch else codes.reshape(1, -1)
+    rows, n = codes.shape
+    swaps = np.zeros(rows, dtype = np.int64)
+    if n >= 2:
+        # -- padded w/ a code above every other one to whole blocks, which
+        # adds no swaps
+        k = int(codes.max()) + 1
+        size = -(-n // SMALL_BLOCK) * SMALL_BLOCK
+        bits = (size - 1).bit_length()
+        # -- the packed codes are < (k + 1) * 2 ** bits, so usually fit in
+        # int32s, which sort faster
+        dtype = np.int32 if (k + 1) << bits < 2 ** 31 else np.int64
+        padded = np.full((rows, size), k,
+                         dtype = np.int16 if k < 2 ** 15 else dtype)
+        padded[:, :n] = codes
+        blocks = padded.reshape(rows, -1, SMALL_BLOCK)
+        for i in range(SMALL_BLOCK - 1):
+            swaps += (blocks[:, :, i:i + 1] > blocks[:, :, i + 1:]).sum(
+                axis = (1, 2))
+        packed = np.left_shift(padded, bits, dtype = dtype)
+        packed |= np.arange(size, dtype = dtype)
+        packed.reshape(rows, -1, SMALL_BLOCK).sort(axis = -1)
+        in_right = np.empty_like(packed)
+        shift = SMALL_BLOCK.bit_length()
+        while 1 << (shift - 1) < size:
+            half, width = 1 << (shift - 1), 1 << shift
+            # -- the whole blocks, then the block left over at the end, which
+            # is shorter and only needs merging if it has a right half
+            end = size - size % width
+            for start, stop in [(0, end), (end, size)]:
+                if stop - start <= half:
+                    continue
+                block = min([width, stop - start])
+                merged = packed[:, start:stop].reshape(rows, -1, block)
+                merged.sort(axis = -1)
+                right = in_right[:, start:stop].reshape(rows, -1, block)
+                np.right_shift(merged, shift - 1, out = right)
+                right &= 1
+                # -- merging halves of half and r codes, the right half moves
+                # from the columns half, ..., block - 1, and ends up in the
+                # columns it was merged into
+                r = block - half
+                columns = np.arange(block, dtype = dtype if block * block <
+                                    2 ** 31 else np.int64)
+                swaps += merged.shape[1] * (half * r + r * (r - 1) // 2) \
+                    - (right @ columns).sum(axis = 1)
+            shift += 1
+    return swaps if batch else int(swaps[0])
 
 
+@instrumented
 def knights_algorithm(X, Y):
     """Modified merge sort algorithm that computes the number of concordances,
     discordances, and ties between two numeric variables in O(n log n) time, as
     opposed to the naive method of iterating over all combinations of size 2
     between the two variables, which takes O(n^2) time.
+
+    The pairs are sorted by X, and then by Y within ties in X. A pair of
+    observations is then discordant exactly when a merge sort of the sorted Y
+    values has to swap them, and the tied pairs are counted from the sizes of
+    the groups of tied values.
+
+    Parameters
+    ----------
+    X : list of floats/ints, or RankedList
+        first variable
+    Y : list of floats/ints, or RankedList
+        second variable, paired with X
+
+    Returns
+    -------
+    the same tuple as tau_stats: (pairs, concordant, discordant, l1_ties,
+    l2_ties, joint_ties, m)
+    """
+    X, Y = ranked(X), ranked(Y)
+    assert len(X) == len(Y), 'X and Y must be paired data w/ equal length'
+    n = len(X)
+    x_codes, x_counts, y_codes, y_counts = X.codes, X.tie_counts, Y.codes, \
+        Y.tie_counts
+    joint_counts = np.unique(x_codes.astype(np.int64) * len(y_counts) + y_codes,
+                             return_counts = True)[1]
+    discordant = count_swaps(y_codes[np.lexsort((y_codes, x_codes))])
+    pairs = n * (n - 1) // 2
+    l1_ties, l2_ties = tied_pairs(x_counts), tied_pairs(y_counts)
+    joint_ties = tied_pairs(joint_counts)
+    concordant = pairs - discordant - l1_ties - l2_ties + joint_ties
+    m = min([len(x_counts), len(y_counts)])
+    return pairs, concordant, discordant, l1_ties, l2_ties, joint_ties, m
+
+
+def sorted_row_ties(codes):
+    """For each row of a 2-D array of codes, sorted within each row, the number
+    of tied pairs and the number of distinct codes, from the runs of equal
+    codes.
+    """
+    rows, n = codes.shape
+    new = np.ones(codes.shape, dtype = bool)
+    new[:, 1:] = codes[:, 1:] != codes[:, :-1]
+    starts = np.flatnonzero(new)
+    sizes = np.diff(np.append(starts, rows * n))
+    ties = np.bincount(starts // max([n, 1]), sizes * (sizes - 1) // 2,
+                       minlength = rows)
+    return ties.astype(np.int64), new.sum(axis = 1)
+
+
+def row_ties(codes):
+    """For each row of a 2-D array of codes, the number of tied pairs and the
+    number of distinct codes. Dense codes (ex. RankedList.codes) are counted w/
+    one bincount of every row, instead of sorting them.
     """
-    sorted_by_X = sorted([(x, y) for x, y in zip(X, Y)])
+    rows, n = codes.shape
+    k = int(codes.max(initial = 0)) + 1
+    if k > n:
+        return sorted_row_ties(np.sort(codes, axis = -1))
+    counts = np.bincount((codes + k * np.arange(rows)[:, None]).ravel(),
+                         minlength = rows * k).reshape(rows, k)
+    # -- a code that appears c times is in c * (c - 1) / 2 tied pairs
+    return (np.einsum('ij,ij->i', counts, counts) - n) // 2, \
+        np.count_nonzero(counts, axis = 1)
+
+
+@instrumented
+def batch_tau_stats(x_codes, y_codes):
+    """knights_algorithm for each row of two (rows x n) arrays of codes at once,
+    ex. for a batch of resampled lists. Each row is sorted by X, then Y, and the
+    discordances of every row come from one row-wise count_swaps.
 
+    Parameters
+    ----------
+    x_codes : 2-D array of ints
+        dense non-negative integer codes of the first variable, one list per
+        row (see RankedList.codes)
+    y_codes : 2-D array of ints
+        codes of the second variable, paired with x_codes
+
+    Returns
+    -------
+    the same tuple as tau_stats, where every statistic but pairs is an array
+    w/ one value per row
+    """
+    x_codes = np.asarray(x_codes, dtype = np.int64)
+    y_codes = np.asarray(y_codes, dtype = np.int64)
+    assert x_codes.ndim == 2 and x_codes.shape == y_codes.shape, \
+        'x_codes and y_codes must be 2-D arrays w/ the same shape'
+    n, k = x_codes.shape[1], y_codes.max(initial = 0) + 1
+    pairs = n * (n - 1) // 2
+    l2_ties, y_distinct = row_ties(y_codes)
+    if (x_codes[:, 1:] > x_codes[:, :-1]).all():
+        # -- already sorted by X w/o ties (ex. the shuffles of a permutation
+        # test, see resampling.resample_batch)
+        discordant = count_swaps(y_codes)
+        l1_ties = joint_ties = np.zeros(len(x_codes), dtype = np.int64)
+        x_distinct = n
+    else:
+        # -- sorting the joint codes sorts by X, then Y, and the codes give
+        # back both, so there's no argsort to apply
+        joint_codes = np.sort(x_codes * k + y_codes, axis = -1)
+        discordant = count_swaps(joint_codes % k)
+        l1_ties, x_distinct = sorted_row_ties(joint_codes // k)
+        joint_ties = sorted_row_ties(joint_codes)[0]
+    concordant = pairs - discordant - l1_ties - l2_ties + joint_ties
+    m = np.minimum(x_distinct, y_distinct)
+    return pairs, concordant, discordant, l1_ties, l2_ties, joint_ties, m
 
 
 ################################################################################
 # Knight's algorithm for computing AP correlation, tau-h (Vigna 2014), etc.
 ################################################################################
+
+
+@instrumented
+def count_lower_left(codes):
+    """For every position i, the number of positions j < i where codes[j] is
+    strictly less than codes[i], in O(n log n). A 2-D array of codes is counted
+    one row at a time.
+
+    Uses the same bottom-up merge sort as count_swaps, but merges so that an
+    element of the right block is placed before the elements of the left block
+    that are equal to it. The distance an element of the right block moves left
+    is then the number of elements of the left block that are not less than it,
+    so the number that are less than it is what remains of the left block. The
+    blocks of a 2-D array never cross rows, so every row is merged at once.
+
+    Parameters
+    ----------
+    codes : array of ints
+        1-D or 2-D array of dense non-negative integer codes
+
+    Returns
+    -------
+    array of ints, the count for each position in [codes]
+    """
+    codes = np.asarray(codes, dtype = np.int64)
+    shape, n = codes.shape, codes.shape[-1]
+    codes = codes.ravel()
+    counts = np.zeros(len(codes), dtype = np.int64)
+    if n < 2:
+        return counts.reshape(shape)
+    k, positions, ids = codes.max() + 1, np.arange(len(codes)), \
+        np.arange(len(codes))
+    rows, columns = positions // n, positions % n
+    merged, width = np.empty(len(codes), dtype = np.int64), 1
+    while width < n:
+        blocks = rows * n + columns // (2 * width)
+        right = (columns // width) % 2 == 1
+        perm = np.argsort(2 * (codes + blocks * k) + ~right, kind = 'mergesort')
+        merged[perm] = positions
+        right = positions[right]
+        counts[ids[right]] += merged[right] - right + width
+        codes, ids = codes[perm], ids[perm]
+        width *= 2
+    return counts.reshape(shape)
+
+
+@instrumented
+def ranked_above_in_both(ranks1, ranks2):
+    """For each item, the number of items that are ranked strictly above it (a
+    smaller rank) in both ranks1 and ranks2. These are the concordances that AP
+    correlation is built on, and they are the same whichever list is taken as
+    the definitive one.
+
+    The items are sorted by ranks1, and within ties in ranks1 by ranks2 in
+    descending order, so that an item is never counted as above another item it
+    is tied with in ranks1. count_lower_left then counts, for each item, the
+    items before it with a smaller rank in ranks2.
+
+    Parameters
+    ----------
+    ranks1 : list of floats/ints, or RankedList
+        ranks of the items in the first list (or the RankedList of the first
+        list)
+    ranks2 : list of floats/ints, or RankedList
+        ranks of the same items in the second list
+
+    Returns
+    -------
+    array of ints, the count for each item
+    """
+    codes1 = ranked(ranks1, reverse = False).rank_codes
+    codes2 = ranked(ranks2, reverse = False).rank_codes
+    assert len(codes1) == len(codes2), 'ranks must be paired w/ equal length'
+    order = np.lexsort((-codes2, codes1))
+    counts = np.empty(len(codes1), dtype = np.int64)
+    counts[order] = count_lower_left(codes2[order])
+    return counts
+
+
+@instrumented
+def weighted_swaps(codes, weights, additive = True):
+    """The weighted number of swaps a merge sort of [codes] into ascending order
+    has to make (see count_swaps), where swapping i and j weighs weights[i] +
+    weights[j] (additive) or weights[i] * weights[j].
+
+    In each pass, an element of the right block is swapped w/ every element of
+    the left block that is greater than it. Those are the elements of the left
+    block that are merged after it, so their number is the distance it moves,
+    and their weight is the difference of a cumulative sum of the weights of
+    the left elements (in merged order) between it and the end of its block. As
+    in count_swaps, each pass is vectorized over every block.
+
+    Parameters
+    ----------
+    codes : array of ints
+        dense non-negative integer codes
+    weights : array of floats
+        weight of each element of [codes]
+    additive : bool (default is True)
+        combine weights by addition (True) or multiplication (False)
+
+    Returns
+    -------
+    weight of the swaps : float
+    """
+    codes = np.asarray(codes, dtype = np.int64).ravel()
+    weights = np.asarray(weights, dtype = np.float64).ravel()
+    n = len(codes)
+    if n < 2:
+        return 0.0
+    k, positions = codes.max() + 1, np.arange(n)
+    swaps, width = 0.0, 1
+    while width < n:
+        blocks = positions // (2 * width)
+        right = (positions // width) % 2 == 1
+        perm = np.argsort(codes + blocks * k, kind = 'mergesort')
+        codes, weights, right = codes[perm], weights[perm], right[perm]
+        moved = np.flatnonzero(right)
+        left_weight = np.cumsum(np.where(right, 0, weights))
+        ends = np.minimum((moved // (2 * width) + 1) * 2 * width, n) - 1
+        greater = perm[moved] - moved
+        greater_weight = left_weight[ends] - left_weight[moved]
+        if additive:
+            swaps += (weights[moved] * greater).sum() + greater_weight.sum()
+        else:
+            swaps += (weights[moved] * greater_weight).sum()
+        width *= 2
+    return swaps
+
+
+def tied_weight(codes, weights, additive = True):
+    """The total weight of the pairs of elements w/ equal codes, where a pair
+    weighs the sum (additive) or product of the weights of its elements. A group
+    of g tied elements whose weights sum to s has pairs weighing s * (g - 1)
+    (additive) or (s^2 - the sum of the squared weights) / 2.
+    """
+    sums = np.bincount(codes, weights)
+    if additive:
+        return (sums * (np.bincount(codes) - 1)).sum()
+    squares = np.bincount(codes, np.square(weights))
+    return ((np.square(sums) - squares) / 2).sum()
+
+
+@instrumented
+def weighted_tau_stats(X, Y, weights, additive = True):
+    """The weighted counterparts of the statistics from knights_algorithm, where
+    a pair of observations weighs the sum (additive) or product of the weights
+    of its two observations, as in Vigna's weighted tau [2015].
+
+    Parameters
+    ----------
+    X : list of floats/ints, or RankedList
+        first variable
+    Y : list of floats/ints, or RankedList
+        second variable, paired with X
+    weights : array of floats
+        the weight of each observation
+    additive : bool (default is True)
+        combine weights by addition (True) or multiplication (False)
+
+    Returns
+    -------
+    a tuple of the weights of (pairs, concordant, discordant, l1_ties, l2_ties,
+    joint_ties)
+    """
+    X, Y = ranked(X), ranked(Y)
+    assert len(X) == len(Y), 'X and Y must be paired data w/ equal length'
+    assert len(weights) == len(X), 'need one weight per observation'
+    weights = np.asarray(weights, dtype = np.float64)
+    x_codes, y_codes = X.codes, Y.codes
+    joint_codes = np.unique(x_codes.astype(np.int64) * len(Y.tie_counts) +
+                            y_codes, return_inverse = True)[1].ravel()
+    order = np.argsort(x_codes.astype(np.int64) * len(Y.tie_counts) + y_codes,
+                       kind = 'mergesort')
+    discordant = weighted_swaps(y_codes[order], weights[order], additive)
+    pairs = tied_weight(np.zeros(len(X), dtype = np.int64), weights, additive)
+    l1_ties = tied_weight(x_codes, weights, additive)
+    l2_ties = tied_weight(y_codes, weights, additive)
+    joint_ties = tied_weight(joint_codes, weights, additive)
+    concordant = pairs - discordant - l1_ties - l2_ties + joint_ties
+    return pairs, concordant, discordant, l1_ties, l2_ties, joint_ties
@@ -0,0 +1,258 @@
+"""pipeline.py - compares many pairs of ranked lists of items (ex. two systems'
+results for every query), streamed from a JSONL or CSV file in batches through
+a pool of processes, w/ the results streamed back out in the input's order.
+"""
+
+import collections
+import csv
+import io
+import itertools
+import json
+import math
+import multiprocessing
+import pickle
+import sys
+import tempfile
+import numpy as np
+from .encoding import Vocabulary
+from .instrumentation import instrumented
+from ._rbo import average_overlap, percent_overlap, rbo
+from .spearman import spearman_rho
+from .tau import ap_correlation, tau_b
+from .topk import footrule_topk, kendall_topk
+
+CORRELATIONS = ['tau_b', 'spearman_rho', 'ap_correlation']
+MEASURES = ['average_overlap', 'rbo', 'percent_overlap', 'kendall_topk',
+            'footrule_topk'] + CORRELATIONS
+
+
+def shared_ranks(codes1, codes2):
+    """The positions in each list of the items that are in both lists, in the
+    order of the first list.
+    """
+    _, positions1, positions2 = np.intersect1d(codes1, codes2,
+                                               assume_unique = True,
+                                               return_indices = True)
+    order = np.argsort(positions1)
+    return positions1[order], positions2[order]
+
+
+def score_pair(codes1, codes2, measures, p = 0.9):
+    """[measures] between two lists of item codes, as a dict. The correlations
+    (tau_b, spearman_rho, ap_correlation, w/ the second list as the definitive
+    one) compare the ranks of the items that are in both lists, and are NaN
+    if fewer than two are. Every measure is NaN if an item is in either list
+    more than once, since neither list is then a ranking.
+    """
+    if len(np.unique(codes1)) < len(codes1) or \
+            len(np.unique(codes2)) < len(codes2):
+        return dict((measure, float('nan')) for measure in measures)
+    scores = {}
+    if any(measure in CORRELATIONS for measure in measures):
+        ranks1, ranks2 = shared_ranks(codes1, codes2)
+    for measure in measures:
+        if measure in CORRELATIONS:
+            if len(ranks1) < 2:
+                scores[measure] = float('nan')
+            elif measure == 'ap_correlation':
+                scores[measure] = ap_correlation(ranks1, ranks2,
+                                                 reverse = False)
+            else:
+                scores[measure] = {'tau_b': tau_b, 'spearman_rho':
+                                   spearman_rho}[measure](ranks1, ranks2)
+        elif len(codes1) == 0 or len(codes2) == 0:
+            scores[measure] = float('nan')
+        elif measure == 'rbo':
+            scores[measure] = rbo(codes1, codes2, p)
+        else:
+            scores[measure] = {
+                'average_overlap': average_overlap, 'percent_overlap':
+                percent_overlap, 'kendall_topk': kendall_topk,
+                'footrule_topk': footrule_topk}[measure](codes1, codes2)
+        scores[measure] = float(scores[measure])
+    return scores
+
+
+@instrumented
+def score_batch(batch):
+    """score_pair for every pair of lists of items in a batch, given ([(list1,
+    list2), ...], measures, p). The items of the batch are encoded once, so the
+    measures compare integer codes.
+    """
+    pairs, measures, p = batch
+    vocabulary = Vocabulary()
+    codes = vocabulary.encode_batch([items for pair in pairs for items in pair])
+    return [score_pair(codes[2 * i], codes[2 * i + 1], measures, p)
+            for i in range(len(pairs))]
+
+
+def read_jsonl(lines, list1 = 'list1', list2 = 'list2'):
+    """Records from lines of JSON objects, w/ the two lists of items in the
+    [list1] and [list2] fields. Blank lines are skipped.
+    """
+    for line in lines:
+        if line.strip():
+            record = json.loads(line)
+            assert list1 in record and list2 in record, \
+                'every record needs a {0} and a {1}'.format(list1, list2)
+            yield record
+
+
+def read_csv(lines, list1 = 'list1', list2 = 'list2', separator = ' '):
+    """Records from the lines of a CSV file w/ a header, where the [list1] and
+    [list2] columns are lists of items joined by [separator].
+    """
+    for record in csv.DictReader(lines):
+        for field in [list1, list2]:
+            assert field in record, 'every record needs a {0}'.format(field)
+            record[field] = record[field].split(separator) \
+                if record[field] else []
+        yield record
+
+
+def json_value(value):
+    """NaN as null, since JSON has no NaN.
+    """
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def evaluate(records, measures = ('average_overlap', 'rbo'), list1 = 'list1',
+             list2 = 'list2', p = 0.9, batch_size = 1000, processes = 1,
+             max_in_flight = None):
+    """Compare the two lists of items of every record in a stream of records,
+    in batches of [batch_size] records that are spread across a pool of
+    processes. At most [max_in_flight] batches are read ahead of the one that
+    is being waited on, so memory stays flat no matter how long the stream is,
+    and the results are yielded in the order of the records.
+
+    Parameters
+    ----------
+    records : iterable of dicts
+        each w/ two lists of items in rank order, ex. from read_jsonl. A
+        record w/ an item in either list more than once gets NaN scores.
+    measures : list of str (default is average_overlap, rbo)
+        any of average_overlap, rbo, percent_overlap, kendall_topk,
+        footrule_topk, and tau_b, spearman_rho, ap_correlation on the ranks of
+        the items that are in both lists
+    list1 : str (default is list1)
+        the field of the first list of items
+    list2 : str (default is list2)
+        the field of the second list of items, the definitive one for
+        ap_correlation
+    p : float (default is 0.9)
+        persistence of rbo
+    batch_size : int (default is 1000)
+        number of records per batch
+    processes : int (default is 1)
+        number of worker processes, None to use one per CPU
+    max_in_flight : int (default is None)
+        most batches submitted to the pool at once, by default twice the
+        number of processes
+
+    Returns
+    -------
+    generator of the records w/o their lists, and w/ a field per measure
+    """
+    measures = list(measures)
+    assert measures and all(measure in MEASURES for measure in measures), \
+        'measures must be some of {0}'.format(', '.join(MEASURES))
+    assert batch_size > 0, 'batch_size must be positive'
+    records = iter(records)
+    batches = iter(lambda: list(itertools.islice(records, batch_size)), [])
+
+    def results(batch, scores):
+        for record, record_scores in zip(batch, scores):
+            result = dict((field, value) for field, value in record.items()
+                          if field not in [list1, list2])
+            result.update(record_scores)
+            yield result
+
+    def task(batch):
+        return ([(record[list1], record[list2]) for record in batch],
+                measures, p)
+
+    if processes == 1:
+        for batch in batches:
+            for result in results(batch, score_batch(task(batch))):
+                yield result
+        return
+    pool = multiprocessing.Pool(processes)
+    if max_in_flight is None:
+        max_in_flight = 2 * (processes or multiprocessing.cpu_count())
+    in_flight = collections.deque()
+    try:
+        for batch in batches:
+            in_flight.append((batch, pool.apply_async(score_batch,
+                                                      (task(batch),))))
+            if len(in_flight) >= max_in_flight:
+                batch, scores = in_flight.popleft()
+                for result in results(batch, scores.get()):
+                    yield result
+        while in_flight:
+            batch, scores = in_flight.popleft()
+            for result in results(batch, scores.get()):
+                yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def write_jsonl(results, f):
+    """Write each result as a line of JSON to the file f.
+    """
+    for result in results:
+        f.write(json.dumps(dict((field, json_value(value))
+                                for field, value in result.items())) + '\n')
+
+
+def write_csv(results, f):
+    """Write the results as a CSV file w/ a header, to the file f. The columns
+    are every field of any result, in the order they first appear, and a result
+    w/o a field has it empty (ex. JSONL records w/ different fields).
+
+    The header needs every field, so the results are spooled to a temporary
+    file first, which keeps the memory flat, and written once they're all in.
+    """
+    fields, count = collections.OrderedDict(), 0
+    with tempfile.TemporaryFile() as spool:
+        for result in results:
+            fields.update((field, None) for field in result)
+            pickle.dump(result, spool, pickle.HIGHEST_PROTOCOL)
+            count += 1
+        if not count:
+            return
+        spool.seek(0)
+        writer = csv.DictWriter(f, list(fields), restval = '',
+                                lineterminator = '\n')
+        writer.writeheader()
+        for _ in range(count):
+            writer.writerow(pickle.load(spool))
+
+
+def run_pipeline(input, output, measures = ('average_overlap', 'rbo'),
+                 input_format = None, output_format = None, list1 = 'list1',
+                 list2 = 'list2', separator = ' ', **kwargs):
+    """Stream the records of the JSONL or CSV file at [input] through evaluate
+    (see its parameters), and the results to the file at [output]. - is stdin
+    or stdout. The formats are jsonl or csv, by default from the extension of
+    the file (jsonl if it isn't .csv).
+    """
+    formats = [input_format or ('csv' if input.endswith('.csv') else 'jsonl'),
+               output_format or ('csv' if output.endswith('.csv') else
+                                 'jsonl')]
+    assert all(format in ['jsonl', 'csv'] for format in formats), \
+        'incorrect format'
+    f_in = sys.stdin if input == '-' else io.open(input, newline = '')
+    f_out = sys.stdout if output == '-' else io.open(output, 'w', newline = '')
+    try:
+        if formats[0] == 'csv':
+            records = read_csv(f_in, list1, list2, separator)
+        else:
+            records = read_jsonl(f_in, list1, list2)
+        results = evaluate(records, measures, list1, list2, **kwargs)
+        (write_csv if formats[1] == 'csv' else write_jsonl)(results, f_out)
+    finally:
+        if f_in is not sys.stdin:
+            f_in.close()
+        if f_out is not sys.stdout:
+            f_out.close()
@@ -0,0 +1,181 @@
+"""rankedlist.py - a list of values that caches what the measures derive from
+them (ranks, sort order, tie groups, Savage scores), so that a ranking that is
+compared many times is only preprocessed once.
+"""
+
+import numpy as np
+from .utilities import *
+
+
+class RankedList(object):
+    """An immutable list of values, ranked in descending (reverse = True) or
+    ascending order. Everything that is derived from the values is computed the
+    first time it is used and cached. Every measure accepts a RankedList in
+    place of a list of values, and then uses its ranking (including its reverse
+    setting) instead of ranking the values again.
+
+    Parameters
+    ----------
+    values : list or array
+        list of floats or integers
+    reverse : bool (default is True)
+        If True, higher numbers correspond to higher ranks (aka 1, 2, ...) and
+        lower numbers correspond to lower ranks (ex. 15, 14, ...). If False,
+        the opposite happens.
+    """
+
+    __slots__ = ['_values', '_reverse', '_cache']
+
+    def __init__(self, values, reverse = True):
+        values = np.array(values)
+        assert values.ndim == 1, 'values must be 1-D'
+        values.flags.writeable = False
+        object.__setattr__(self, '_values', values)
+        object.__setattr__(self, '_reverse', reverse)
+        object.__setattr__(self, '_cache', {})
+
+    def __setattr__(self, name, value):
+        raise AttributeError('RankedList is immutable')
+
+    def __reduce__(self):
+        return RankedList, (self._values, self._reverse)
+
+    def __repr__(self):
+        return 'RankedList({0}, reverse = {1})'.format(
+            self._values.tolist(), self._reverse)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, index):
+        return self._values[index]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __array__(self, dtype = None, copy = None):
+        values = self._values if dtype is None else \
+            self._values.astype(dtype, copy = False)
+        if copy is False and values is not self._values:
+            # -- numpy's protocol for conversions that can't avoid a copy
+            raise ValueError('a RankedList can\'t be converted to {0} w/o a '
+                             'copy'.format(np.dtype(dtype)))
+        return values.copy() if copy and values is self._values else values
+
+    def _cached(self, name, compute):
+        """The cached value of [name], computing it w/ [compute] if needed.
+        """
+        if name not in self._cache:
+            value = compute()
+            if isinstance(value, np.ndarray):
+                value.flags.writeable = False
+            self._cache[name] = value
+        return self._cache[name]
+
+    def _tie_groups(self):
+        _, codes, counts = np.unique(self._values, return_inverse = True,
+                                     return_counts = True)
+        return codes.ravel(), counts
+
+    def _order(self):
+        order = np.argsort(self._values, kind = 'mergesort')
+        return order[::-1].copy() if self._reverse else order
+
+    def _ranks(self):
+        counts = self.tie_counts[::-1] if self._reverse else self.tie_counts
+        return (self.tie_starts + (counts + 1) / 2)[self.rank_codes]
+
+    @property
+    def values(self):
+        """The values, as a read-only array.
+        """
+        return self._values
+
+    @property
+    def reverse(self):
+        """True if higher values are ranked higher.
+        """
+        return self._reverse
+
+    @property
+    def codes(self):
+        """Dense integer codes of the values, 0 for the smallest value.
+        """
+        return self._cached('codes', self._tie_groups)[0]
+
+    @property
+    def tie_counts(self):
+        """The number of times each value appears, in the order of the codes.
+        """
+        return self._cached('codes', self._tie_groups)[1]
+
+    @property
+    def has_ties(self):
+        """True if any value appears more than once.
+        """
+        return len(self.tie_counts) < len(self._values)
+
+    @property
+    def rank_codes(self):
+        """Dense integer codes of the ranks, 0 for the values ranked first.
+        """
+        return self._cached('rank_codes', lambda: (
+            len(self.tie_counts) - 1 - self.codes if self._reverse
+            else self.codes))
+
+    @property
+    def tie_starts(self):
+        """The number of values ranked above each group of tied values, in the
+        order of the rank codes. These are the boundaries of the groups in the
+        sort order.
+        """
+        counts = self.tie_counts[::-1] if self._reverse else self.tie_counts
+        return self._cached('tie_starts', lambda: np.cumsum(counts) - counts)
+
+    @property
+    def order(self):
+        """The positions of the values in rank order, the values ranked first
+        coming first.
+        """
+        return self._cached('order', self._order)
+
+    @property
+    def ranks(self):
+        """The ranks of the values, with ties given the midrank.
+        """
+        return self._cached('ranks', self._ranks)
+
+    @property
+    def savage_scores(self):
+        """The Savage scores of the ranks, see utilities.to_savage_scores.
+        """
+        return self._cached('savage_scores', lambda: np.asarray(
+            to_savage_scores(self.ranks)))
+
+
+def ranked(values, reverse = True):
+    """[values] if it is already a RankedList, otherwise a new RankedList.
+    """
+    if isinstance(values, RankedList):
+        return values
+    return RankedList(values, reverse)
+
+
+def ranks_of(values, reverse = True, ranks = False):
+    """The ranks of [values]: the cached ranks of a RankedList, [values] itself
+    if ranks is True, or otherwise the midranks from to_rank.
+    """
+    if isinstance(values, RankedList):
+        return values.ranks
+    if ranks:
+        return values
+    return to_rank(values, reverse = reverse)
+
+
+def savage_scores_of(values, reverse = True, ranks = False):
+    """The Savage scores of [values]: the cached scores of a RankedList, or
+    otherwise the scores of its ranks (see ranks_of).
+    """
+    if isinstance(values, RankedList):
+        return values.savage_scores
+    return to_savage_scores(ranks_of(values, reverse, ranks))
@@ -0,0 +1,213 @@
+"""resampling.py - permutation tests and bootstrap confidence intervals for the
+measures, resampling many times at once.
+"""
+
+import multiprocessing
+import numpy as np
+from .instrumentation import instrumented
+from .knights_algo import batch_tau_stats
+from .rankedlist import ranked
+from .spearman import pearson_r
+from .tau import gamma_from_stats, sommers_d_from_stats, tau_b_from_stats
+from .utilities import *
+
+
+# -- the metric, the two lists and the order of the first (for a named
+# metric), in each worker process
+_resampled = None
+
+
+def _set_resampled(resampled):
+    """Share the metric and the lists with resample_batch (pool initializer).
+    """
+    global _resampled
+    _resampled = resampled
+
+
+def batch_statistic(metric, X, Y):
+    """[metric] for each row of two (rows x n) arrays. For a named metric these
+    are the codes of the values (see RankedList.codes), and the whole batch is
+    ranked and scored at once. A function is called on each pair of rows.
+    """
+    if callable(metric):
+        return np.array([metric(x, y) for x, y in zip(X, Y)], dtype = float)
+    if metric in ['spearman_rho', 'spearman_footrule']:
+        x_ranks, y_ranks = to_rank(X), to_rank(Y)
+        if metric == 'spearman_rho':
+            return pearson_r(x_ranks, y_ranks)
+        return np.absolute(x_ranks - y_ranks).sum(axis = -1)
+    from_stats = {'tau_b': tau_b_from_stats, 'gamma': gamma_from_stats,
+                  'sommers_d': sommers_d_from_stats}[metric]
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        return from_stats(batch_tau_stats(X, Y))
+
+
+def resample_batch(batch):
+    """The metric in _resampled for a batch of resamples of its lists, given
+    (kind, number of resamples, seed). A permutation shuffles the second list
+    against the first, a bootstrap draws pairs w/ replacement. Each row of the
+    (resamples x n) arrays is one resample.
+
+    For a named metric the pairs of every shuffle are put in the order of the
+    first list, which was found once (see resample), so that they are already
+    sorted by X for batch_tau_stats. Reordering the pairs doesn't change the
+    metric, only how much sorting it takes.
+    """
+    kind, size, seed = batch
+    metric, l1, l2, order = _resampled
+    n, random = len(l1), np.random.default_rng(seed)
+    if kind == 'permutation':
+        Y = random.permuted(np.broadcast_to(l2, (size, n)), axis = -1)
+        if order is not None:
+            l1, Y = l1[order], Y[:, order]
+        X = np.broadcast_to(l1, (size, n))
+    else:
+        indices = random.integers(n, size = (size, n))
+        X, Y = l1[indices], l2[indices]
+    return batch_statistic(metric, X, Y)
+
+
+def resample(kind, metric, l1, l2, n_resamples, batch_size, seed, processes):
+    """The observed value of [metric], and its value for [n_resamples]
+    resamples of l1 and l2, drawn [batch_size] at a time. Each batch gets its
+    own seed from [seed], so the resamples only depend on [seed] and the batch
+    size, not on the number of processes.
+    """
+    assert kind in ['permutation', 'bootstrap'], 'incorrect kind'
+    assert callable(metric) or metric in [
+        'tau_b', 'gamma', 'sommers_d', 'spearman_rho', 'spearman_footrule'], \
+        'incorrect metric'
+    assert len(l1) == len(l2), 'l1 and l2 must be paired data w/ equal length'
+    assert n_resamples > 0 and batch_size > 0, 'need at least one resample'
+    if callable(metric):
+        l1, l2, order = np.asarray(l1), np.asarray(l2), None
+    else:
+        # -- ranked once, for every resample
+        l1, l2 = ranked(l1).codes, ranked(l2).codes
+        order = np.argsort(l1, kind = 'stable')
+    resampled = (metric, l1, l2, order)
+    _set_resampled(resampled)
+    try:
+        observed = float(batch_statistic(metric, l1[None], l2[None])[0])
+    finally:
+        _set_resampled(None)
+    seeds = np.random.RandomState(seed).randint(
+        2 ** 31 - 1, size = -(-n_resamples // batch_size))
+    batches = [(kind, min([batch_size, n_resamples - i * batch_size]),
+                batch_seed) for i, batch_seed in enumerate(seeds)]
+    if processes == 1:
+        _set_resampled(resampled)
+        try:
+            return observed, np.concatenate(
+                [resample_batch(batch) for batch in batches])
+        finally:
+            _set_resampled(None)
+    pool = multiprocessing.Pool(processes, _set_resampled, (resampled,))
+    try:
+        return observed, np.concatenate(pool.map(resample_batch, batches))
+    finally:
+        pool.close()
+        pool.join()
+
+
+@instrumented
+def permutation_test(metric, l1, l2, n_resamples = 9999,
+                     alternative = 'two-sided', batch_size = 100, seed = None,
+                     processes = 1):
+    """A permutation test of the null hypothesis that l1 and l2 are not
+    associated: the p-value is the share of random shuffles of l2 against l1
+    whose [metric] is at least as extreme as the observed one.
+
+    The shuffles are drawn as (batch_size x n) arrays, and a named metric is
+    computed for the whole batch at once (one vectorized ranking, or one batch
+    of Knight's algorithm, see knights_algo.batch_tau_stats). The lists are
+    ranked once, and the shuffled pairs are put in the order of l1, so for l1
+    w/o ties the batch only needs the discordances of the shuffled l2 counted.
+
+    Parameters
+    ----------
+    metric: str or function
+        tau_b, gamma, sommers_d (symmetric), spearman_rho or spearman_footrule,
+        or a function of two lists of values that returns a float (run once per
+        resample, and must be picklable to use processes)
+    l1: list or RankedList
+        a list of values
+    l2: list or RankedList
+        a list of values
+    n_resamples: int (default is 9999)
+        number of random shuffles
+    alternative: str (default is two-sided)
+        greater -> the observed value is larger than under the null
+        less -> the observed value is smaller than under the null
+        two-sided -> either, twice the smaller of the two p-values
+    batch_size: int (default is 100)
+        number of shuffles in each batch
+    seed: int (default is None)
+        seed for the shuffles
+    processes: int (default is 1)
+        number of worker processes to resample w/, None to use one per CPU
+
+    Returns
+    -------
+    (observed value of the metric, p-value)
+    """
+    assert alternative in ['greater', 'less', 'two-sided'], \
+        'incorrect alternative'
+    observed, null = resample('permutation', metric, l1, l2, n_resamples,
+                              batch_size, seed, processes)
+    # -- don't let floating point error make a resample less extreme
+    tolerance = 1e-12 * max([1, abs(observed)])
+    greater = (1 + np.sum(null >= observed - tolerance)) / (1 + len(null))
+    less = (1 + np.sum(null <= observed + tolerance)) / (1 + len(null))
+    p_values = {'greater': greater, 'less': less,
+                'two-sided': min([1, 2 * min([greater, less])])}
+    return observed, p_values[alternative]
+
+
+@instrumented
+def bootstrap_ci(metric, l1, l2, n_resamples = 9999, confidence_level = 0.95,
+                 method = 'percentile', batch_size = 100, seed = None,
+                 processes = 1):
+    """A bootstrap confidence interval for [metric], resampling pairs of values
+    (an item's value in l1 and l2) w/ replacement. Resamples where the metric is
+    undefined (ex. every value is tied) are left out.
+
+    The resamples are drawn as (batch_size x n) arrays of indices, and a named
+    metric is computed for the whole batch at once, as in permutation_test.
+
+    Parameters
+    ----------
+    metric: str or function
+        see permutation_test
+    l1: list or RankedList
+        a list of values
+    l2: list or RankedList
+        a list of values
+    n_resamples: int (default is 9999)
+        number of bootstrap resamples
+    confidence_level: float (default is 0.95)
+        the confidence level of the interval
+    method: str (default is percentile)
+        percentile -> the percentiles of the resampled values
+        basic -> the percentiles reflected around the observed value
+    batch_size: int (default is 100)
+        number of resamples in each batch
+    seed: int (default is None)
+        seed for the resamples
+    processes: int (default is 1)
+        number of worker processes to resample w/, None to use one per CPU
+
+    Returns
+    -------
+    (low, high), the bounds of the interval
+    """
+    assert 0 < confidence_level < 1, 'confidence_level must be in (0, 1)'
+    assert method in ['percentile', 'basic'], 'incorrect method'
+    observed, resampled = resample('bootstrap', metric, l1, l2, n_resamples,
+                                   batch_size, seed, processes)
+    alpha = 1 - confidence_level
+    low, high = np.nanpercentile(resampled, [100 * alpha / 2,
+                                             100 * (1 - alpha / 2)])
+    if method == 'basic':
+        low, high = 2 * observed - high, 2 * observed - low
+    return low, high
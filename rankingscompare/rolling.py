@@ -0,0 +1,283 @@
+"""rolling.py - rank correlations over a sliding window of paired observations,
+ex. to monitor the stability of a ranking over time.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+from .instrumentation import instrumented
+from .spearman import pearson_r
+from .tau import tau_b_from_stats
+from .utilities import *
+
+SMALL_NODE = 16  # -- nodes up to this size are compared pairwise (see below)
+
+
+def window_ties(codes, window):
+    """For each pair t, the number of pairs in (t - window, t) and in
+    (t, t + window) w/ the same code, from the positions of each code in
+    sorted order.
+    """
+    n = len(codes)
+    t = np.arange(n)
+    keys = codes.astype(np.int64) * n + t
+    sorted_keys = np.sort(keys)
+    rank = np.searchsorted(sorted_keys, keys)
+    # -- the first position of the code in each window ending (starting) at t
+    first = np.searchsorted(sorted_keys,
+                            keys - t + np.maximum(t - window + 1, 0))
+    last = np.searchsorted(sorted_keys, keys - t + np.minimum(t + window, n))
+    return rank - first, last - rank - 1
+
+
+def window_distinct(codes, window):
+    """The number of distinct codes in every window. Each code is counted at
+    its last occurrence in the window, so each pair of consecutive occurrences
+    less than [window] apart is subtracted from the windows that contain both.
+    """
+    n = len(codes)
+    keys = codes.astype(np.int64) * n + np.arange(n)
+    order = np.sort(keys) % n
+    same = codes[order[1:]] == codes[order[:-1]]
+    earlier, later = order[:-1][same], order[1:][same]
+    close = later - earlier < window
+    earlier, later = earlier[close], later[close]
+    # -- the windows starting at later - window + 1, ..., earlier contain both
+    repeats = np.bincount(np.maximum(later - window + 1, 0),
+                          minlength = n - window + 2)
+    repeats -= np.bincount(
+        np.minimum(earlier + 1, n - window + 1), minlength = n - window + 2)
+    return window - np.cumsum(repeats)[:n - window + 1]
+
+
+def node_discordances(x_codes, y_codes, joint, level, lefts, rights, before,
+                      after):
+    """Count the discordant pairs of each query pair t w/ the pairs in a node,
+    the 2 ** level pairs j * 2 ** level, ..., (j + 1) * 2 ** level - 1, and add
+    them to before[t] and after[i] for each pair i of the node. lefts and
+    rights are (nodes, queries), and a query is in each at most once per level.
+    joint are the ranks of the pairs' (x, y) codes.
+
+    Small nodes are compared pairwise. Otherwise, each node's pairs and queries
+    are laid out in a group of 4 * 2 ** level slots (pairs, queries from lefts,
+    queries from rights, padding), and sorted by (x, y). A pair and a query are
+    then discordant iff their y's are inverted, which a bottom-up merge sort of
+    the y's counts per slot, as in knights_algo.count_swaps: the queries count
+    the node's pairs in the other half of each block that they're inverted w/
+    and vice versa, from a cumulative sum of both halves' counts.
+    """
+    size, n = 2 ** level, len(x_codes)
+    nodes = np.concatenate([lefts[0], rights[0]])
+    queries = np.concatenate([lefts[1], rights[1]])
+    if size <= SMALL_NODE:
+        xq, yq = x_codes[queries], y_codes[queries]
+        counts = np.zeros(len(queries), dtype = np.int64)
+        for i in range(size):
+            pairs = nodes * size + i
+            discordant = (np.sign(x_codes[pairs] - xq) *
+                          np.sign(y_codes[pairs] - yq) < 0)
+            counts += discordant
+            after += np.bincount(pairs, discordant, n).astype(np.int64)
+        before += np.bincount(queries, counts, n).astype(np.int64)
+        return
+    slots = 4 * size
+    bits, groups = (slots - 1).bit_length(), -(-n // size)
+    ids = np.full(groups * slots, -1, dtype = np.int64)
+    kinds = np.zeros(groups * slots, dtype = np.int64)  # -- 1: pair, 2: query
+    pairs = np.arange(n)
+    pair_slots = pairs // size * slots + pairs % size
+    ids[pair_slots], kinds[pair_slots] = pairs, 1
+    for k, (part_nodes, part_queries) in enumerate([lefts, rights]):
+        at = part_nodes * slots + (k + 1) * size + part_queries % size
+        ids[at], kinds[at] = part_queries, 2
+    # -- in (x, y) order, w/ the padding last
+    local = np.arange(groups * slots) & (slots - 1)
+    packed = np.where(ids >= 0, joint[ids], n) << bits | local
+    packed = packed.reshape(groups, slots)
+    packed.sort(axis = -1)
+    order = packed & (slots - 1)
+    slot_ids = np.take_along_axis(ids.reshape(groups, slots), order, axis = 1)
+    # -- y, then position in (x, y) order, then kind
+    packed = (y_codes[slot_ids] << bits | np.arange(slots)) << 2 \
+        | np.take_along_axis(kinds.reshape(groups, slots), order, axis = 1)
+    counts = np.zeros(groups * slots, dtype = np.int64)
+    rows = (np.arange(groups) * slots)[:, None]
+    low = 2 ** 32 - 1
+    shift = 1
+    while 2 ** (shift - 1) < slots:
+        width = 2 ** shift
+        packed.reshape(groups, -1, width).sort(axis = -1)
+        # -- kind, and whether in the right half of the block
+        state = (packed & 3) << 1 | packed >> shift + 1 & 1
+        # -- counts of pairs (queries) in the left half | right half << 32
+        pair_weights = np.array([0, 0, 1, 2 ** 32, 0, 0])[state]
+        query_weights = np.array([0, 0, 0, 0, 1, 2 ** 32])[state]
+        pair_weights = pair_weights.reshape(groups, -1, width)
+        query_weights = query_weights.reshape(groups, -1, width)
+        pairs_before = np.cumsum(pair_weights, axis = -1) - pair_weights
+        queries_before = np.cumsum(query_weights, axis = -1) - query_weights
+        state = state.reshape(pairs_before.shape)
+        is_query = state >= 4
+        other_before = np.where(is_query, pairs_before, queries_before)
+        other_total = np.where(
+            is_query, pairs_before[..., -1:] + pair_weights[..., -1:],
+            queries_before[..., -1:] + query_weights[..., -1:])
+        # -- left half: right half's before it (smaller y); right half: left
+        # half's after it (larger y)
+        inverted = np.where(state & 1, other_total - other_before & low,
+                            other_before >> 32)
+        counts[(rows + (packed >> 2 & (slots - 1))).ravel()] += \
+            inverted.ravel()
+        shift += 1
+    by_slot = np.zeros((groups, slots), dtype = np.int64)
+    np.put_along_axis(by_slot, order, counts.reshape(groups, slots), axis = 1)
+    by_slot = by_slot.ravel()
+    after += by_slot[pair_slots]
+    before += np.bincount(ids[kinds == 2], by_slot[kinds == 2],
+                          n).astype(np.int64)
+
+
+def window_discordances(x_codes, y_codes, window):
+    """For each pair t, the number of pairs in (t - window, t) and in
+    (t, t + window) that are discordant w/ it.
+
+    The pairs before each t are split into O(log window) aligned nodes, as in
+    a segment tree, at most two per level, and all of the queries of a level
+    are counted at once (see node_discordances). That's O(n log^2 window) in
+    all, and each discordant pair is counted once, for both of its pairs.
+    """
+    n = len(x_codes)
+    x_codes, y_codes = x_codes.astype(np.int64), y_codes.astype(np.int64)
+    joint = np.unique(x_codes * (y_codes.max() + 1) + y_codes,
+                      return_inverse = True)[1].ravel()
+    before = np.zeros(n, dtype = np.int64)
+    after = np.zeros(n, dtype = np.int64)
+    t = np.arange(n)
+    start, stop, level = np.maximum(t - window + 1, 0), t.copy(), 0
+    while (start < stop).any():
+        active = start < stop
+        left = active & (start % 2 == 1)
+        right = active & (stop % 2 == 1)
+        stop -= right
+        node_discordances(x_codes, y_codes, joint, level,
+                          (start[left], t[left]),
+                          (stop[right], t[right]), before, after)
+        start, stop, level = (start + left) // 2, stop // 2, level + 1
+    return before, after
+
+
+def window_totals(before, after, window):
+    """The totals over every window of counts of pairs of pairs (see
+    window_discordances): those w/ the later pair in the window, minus those
+    w/ the earlier pair before it.
+    """
+    totals = np.cumsum(before)[window - 1:]
+    totals[1:] -= np.cumsum(after)[:len(totals) - 1]
+    return totals
+
+
+@instrumented
+def rolling_tau_stats(x, y, window):
+    """The statistics returned by tau_stats for every window of [window]
+    consecutive pairs of x and y: pairs 0, ..., window - 1, then 1, ...,
+    window, and so on.
+
+    Instead of recounting every window, each pair's discordances and ties w/
+    the pairs up to [window] - 1 before and after it are counted, and each
+    window's totals are those of its pairs w/ the pairs before them, minus
+    those of the pairs before the window w/ the pairs after them. The counts
+    are made offline for all of the pairs at once (see window_discordances),
+    which is O(log^2 window) per step, and the concordant pairs are the rest.
+
+    Parameters
+    ----------
+    x : list of floats/ints
+        first variable, in time order
+    y : list of floats/ints
+        second variable, paired with x
+    window : int
+        number of consecutive pairs in each window
+
+    Returns
+    -------
+    a list of tuples of (pairs, concordant, discordant, l1_ties, l2_ties,
+    joint_ties, m), one per window
+    """
+    assert len(x) == len(y), 'x and y must be paired data w/ equal length'
+    assert 1 < window <= len(x), 'window is out of bounds!'
+    _, x_codes = np.unique(x, return_inverse = True)
+    _, y_codes = np.unique(y, return_inverse = True)
+    x_codes, y_codes = x_codes.ravel(), y_codes.ravel()
+    joint_codes = x_codes * (y_codes.max() + 1) + y_codes
+    discordant = window_totals(
+        *window_discordances(x_codes, y_codes, window), window = window)
+    l1_ties, l2_ties, joint_ties = [
+        window_totals(*window_ties(codes, window), window = window)
+        for codes in [x_codes, y_codes, joint_codes]]
+    pairs = window * (window - 1) // 2
+    concordant = pairs - discordant - l1_ties - l2_ties + joint_ties
+    m = np.minimum(window_distinct(x_codes, window),
+                   window_distinct(y_codes, window))
+    return [(pairs,) + stats for stats in zip(
+        concordant.tolist(), discordant.tolist(), l1_ties.tolist(),
+        l2_ties.tolist(), joint_ties.tolist(), m.tolist())]
+
+
+@instrumented
+def rolling_tau_b(x, y, window):
+    """Kendall's tau-b for every window of [window] consecutive pairs of x and
+    y, see rolling_tau_stats.
+
+    Returns
+    -------
+    array of tau-b's, one per window, the first for pairs 0, ..., window - 1
+    """
+    return tau_b_from_stats(np.array(rolling_tau_stats(x, y, window)).T)
+
+
+def sliding_windows(values, window):
+    """A read-only (len(values) - window + 1, window) view of every window of
+    [window] consecutive values, without copying them.
+    """
+    values = np.ascontiguousarray(values)
+    stride = values.strides[0]
+    windows = as_strided(values, (len(values) - window + 1, window),
+                         (stride, stride))
+    windows.flags.writeable = False
+    return windows
+
+
+@instrumented
+def rolling_spearman_rho(x, y, window, reverse = True, chunk_size = 2 ** 20):
+    """Spearman's rho for every window of [window] consecutive pairs of x and y.
+
+    Adding a pair to a window can shift the ranks of every other pair in it, so
+    unlike tau there is no cheap update from one window to the next. Instead,
+    the windows are views into x and y, and are ranked and correlated many rows
+    at a time (see utilities.to_rank and spearman.pearson_r).
+
+    Parameters
+    ----------
+    x : list of floats/ints
+        first variable, in time order
+    y : list of floats/ints
+        second variable, paired with x
+    window : int
+        number of consecutive pairs in each window
+    reverse : bool (default is True)
+        whether to rank values in descending order (True) or ascending order
+    chunk_size : int (default is 2 ** 20)
+        roughly the number of values to rank at a time
+
+    Returns
+    -------
+    array of Spearman's rho's, one per window
+    """
+    assert len(x) == len(y), 'x and y must be paired data w/ equal length'
+    assert 1 < window <= len(x), 'window is out of bounds!'
+    x_windows = sliding_windows(x, window)
+    y_windows = sliding_windows(y, window)
+    rows = max([chunk_size // window, 1])
+    return np.concatenate([
+        pearson_r(to_rank(x_windows[start:start + rows], reverse = reverse),
+                  to_rank(y_windows[start:start + rows], reverse = reverse))
+        for start in range(0, len(x_windows), rows)])
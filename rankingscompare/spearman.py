@@ -1,36 +1,43 @@
-from __future__ import division, print_function
-
 """spearman.py - the classic Spearman's rho and Spearman's Footrule.
 """
 
 import itertools
 import numpy as np
-from utilities import *
+from .instrumentation import instrumented, note_backend
+from .rankedlist import RankedList, ranks_of, savage_scores_of
+from .utilities import *
 
 
 def variance(l1, bessel_correction = True):
-    """Variance of a list or array of numbers.
+    """Variance of a list or array of numbers (of each row of a 2-D array).
     """
-    l1 = np.array(l1)
-    return sum(np.square(l1 - np.mean(l1))) / (len(l1) - bessel_correction)
+    l1 = np.asarray(l1)
+    deviations = l1 - np.mean(l1, axis = -1, keepdims = True)
+    return np.sum(np.square(deviations), axis = -1) / (l1.shape[-1] -
+                                                       bessel_correction)
 
 
 def std_dev(l1):
-    """Standard deviation of a list or array of numbers.
+    """Standard deviation of a list or array of numbers (of each row of a 2-D
+    array).
     """
     return np.sqrt(variance(l1))
 
 
 def covariance(l1, l2, bessel_correction = True):
-    """Covariance of two lists or arrays of numbers.
+    """Covariance of two lists or arrays of numbers (of each pair of rows of two
+    2-D arrays).
     """
-    l1, l2 = np.array(l1), np.array(l2)
-    assert len(l1) == len(l2), 'lists/arrays must be of same length!'
-    product_sum = sum((l1 - np.mean(l1)) * (l2 - np.mean(l2)))
-    return product_sum / (len(l1) - bessel_correction)
+    l1, l2 = np.asarray(l1), np.asarray(l2)
+    assert l1.shape == l2.shape, 'lists/arrays must be of same length!'
+    product_sum = np.sum((l1 - np.mean(l1, axis = -1, keepdims = True)) *
+                         (l2 - np.mean(l2, axis = -1, keepdims = True)),
+                         axis = -1)
+    return product_sum / (l1.shape[-1] - bessel_correction)
 
 
-def pearson_r(X, Y):
+@instrumented
+def pearson_r(X, Y, dtype = np.float64):
     """Pearson's product-moment correlation coefficient, which measures the
     linear association between two continuous random variables. If the two
     variables are bivariate normal, this measure provides an exhaustive
@@ -41,22 +48,38 @@ def pearson_r(X, Y):
     correlation coefficient. If two random variables are not continous and
     instead are ordinal, Pearson's correlation is not appropriate.
 
+    The means are subtracted once, and the cross product and sums of squares of
+    the centered variables are then reduced without any further temporary
+    arrays (the Bessel corrections of the covariance and standard deviations
+    cancel out).
+
     Parameters
     ----------
-    X : list of floats/ints
-        first continous random variable
-    X : list of floats/ints
-        second continous random variable
+    X : list of floats/ints, or 2-D array
+        first continous random variable (one per row for a 2-D array)
+    X : list of floats/ints, or 2-D array
+        second continous random variable (one per row for a 2-D array)
+    dtype : numpy dtype (default is np.float64)
+        the float type to compute and accumulate in, ex. np.float32 to halve the
+        memory used at the cost of precision
 
     Returns
     -------
-    Pearson's correlation in [-1, 1], a float
+    Pearson's correlation in [-1, 1], a float (an array of them for 2-D arrays)
     """
-    assert len(X) == len(Y), 'list inputs must be paired aka of = length!'
-    return covariance(X, Y) / (std_dev(X) * std_dev(Y))
-
-
-def spearman_rho(X, Y, reverse = True, ranks = False):
+    X, Y = np.asarray(X, dtype = dtype), np.asarray(Y, dtype = dtype)
+    assert X.shape == Y.shape, 'list inputs must be paired aka of = length!'
+    X = X - X.mean(axis = -1, keepdims = True, dtype = dtype)
+    Y = Y - Y.mean(axis = -1, keepdims = True, dtype = dtype)
+    product_sum = np.einsum('...i,...i->...', X, Y)
+    squares = np.einsum('...i,...i->...', X, X) * np.einsum('...i,...i->...',
+                                                            Y, Y)
+    return product_sum / np.sqrt(squares)
+
+
+@instrumented
+def spearman_rho(X, Y, reverse = True, ranks = False, tie_free = False,
+                 dtype = np.float64):
     """Spearman's rho, which is Pearson's correlation on the ranks of two random
     variables instead of their values (or, directly on inputted ranks if the
     values are not known - see the ranks = True argument).
@@ -66,27 +89,45 @@ def spearman_rho(X, Y, reverse = True, ranks = False):
     with large moments (outliers) are better handled by Spearman's correlation
     than Pearson's correlation.
 
+    When neither variable has ties, Spearman's rho is 1 - 6 * sum(d^2) / (n *
+    (n^2 - 1)), where d are the differences between the ranks, which only needs
+    one pass over the ranks. This closed form is used when both X and Y are
+    RankedLists without ties, or when tie_free is True.
+
     Parameters
     ----------
-    X : list of floats/ints
-        first continous random variable
-    X : list of floats/ints
-        second continous random variable
+    X : list of floats/ints, RankedList or 2-D array
+        first continous random variable (one per row for a 2-D array)
+    X : list of floats/ints, RankedList or 2-D array
+        second continous random variable (one per row for a 2-D array)
     reverse : bool (default is True)
         whether to rank values in descending order (True) or ascending order
     ranks : bool (default is False)
         Are X and Y lists of values, or ranks? False indicates that these are
         lists of values, True indicates that the lists contain ranks.
+    tie_free : bool (default is False)
+        Set to True if it is known that neither X nor Y has ties, to use the
+        closed form. Gives the wrong answer if there are ties!
+    dtype : numpy dtype (default is np.float64)
+        the float type to compute and accumulate in, see pearson_r
 
     Returns
     -------
-    Spearman's rho : float in [-1, 1]
+    Spearman's rho : float in [-1, 1] (an array of them for 2-D arrays)
     """
-    if not ranks:
-        X, Y = to_rank(X, reverse = reverse), to_rank(Y, reverse = reverse)
-    return pearson_r(X, Y)
-
-
+    tie_free = tie_free or (isinstance(X, RankedList) and not X.has_ties and
+                            isinstance(Y, RankedList) and not Y.has_ties)
+    X, Y = ranks_of(X, reverse, ranks), ranks_of(Y, reverse, ranks)
+    note_backend('closed_form' if tie_free else 'pearson')
+    if not tie_free:
+        return pearson_r(X, Y, dtype)
+    differences = np.asarray(X, dtype = dtype) - np.asarray(Y, dtype = dtype)
+    n = differences.shape[-1]
+    squares = np.einsum('...i,...i->...', differences, differences)
+    return 1 - 6 * squares / (n * (np.power(n, 2, dtype = dtype) - 1))
+
+
+@instrumented
 def top_down_correlation(X, Y, reverse = True, ranks = False):
     """Top-down correlation coefficient introduced by Iman and Conover [1987],
     that is essentially Spearman's rho, but on Savage scores instead of ranks.
@@ -99,12 +140,16 @@ def top_down_correlation(X, Y, reverse = True, ranks = False):
     vector [1, 2, 3, 4], and we want to know the savage score of the second
     element, rank 2, we would sum 1/2, 1/3 and 1/4.
 
+    The Savage scores are computed in O(n) from the ranks (see
+    utilities.to_savage_scores), so this is O(n log n) overall. Passing 2-D
+    arrays computes the top-down correlation of each pair of rows at once.
+
     Parameters
     ----------
-    X : list of floats/ints
-        first continous random variable
-    X : list of floats/ints
-        second continous random variable
+    X : list of floats/ints, RankedList or 2-D array
+        first continous random variable (one per row for a 2-D array)
+    X : list of floats/ints, RankedList or 2-D array
+        second continous random variable (one per row for a 2-D array)
     reverse : bool (default is True)
         whether to rank values in descending order (True) or ascending order
     ranks : bool (default is False)
@@ -113,15 +158,16 @@ def top_down_correlation(X, Y, reverse = True, ranks = False):
 
     Returns
     -------
-    Spearman's rho : float in [-1, 1]
+    top-down correlation : float in [-1, 1] (an array of them for 2-D arrays)
     """
-    assert len(X) == len(Y), 'list inputs must be paired aka of = length!'
-    if not ranks:
-        X, Y = to_rank(X, reverse = reverse), to_rank(Y, reverse = reverse)
-    X, Y = to_savage_scores(X), to_savage_scores(Y)
+    assert np.shape(X) == np.shape(Y), \
+        'list inputs must be paired aka of = length!'
+    X = savage_scores_of(X, reverse, ranks)
+    Y = savage_scores_of(Y, reverse, ranks)
     return pearson_r(X, Y)
 
 
+@instrumented
 def spearman_footrule(X, Y, reverse = True, ranks = False, measure = 'raw'):
     """Spearman's Footrule (Fr), the Manhatten distance between the ranks of two
     random variables. Not top-weighted. A major weakness is that it only takes
@@ -129,9 +175,9 @@ def spearman_footrule(X, Y, reverse = True, ranks = False, measure = 'raw'):
 
     Parameters
     ----------
-    X : list of floats/ints
+    X : list of floats/ints, or RankedList
         first continous random variable
-    X : list of floats/ints
+    X : list of floats/ints, or RankedList
         second continous random variable
     reverse : bool (default is True)
         whether to rank values in descending order (True) or ascending order
@@ -157,6 +203,5 @@ def spearman_footrule(X, Y, reverse = True, ranks = False, measure = 'raw'):
         NFr = spearman_footrule(X, Y, reverse, ranks, 'raw') / max_sf
         return {'distance': NFr, 'similarity': 1 - NFr}[measure]
     else:
-        if not ranks:
-            X, Y = to_rank(X, reverse = reverse), to_rank(Y, reverse = reverse)
+        X, Y = ranks_of(X, reverse, ranks), ranks_of(Y, reverse, ranks)
         return int(sum([np.absolute(xi - yi) for xi, yi in zip(X, Y)]))
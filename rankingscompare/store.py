@@ -0,0 +1,113 @@
+"""store.py - scoring stores of rankings that are too big to fit in memory: .npy
+files w/ one ranking (list of values) per row, opened as memory maps and scored
+a fixed number of rows at a time into an output memory map.
+"""
+
+import os
+import numpy as np
+from .instrumentation import instrumented
+from .resampling import batch_statistic
+from .utilities import *
+
+
+def open_store(path):
+    """Open the (rows x n) .npy file at [path] as a read-only memory map, w/o
+    reading it into memory.
+    """
+    store = np.load(path, mmap_mode = 'r')
+    assert store.ndim == 2, 'a store must be a 2-D array w/ one ranking per row'
+    return store
+
+
+def row_codes(values):
+    """Dense-enough integer codes of the values of each row of a 2-D array, for
+    the batched kernels (see knights_algo.batch_tau_stats): tied values get the
+    same code, and smaller values get smaller codes.
+    """
+    return to_rank(values, ties = 'same', reverse = False).astype(np.int64) - 1
+
+
+def progress_path(output):
+    """The file that records the next row to score into [output].
+    """
+    return output + '.progress'
+
+
+def chunk_bounds(rows, chunk_size, start_row = 0):
+    """(first row, row after the last) for every chunk of [chunk_size] rows,
+    from row [start_row] on.
+    """
+    for start in range(start_row, rows, chunk_size):
+        yield start, min([start + chunk_size, rows])
+
+
+@instrumented
+def score_stores(path1, path2, output, metric = 'tau_b', chunk_size = 4096,
+                 start_row = None):
+    """[metric] between each row of the store at path1 and the same row of the
+    store at path2, written to the .npy file at [output]. The stores are memory
+    maps, so only one chunk of [chunk_size] rows of each is in memory at a
+    time: each chunk is ranked and scored at once, w/ the batched kernels (see
+    resampling.batch_statistic), and written straight into the output memory
+    map.
+
+    After each chunk the output is flushed and the next row is recorded in
+    output + '.progress', so an interrupted run picks up where it stopped when
+    it is run again, w/ any chunk_size. The progress file is removed once
+    every row is scored.
+
+    Parameters
+    ----------
+    path1 : str
+        .npy file of a (rows x n) array, one ranking (list of values) per row
+    path2 : str
+        .npy file of a (rows x n) array, paired row by row w/ path1
+    output : str
+        .npy file to write the (rows,) array of scores to
+    metric : str or function (default is tau_b)
+        tau_b, gamma, sommers_d, spearman_rho or spearman_footrule, or a
+        function of two rankings that is called on each pair of rows
+    chunk_size : int (default is 4096)
+        number of rows to score at a time
+    start_row : int (default is None)
+        row to start (or resume) from, w/ the rows before it left as they are
+        in output. By default, the row recorded in the progress file if there
+        is one, and otherwise 0 (a new output file).
+
+    Returns
+    -------
+    the scores, as a read-only memory map of output
+    """
+    assert callable(metric) or metric in [
+        'tau_b', 'gamma', 'sommers_d', 'spearman_rho', 'spearman_footrule'], \
+        'incorrect metric'
+    assert chunk_size > 0, 'chunk_size must be positive'
+    store1, store2 = open_store(path1), open_store(path2)
+    assert store1.shape == store2.shape, 'the stores must have the same shape'
+    progress = progress_path(output)
+    if start_row is None:
+        start_row = 0
+        if os.path.exists(progress):
+            with open(progress) as f:
+                start_row = int(f.read())
+    assert 0 <= start_row <= len(store1), 'start_row is past the last row'
+    if start_row > 0:
+        scores = np.load(output, mmap_mode = 'r+')
+        assert scores.shape == store1.shape[:1], \
+            'output has a different number of rows, can\'t resume'
+    else:
+        scores = np.lib.format.open_memmap(output, mode = 'w+',
+                                           dtype = np.float64,
+                                           shape = store1.shape[:1])
+    for start, stop in chunk_bounds(len(store1), chunk_size, start_row):
+        X, Y = store1[start:stop], store2[start:stop]
+        if not callable(metric):
+            X, Y = row_codes(X), row_codes(Y)
+        scores[start:stop] = batch_statistic(metric, X, Y)
+        scores.flush()
+        with open(progress, 'w') as f:
+            f.write(str(stop))
+    del scores
+    if os.path.exists(progress):
+        os.remove(progress)
+    return np.load(output, mmap_mode = 'r')
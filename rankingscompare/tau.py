@@ -1,28 +1,69 @@
-from __future__ import division, print_function
-
 """tau.py - rank correlation metrics that basically measure the probability of
 concordance minus the probability of discordance.
 """
 
 import itertools
+import multiprocessing
 import numpy as np
-from utilities import *
+from .backends import choose_backend
+from .external import external_tau_stats
+from .instrumentation import instrumented, note_backend
+from .knights_algo import (count_lower_left, knights_algorithm,
+                           ranked_above_in_both, weighted_tau_stats)
+from .rankedlist import ranked, ranks_of
+from .utilities import *
 from warnings import warn
 
 
-def tau_stats(l1, l2):
+@instrumented
+def tau_stats(l1, l2, backend = 'auto'):
     """Calculates the statistics used to compute the various correlation
-    statistics based on Kendall's tau given two lists of numbers, and a list of
-    tuples, which each tuple consisting of a pair of indexes that can be used to
-    index either l1 or l2. Computing these is O(n^2).
+    statistics based on Kendall's tau given two lists of numbers: the number of
+    pairs, concordant pairs, discordant pairs, pairs tied in l1, pairs tied in
+    l2, pairs tied in both l1 and l2, and the smaller of the number of distinct
+    values in l1 and l2. Pairs tied in both lists are included in both l1_ties
+    and l2_ties.
+
+    Parameters
+    ----------
+    l1: list or RankedList
+        a list of values
+    l2: list or RankedList
+        a list of values
+    backend: str (default is auto)
+        auto -> pairwise for lists shorter than a crossover length, which
+            depends on whether they're lists or arrays, knight otherwise.
+            See backends.py.
+        knight -> Knight's algorithm, O(n log n), see knights_algo.py
+        pairwise -> compare every combination of two pairs, O(n^2)
+        external -> Knight's algorithm w/ an external merge sort, for arrays
+            (ex. memory maps of .npy files) that don't fit in memory, see
+            external.external_tau_stats
+
+    Returns
+    -------
+    (pairs, concordant, discordant, l1_ties, l2_ties, joint_ties, m)
     """
+    assert backend in ['auto', 'knight', 'pairwise', 'external'], \
+        'incorrect backend'
     assert len(l1) == len(l2), 'l1 and l2 must be paired data w/ equal length'
+    if backend == 'auto':
+        backend = choose_backend('tau_stats', l1)
+    note_backend(backend)
+    if backend == 'knight':
+        return knights_algorithm(l1, l2)
+    if backend == 'external':
+        return external_tau_stats(l1, l2)
     combinations = list(itertools.combinations(range(len(l1)), 2))
     n, concordant, discordant, l1_ties, l2_ties = len(l1), 0, 0, 0, 0
     pairs, m = len(combinations), min([len(set(l1)), len(set(l2))])
+    joint_ties = 0
     for combo in combinations:
         xi, yi, xj, yj = l1[combo[0]], l2[combo[0]], l1[combo[1]], l2[combo[1]]
-        l1_sign, l2_sign = sign(xi - xj), sign(yi - yj)
+        # -- compared, not subtracted, which wraps around for unsigned ints
+        # and isn't defined for bools
+        l1_sign = int(xi > xj) - int(xi < xj)
+        l2_sign = int(yi > yj) - int(yi < yj)
         ties = l1_sign == 0 or l2_sign == 0
         if not ties:
             concordant += l1_sign == l2_sign
@@ -30,10 +71,21 @@ def tau_stats(l1, l2):
         else:
             l1_ties += l1_sign == 0
             l2_ties += l2_sign == 0
-    return pairs, concordant, discordant, l1_ties, l2_ties, m
+            joint_ties += l1_sign == 0 and l2_sign == 0
+    return pairs, concordant, discordant, l1_ties, l2_ties, joint_ties, m
 
 
-def tau_a(l1, l2):
+def tau_a_from_stats(stats):
+    """tau-a from the statistics returned by tau_stats.
+    """
+    pairs, concordant, discordant, l1_ties, l2_ties, joint_ties, m = stats
+    if l1_ties + l2_ties > 0:
+        warn('tau-a does not adjust for ties')
+    return (concordant - discordant) / pairs
+
+
+@instrumented
+def tau_a(l1, l2, backend = 'auto'):
     """tau-a, which does not account for ties. Inputs are two equal
     length lists with matching pairs at each index.
 
@@ -44,22 +96,33 @@ def tau_a(l1, l2):
 
     Parameters
     ----------
-    l1: list
+    l1: list or RankedList
         a list of values
-    l2: list
+    l2: list or RankedList
         a list of values
+    backend: str (default is auto)
+        how to count the pairs, see tau_stats
 
     Returns
     -------
     Kendall's tau-a: float in [-1, 1]
     """
-    pairs, concordant, discordant, l1_ties, l2_ties, m = tau_stats(l1, l2)
-    if l1_ties + l2_ties > 0:
-        warn('tau-a does not adjust for ties')
-    return (concordant - discordant) / pairs
+    return tau_a_from_stats(tau_stats(l1, l2, backend))
+
+
+def tau_b_from_stats(stats):
+    """tau-b from the statistics returned by tau_stats.
+    """
+    pairs, concordant, discordant, l1_ties, l2_ties, joint_ties, m = stats
+    # -- in floats, the product of the counts of long lists doesn't fit in an
+    # int64 (and isn't a numpy type at all if they're python ints)
+    denominator = np.sqrt(np.asarray(pairs - l1_ties, dtype = np.float64) *
+                          np.asarray(pairs - l2_ties, dtype = np.float64))
+    return (concordant - discordant) / denominator
 
 
-def tau_b(l1, l2):
+@instrumented
+def tau_b(l1, l2, backend = 'auto'):
     """tau-b, which accounts for ties. Most suitable for square tables.
 
     Kendall's tau is a rank correlation statisic for conjoint ranked lists that
@@ -69,31 +132,46 @@ def tau_b(l1, l2):
 
     Parameters
     ----------
-    l1: list
+    l1: list or RankedList
         a list of values
-    l2: list
+    l2: list or RankedList
         a list of values
+    backend: str (default is auto)
+        how to count the pairs, see tau_stats
 
     Returns
     -------
     Kendall's tau-b: float in [-1, 1]
     """
-    pairs, concordant, discordant, l1_ties, l2_ties, m = tau_stats(l1, l2)
-    denominator = np.sqrt((pairs - l1_ties) * (pairs - l2_ties))
-    return (concordant - discordant) / denominator
+    return tau_b_from_stats(tau_stats(l1, l2, backend))
 
 
-def tau_c(l1, l2):
-    """tau-c, optimized for larger, rectangular tables. No adjustment for ties.
+def tau_c_from_stats(stats, n):
+    """tau-c from the statistics returned by tau_stats for two lists of length
+    n.
     """
-    pairs, concordant, discordant, l1_ties, l2_ties, m = tau_stats(l1, l2)
+    pairs, concordant, discordant, l1_ties, l2_ties, joint_ties, m = stats
     if l1_ties + l2_ties > 0:
         warn('tau-c does not adjust for ties')
-    denominator = (2 * m) / (np.power(len(l1), 2) * (m - 1))
-    return (concordant - discordant) / denominator
+    return 2 * m * (concordant - discordant) / (np.float64(n) ** 2 * (m - 1))
+
+
+@instrumented
+def tau_c(l1, l2, backend = 'auto'):
+    """tau-c, optimized for larger, rectangular tables. No adjustment for ties.
+    """
+    return tau_c_from_stats(tau_stats(l1, l2, backend), len(l1))
+
+
+def gamma_from_stats(stats):
+    """Goodman - Kruskal Gamma from the statistics returned by tau_stats.
+    """
+    pairs, concordant, discordant, l1_ties, l2_ties, joint_ties, m = stats
+    return (concordant - discordant) / (concordant + discordant)
 
 
-def gamma(l1, l2):
+@instrumented
+def gamma(l1, l2, backend = 'auto'):
     """Goodman - Kruskal Gamma (G), very similar to Kendall's tau. Gamma is the
     difference in concordant pairs and discordant pairs as a percentage of all
     possible pairs, ignoring ties.
@@ -102,20 +180,38 @@ def gamma(l1, l2):
 
     Parameters
     ----------
-    l1: list
+    l1: list or RankedList
         a list of values
-    l2: list
+    l2: list or RankedList
         a list of values
+    backend: str (default is auto)
+        how to count the pairs, see tau_stats
 
     Returns
     -------
     Goodman - Kruskal Gamma: float in [-1, 1]
     """
-    pairs, concordant, discordant, l1_ties, l2_ties, m = tau_stats(l1, l2)
-    return (concordant - discordant) / (concordant + discordant)
+    return gamma_from_stats(tau_stats(l1, l2, backend))
+
+
+def sommers_d_from_stats(stats, dependent = 'symmetric'):
+    """Somers' D from the statistics returned by tau_stats. The symmetric
+    version uses the same statistics for both dependent variables.
+    """
+    assert dependent in ['symmetric', 'l1', 'l2'], 'incorrect dependent'
+    if dependent == 'symmetric':
+        return (sommers_d_from_stats(stats, 'l1') +
+                sommers_d_from_stats(stats, 'l2')) / 2
+    pairs, concordant, discordant, l1_ties, l2_ties, joint_ties, m = stats
+    denominators = {
+        'l1': concordant + discordant + l1_ties,
+        'l2': concordant + discordant + l2_ties
+    }
+    return (concordant - discordant) / denominators[dependent]
 
 
-def sommers_d(l1, l2, dependent = 'symmetric'):
+@instrumented
+def sommers_d(l1, l2, dependent = 'symmetric', backend = 'auto'):
     """Somers' D, a measure of ordinal association between l1 and l2. Similar to
     Kendall's tau and the Gamma statistic.
 
@@ -123,38 +219,131 @@ def sommers_d(l1, l2, dependent = 'symmetric'):
 
     Parameters
     ----------
-    l1: list
+    l1: list or RankedList
         a list of values
-    l2: list
+    l2: list or RankedList
         a list of values
     dependent: str (default is symmetric)
         Decides whether to make the l1 variable dependent, the l2 variable
         dependent, or being symmetric and taking the arithmetic mean of having
         each variable be dependent.
+    backend: str (default is auto)
+        how to count the pairs, see tau_stats
+
     Returns
     -------
     Sommers' D: float in [-1, 1]
     """
-    pairs, concordant, discordant, l1_ties, l2_ties, m = tau_stats(l1, l2)
-    if dependent == 'symmetric':
-        return (sommers_d(l1, l2, 'l1') + sommers_d(l1, l2, 'l2')) / 2
-    denominators = {
-        'l1': concordant + discordant + l1_ties,
-        'l2': concordant + discordant + l2_ties
-    }
-    return (concordant - discordant) / denominators[dependent]
+    return sommers_d_from_stats(tau_stats(l1, l2, backend), dependent)
+
+
+@instrumented
+def tau_stats_from_table(table):
+    """The statistics of tau_stats from an (r x c) contingency table instead of
+    two lists: table[i, j] is the number of observations w/ the i-th smallest
+    value of l1 and the j-th smallest value of l2. These are exactly the
+    statistics of the two lists the table counts, in O(r * c) however many
+    observations it counts.
+
+    Every observation in cell (i, j) is concordant w/ the observations in the
+    cells below and to the right of it, and discordant w/ those below and to
+    the left, so the pairs are counted w/ 2-D cumulative sums of the table from
+    its bottom corners. The tied pairs are counted from the row sums, the
+    column sums, and the cells.
+
+    Parameters
+    ----------
+    table : 2-D list or array of ints
+        non-negative counts, w/ the rows as the values of l1 and the columns as
+        the values of l2, both in ascending order
+
+    Returns
+    -------
+    the same tuple as tau_stats: (pairs, concordant, discordant, l1_ties,
+    l2_ties, joint_ties, m)
+    """
+    table = np.asarray(table)
+    assert table.ndim == 2, 'table must be a 2-D array of counts'
+    counts = table.astype(np.int64)
+    assert np.all(counts == table) and np.all(counts >= 0), \
+        'table must contain non-negative integer counts'
+    n = int(counts.sum())
+    # -- the products of the counts are up to n^2 / 2, which overflows an int64
+    # past about 3e9 observations, so count those in python ints
+    if n >= 2 ** 31:
+        counts = counts.astype(object)
+    # -- the observations below and to the right (left) of each cell
+    below_right, below_left = np.zeros((2,) + counts.shape,
+                                       dtype = counts.dtype)
+    below_right[:-1, :-1] = counts[::-1, ::-1].cumsum(0).cumsum(1)[
+        ::-1, ::-1][1:, 1:]
+    below_left[:-1, 1:] = counts[::-1].cumsum(0).cumsum(1)[::-1][1:, :-1]
+    rows, columns = counts.sum(axis = 1), counts.sum(axis = 0)
+    pairs = n * (n - 1) // 2
+    concordant = int((counts * below_right).sum())
+    discordant = int((counts * below_left).sum())
+    m = int(min([np.count_nonzero(rows), np.count_nonzero(columns)]))
+    l1_ties, l2_ties, joint_ties = [int((c * (c - 1) // 2).sum()) for c in
+                                    [rows, columns, counts]]
+    return pairs, concordant, discordant, l1_ties, l2_ties, joint_ties, m
+
 
+@instrumented
+def tau_b_from_table(table):
+    """tau-b of the two lists counted by a contingency table, see
+    tau_stats_from_table.
+    """
+    return tau_b_from_stats(tau_stats_from_table(table))
+
+
+@instrumented
+def tau_c_from_table(table):
+    """tau-c of the two lists counted by a contingency table, see
+    tau_stats_from_table. No adjustment for ties.
+    """
+    return tau_c_from_stats(tau_stats_from_table(table), int(np.sum(table)))
 
-def ap_correlation(l1, l2, symmetric = False, reverse = True):
+
+@instrumented
+def gamma_from_table(table):
+    """Goodman - Kruskal Gamma of the two lists counted by a contingency table,
+    see tau_stats_from_table.
+    """
+    return gamma_from_stats(tau_stats_from_table(table))
+
+
+@instrumented
+def sommers_d_from_table(table, dependent = 'symmetric'):
+    """Somers' D of the two lists counted by a contingency table, see
+    tau_stats_from_table. The rows are l1 and the columns are l2, for the
+    dependent variable (see sommers_d).
+    """
+    return sommers_d_from_stats(tau_stats_from_table(table), dependent)
+
+
+def ap_from_counts(above, ranks):
+    """AP correlation given the number of items ranked above each item in both
+    lists (see knights_algo.ranked_above_in_both), and the ranks of the items in
+    the list that is being compared to the definitive list.
+    """
+    ranks = np.asarray(ranks)
+    compared = ranks != 1  # -- can't be anything ranked higher than rank 1
+    prob_concordant = np.mean(above[compared] / (ranks[compared] - 1))
+    return 2 * prob_concordant - 1
+
+
+@instrumented
+def ap_correlation(l1, l2, symmetric = False, reverse = True,
+                   backend = 'auto'):
     """The AP correlation coefficient, proposed by Yilmaz et al. [2008] as an
     alternative version of Kendall's Tau that is top-weighted. Does not account
-    for ties! Implementation is O(n^2), until Knight's algorithm is implemented.
+    for ties!
 
     Parameters
     ----------
-    l1: list
+    l1: list or RankedList
         a list of values
-    l2: list
+    l2: list or RankedList
         a list of values
     symmetric: bool (default is False)
         AP correlation is not symmetric by default - l2 is the 'definitive'
@@ -164,18 +353,36 @@ def ap_correlation(l1, l2, symmetric = False, reverse = True):
         which ranked list is l1 and which is l2.
     reverse: bool (default is True)
         rank values in descending order (True) or ascending order (False)
+    backend: str (default is auto)
+        auto -> pairwise for lists shorter than a crossover length, knight
+            otherwise, see backends.py
+        knight -> count the items ranked above each item in both lists with a
+            merge sort, O(n log n). Both directions of the symmetric version
+            share the same counts.
+        pairwise -> compare every item to every item ranked above it, O(n^2)
 
     Returns
     -------
     AP correlation: float in [-1, 1]
     """
+    assert backend in ['auto', 'knight', 'pairwise'], 'incorrect backend'
+    if backend == 'auto':
+        backend = choose_backend('ap_correlation', l1)
+    note_backend(backend)
+    if backend == 'knight':
+        l1, l2 = ranked(l1, reverse), ranked(l2, reverse)
+        above = ranked_above_in_both(l1, l2)
+        if symmetric:
+            return (ap_from_counts(above, l1.ranks) +
+                    ap_from_counts(above, l2.ranks)) / 2
+        return ap_from_counts(above, l1.ranks)
     if symmetric:
-        l1_l2 = ap_correlation(l1, l2, False, reverse)
-        l2_l1 = ap_correlation(l2, l1, False, reverse)
+        l1_l2 = ap_correlation(l1, l2, False, reverse, backend)
+        l2_l1 = ap_correlation(l2, l1, False, reverse, backend)
         return (l1_l2 + l2_l1) / 2
     pos_rank = [[pos, rank] for pos, rank in
-                zip(range(0, len(l1)), to_rank(l1, reverse = reverse))]
-    l2_ranks = to_rank(l2, reverse = reverse)
+                zip(range(0, len(l1)), ranks_of(l1, reverse))]
+    l2_ranks = ranks_of(l2, reverse)
     rank_specific_prob_concordants = []  # -- prob concordant for each rank
     for pos, rank in pos_rank:
         Ci = 0
@@ -189,3 +396,193 @@ def ap_correlation(l1, l2, symmetric = False, reverse = True):
         rank_specific_prob_concordants.append(Ci / (rank - 1))
     prob_concordant = np.mean(rank_specific_prob_concordants)
     return 2 * prob_concordant - 1
+
+
+_tied_lists = None  # -- the RankedLists, in each worker process
+
+
+def _set_tied_lists(lists):
+    """Share the RankedLists with sample_ap_correlations (pool initializer).
+    """
+    global _tied_lists
+    _tied_lists = lists
+
+
+def sample_ap_correlations(batch):
+    """AP correlation of the lists in _tied_lists for a batch of random ways of
+    breaking their ties, given (number of samples, seed, symmetric).
+
+    Every sample breaks the ties in both lists at once, by sorting each list's
+    rank codes plus a uniform random number in [0, 1) along the rows of an
+    (samples x n) array. The items ranked above each item in both lists then
+    come from one row-wise count_lower_left.
+    """
+    size, seed, symmetric = batch
+    l1, l2 = _tied_lists
+    n, random = len(l1), np.random.RandomState(seed)
+    order1 = np.argsort(l1.rank_codes + random.random_sample((size, n)))
+    order2 = np.argsort(l2.rank_codes + random.random_sample((size, n)))
+    ranks2 = np.empty((size, n), dtype = np.int64)
+    np.put_along_axis(ranks2, order2,
+                      np.broadcast_to(np.arange(n), (size, n)), axis = -1)
+    ranks2 = np.take_along_axis(ranks2, order1, axis = -1)
+    above = count_lower_left(ranks2)
+    # -- in l1's order, the item at position p has p items ranked above it
+    correlations = 2 * (above[:, 1:] / np.arange(1, n)).mean(axis = -1) - 1
+    if symmetric:
+        l2_correlations = 2 * (above / np.maximum(ranks2, 1)).sum(
+            axis = -1) / (n - 1) - 1
+        correlations = (correlations + l2_correlations) / 2
+    return correlations
+
+
+@instrumented
+def ap_correlation_ties(l1, l2, samples = 1000, batch_size = 100, tol = None,
+                        seed = None, processes = 1, symmetric = False,
+                        reverse = True):
+    """AP correlation that accounts for ties, as proposed by Smucker et al.
+    [2013]: the mean AP correlation over random orders of the tied items in
+    both lists. For lists w/o ties, this is the same as ap_correlation.
+
+    The orders are drawn [batch_size] at a time, as one (batch_size x n) array,
+    and scored together (see sample_ap_correlations). Each batch gets its own
+    seed from [seed], so the result only depends on [seed] and the batch size,
+    not on the number of processes.
+
+    Parameters
+    ----------
+    l1: list or RankedList
+        a list of values
+    l2: list or RankedList
+        a list of values
+    samples: int (default is 1000)
+        the most random orders to average over
+    batch_size: int (default is 100)
+        the number of random orders in each batch
+    tol: float (default is None)
+        stop early, once a batch changes the running mean by less than [tol].
+        None to always use all of the samples
+    seed: int (default is None)
+        seed for the random orders
+    processes: int (default is 1)
+        number of worker processes to score the batches w/, None to use one
+        per CPU
+    symmetric: bool (default is False)
+        take the mean of f(l1, l2) and f(l2, l1), see ap_correlation
+    reverse: bool (default is True)
+        rank values in descending order (True) or ascending order (False)
+
+    Returns
+    -------
+    AP correlation: float in [-1, 1]
+    """
+    assert len(l1) == len(l2), 'l1 and l2 must be paired data w/ equal length'
+    assert samples > 0 and batch_size > 0, 'need at least one sample'
+    l1, l2 = ranked(l1, reverse), ranked(l2, reverse)
+    seeds = np.random.RandomState(seed).randint(
+        2 ** 31 - 1, size = -(-samples // batch_size))
+    batches = [(min([batch_size, samples - i * batch_size]), batch_seed,
+                symmetric) for i, batch_seed in enumerate(seeds)]
+    if processes == 1:
+        _set_tied_lists((l1, l2))
+        results = (sample_ap_correlations(batch) for batch in batches)
+    else:
+        pool = multiprocessing.Pool(processes, _set_tied_lists, ((l1, l2),))
+        results = pool.imap(sample_ap_correlations, batches)
+    total, count, mean = 0.0, 0, None
+    try:
+        for correlations in results:
+            total, count = total + correlations.sum(), count + len(correlations)
+            previous, mean = mean, total / count
+            if tol is not None and previous is not None and \
+                    abs(mean - previous) < tol:
+                break
+    finally:
+        if processes == 1:
+            _set_tied_lists(None)
+        else:
+            pool.terminate()
+            pool.join()
+    return mean
+
+
+def hyperbolic_weigher(ranks):
+    """Vigna's default weigher, 1 / (r + 1) for the ranks r = 0, 1, ...
+    """
+    return 1 / (np.asarray(ranks) + 1)
+
+
+def constant_weigher(ranks):
+    """Weighs every rank the same, for which weighted_tau is tau-b.
+    """
+    return np.ones(np.shape(ranks))
+
+
+def directed_weighted_tau(l1, l2, weigher, additive):
+    """Weighted tau w/ the importance of each item given by its rank in l1, ties
+    in l1 broken by l2 (see weighted_tau). NaN if either list is all ties.
+    """
+    n = len(l1)
+    importance = np.empty(n, dtype = np.int64)
+    order = np.argsort(l1.rank_codes.astype(np.int64) * len(l2.tie_counts) +
+                       l2.rank_codes, kind = 'mergesort')
+    importance[order] = np.arange(n)
+    pairs, concordant, discordant, l1_ties, l2_ties, _ = weighted_tau_stats(
+        l1, l2, weigher(importance), additive)
+    if pairs == l1_ties or pairs == l2_ties:
+        return np.nan
+    tau = (concordant - discordant) / np.sqrt((pairs - l1_ties) *
+                                              (pairs - l2_ties))
+    return min([1.0, max([-1.0, tau])])
+
+
+@instrumented
+def weighted_tau(l1, l2, weigher = 'hyperbolic', additive = True,
+                 symmetric = True, reverse = True):
+    """Vigna's weighted tau [2015], a top-weighted version of Kendall's tau-b
+    that handles ties. Each item gets a weight from its rank (by importance, 0
+    for the item ranked first), a pair of items weighs the sum (additive) or
+    product of their weights, and tau-b is computed w/ every concordance,
+    discordance and tie counted by its weight.
+
+    Unlike ap_correlation, which is O(n^2) when computed naively, the weighted
+    counts come from one weighted merge sort (Knight's algorithm, see
+    knights_algo.weighted_swaps), so this is O(n log n).
+
+    Parameters
+    ----------
+    l1: list or RankedList
+        a list of values
+    l2: list or RankedList
+        a list of values
+    weigher: str or function (default is hyperbolic)
+        hyperbolic -> 1 / (r + 1), for the ranks r = 0, 1, ...
+        constant -> every rank weighs 1, which gives tau-b
+        a function -> takes an array of the ranks r and returns an array of
+            their weights
+    additive: bool (default is True)
+        weigh a pair by the sum of its items' weights (True), or their product
+    symmetric: bool (default is True)
+        If False, the importance of the items is their rank in l1, w/ ties
+        broken by l2. If True, take the mean of that and the importance given
+        by l2, w/ ties broken by l1. The same as scipy.stats.weightedtau's
+        rank = True.
+    reverse: bool (default is True)
+        rank values in descending order (True) or ascending order (False)
+
+    Returns
+    -------
+    weighted tau: float in [-1, 1]
+    """
+    assert len(l1) == len(l2), 'l1 and l2 must be paired data w/ equal length'
+    assert weigher in ['hyperbolic', 'constant'] or callable(weigher), \
+        'incorrect weigher'
+    if weigher == 'hyperbolic':
+        weigher = hyperbolic_weigher
+    elif weigher == 'constant':
+        weigher = constant_weigher
+    l1, l2 = ranked(l1, reverse), ranked(l2, reverse)
+    if symmetric:
+        return (directed_weighted_tau(l1, l2, weigher, additive) +
+                directed_weighted_tau(l2, l1, weigher, additive)) / 2
+    return directed_weighted_tau(l1, l2, weigher, additive)
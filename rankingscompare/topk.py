@@ -0,0 +1,155 @@
+"""topk.py - distances between top-k lists that don't contain the same items,
+proposed by Fagin et al. [2003].
+"""
+
+import numpy as np
+from .instrumentation import instrumented
+from .knights_algo import count_swaps
+from .utilities import *
+
+
+def topk_matches(lists1, lists2):
+    """Match up the items of each pair of rows of two 2-D arrays of top-k lists.
+    Each row of lists1 and lists2 is concatenated and stable sorted, so that an
+    item in both lists ends up next to itself, w/ the copy from lists1 first.
+
+    Returns
+    -------
+    a tuple of two arrays: for each item of lists1 its (0-based) position in
+    the paired row of lists2, and for each item of lists2 its position in
+    lists1, -1 for items that aren't in the other list
+    """
+    lists1, lists2 = np.asarray(lists1), np.asarray(lists2)
+    assert lists1.ndim == 2 and lists2.ndim == 2 and \
+        len(lists1) == len(lists2), 'need two 2-D arrays w/ a row per pair'
+    k1 = lists1.shape[1]
+    items = np.concatenate([lists1, lists2], axis = 1)
+    order = np.argsort(items, axis = -1, kind = 'mergesort')
+    items = np.take_along_axis(items, order, axis = -1)
+    matched = items[:, 1:] == items[:, :-1]
+    rows = np.nonzero(matched)[0]
+    first, second = order[:, :-1][matched], order[:, 1:][matched]
+    assert np.all(first < k1) and np.all(second >= k1), \
+        'items must be unique within each list'
+    positions1 = np.full(lists1.shape, -1, dtype = np.int64)
+    positions2 = np.full(lists2.shape, -1, dtype = np.int64)
+    positions1[rows, first] = second - k1
+    positions2[rows, second - k1] = first
+    return positions1, positions2
+
+
+@instrumented
+def batch_kendall_topk(lists1, lists2, p = 0.5):
+    """Kendall's distance w/ penalty parameter p, K^(p), for each pair of rows
+    of two 2-D arrays of top-k lists, see kendall_topk.
+
+    Every pair of items in either list falls into one of Fagin et al.'s cases:
+    1) both items are in both lists: a penalty of 1 if they're in different
+    orders, the discordances from count_swaps, w/ the items that are only in
+    one list moved to the end and made larger than the rest so that they can't
+    be swapped. 2) both items are in one list, and only one of them is in the
+    other: a penalty of 1 if the missing item is ahead of the other in the list
+    they're both in, counted w/ a cumulative sum down the list. 3) one item is
+    only in each list: always a penalty of 1. 4) both items are only in one of
+    the lists: a penalty of p.
+
+    Returns
+    -------
+    array of K^(p) distances, one per pair of rows
+    """
+    assert 0 <= p <= 1, 'p must be in [0, 1]'
+    positions1, positions2 = topk_matches(lists1, lists2)
+    shared1, shared2 = positions1 >= 0, positions2 >= 0
+    k1, k2 = positions1.shape[1], positions2.shape[1]
+    # -- case 1, stable sort the shared items to the front of lists1
+    front = np.argsort(~shared1, axis = -1, kind = 'mergesort')
+    codes = np.where(shared1, positions1, k2 + np.arange(k1))
+    discordant = count_swaps(np.take_along_axis(codes, front, axis = -1))
+    # -- case 2, items only in one list that are ahead of shared items
+    ahead = 0
+    for shared in [shared1, shared2]:
+        missing = np.cumsum(~shared, axis = -1)
+        ahead = ahead + np.where(shared, missing, 0).sum(axis = -1)
+    # -- cases 3 and 4
+    only1, only2 = (~shared1).sum(axis = -1), (~shared2).sum(axis = -1)
+    unmatched = (only1 * (only1 - 1) + only2 * (only2 - 1)) // 2
+    return discordant + ahead + only1 * only2 + p * unmatched
+
+
+@instrumented
+def batch_footrule_topk(lists1, lists2, location = None):
+    """Spearman's footrule w/ location parameter l, F^(l), for each pair of rows
+    of two 2-D arrays of top-k lists, see footrule_topk.
+
+    Returns
+    -------
+    array of F^(l) distances, one per pair of rows
+    """
+    positions1, positions2 = topk_matches(lists1, lists2)
+    k1, k2 = positions1.shape[1], positions2.shape[1]
+    if location is None:
+        location = max([k1, k2]) + 1
+    assert location > max([k1, k2]), 'location must be past the end of a list'
+    ranks1, ranks2 = np.arange(1, k1 + 1), np.arange(1, k2 + 1)
+    # -- shared items are counted from lists1, missing items from either list
+    from1 = np.where(positions1 >= 0, np.absolute(ranks1 - positions1 - 1),
+                     location - ranks1)
+    from2 = np.where(positions2 >= 0, 0, location - ranks2)
+    return from1.sum(axis = -1) + from2.sum(axis = -1)
+
+
+@instrumented
+def kendall_topk(items1, items2, p = 0.5):
+    """Kendall's distance w/ penalty parameter p, K^(p), between two top-k lists
+    of items, proposed by Fagin et al. [2003]. The lists don't have to contain
+    the same items (or be the same length). Every pair of items in either list
+    adds 1 if the lists disagree on their order, and p if neither item is in
+    one of the lists, so it can't tell whether the lists disagree.
+
+    The items are matched up w/ one sort of both lists, and the discordances
+    between the shared items are counted w/ Knight's algorithm, so this is
+    O(k log k). See batch_kendall_topk to compare many pairs of lists at once.
+
+    Parameters
+    ----------
+    items1 : list
+        top-k list of unique items, in rank order
+    items2 : list
+        top-k list of unique items, in rank order
+    p : float (default is 0.5)
+        penalty for pairs of items that are only in one of the lists, in
+        [0, 1]. 0 is optimistic, 1/2 is neutral.
+
+    Returns
+    -------
+    K^(p) distance: float, 0 for identical lists
+    """
+    return float(batch_kendall_topk([items1], [items2], p)[0])
+
+
+@instrumented
+def footrule_topk(items1, items2, location = None):
+    """Spearman's footrule w/ location parameter l, F^(l), between two top-k
+    lists of items, proposed by Fagin et al. [2003]. The lists don't have to
+    contain the same items (or be the same length): an item that is missing
+    from a list is placed at rank l in that list, and the footrule is the sum of
+    the absolute differences in the ranks of every item in either list.
+
+    The items are matched up w/ one sort of both lists, so this is O(k log k).
+    See batch_footrule_topk to compare many pairs of lists at once.
+
+    Parameters
+    ----------
+    items1 : list
+        top-k list of unique items, in rank order
+    items2 : list
+        top-k list of unique items, in rank order
+    location : int (default is None)
+        the rank of missing items, past the end of both lists. By default,
+        1 + the length of the longer list, for Fagin et al.'s F*.
+
+    Returns
+    -------
+    F^(l) distance: int, 0 for identical lists
+    """
+    return int(batch_footrule_topk([items1], [items2], location)[0])
@@ -1,10 +1,9 @@
-from __future__ import division
-
 """utilities.py
 """
 
 import math
 import numpy as np
+from .instrumentation import instrumented
 
 
 def unique(list):
@@ -20,19 +19,35 @@ def ties(list):
     return not unique(list)
 
 
+def encoded(items):
+    """True if [items] is an array of integer codes (see encoding.Vocabulary),
+    which the set-based functions compare w/ NumPy instead of sets.
+    """
+    return isinstance(items, np.ndarray) and items.dtype.kind in 'iu'
+
+
 def conjoint(l1, l2):
     """True if l1 and l2 are conjoint, False otherwise.
     """
+    if encoded(l1) and encoded(l2):
+        return np.array_equal(np.unique(l1), np.unique(l2))
     return len(set(l1) - set(l2)) == 0 and len(set(l2) - set(l1)) == 0
 
 
-def to_rank(mylist, ties = 'midrank', reverse = True):
-    """Create a list of ranks corresponding to a list of integers or floats.
+@instrumented
+def to_rank(values, ties = 'midrank', reverse = True, axis = -1):
+    """Create an array of ranks corresponding to an array of integers or floats.
+    A 2-D array is ranked one row (or column, see [axis]) at a time.
+
+    The values are argsorted once, the groups of tied values are found from
+    where the sorted values change, and the ranks of each group are filled in
+    with running maximums/minimums of the group boundaries, so there is no
+    per-element Python work.
 
     Parameters
     ----------
-    list : list
-        List of floats or integers
+    values : list or array
+        1-D or 2-D list or array of floats or integers
     ties : str
         How to deal with ties. Options are
         midrank -> mean of the positions that ties are occupying
@@ -43,58 +58,66 @@ def to_rank(mylist, ties = 'midrank', reverse = True):
         If True, higher numbers correspond to higher ranks (aka 1, 2, ...) and
         lower numbers correspond to lower ranks (ex. 15, 14, ...). If False,
         the opposite happens.
+    axis : int (default is -1)
+        the axis to rank along, only matters for 2-D arrays. The default of -1
+        ranks each row, 0 ranks each column.
 
     Returns
     -------
-    a list of floats corresponding to the ranks of the items in [list]
+    an array of ranks with the same shape as [values], floats for the midrank
+    method and ints otherwise
     """
-    assert all([isinstance(item, float) or isinstance(item, int)
-                for item in mylist]), 'list must be a list of floats or ints!'
+    values = np.asarray(values)
+    assert values.dtype.kind in 'biuf', 'values must be floats or ints!'
+    assert values.ndim in [1, 2], 'values must be 1-D or 2-D!'
     assert ties in ['midrank', 'same', 'arbitrary', 'notallowed'], \
         'incorrect ties method'
-    data = sorted([[item, i] for i, item in enumerate(mylist)],
-        reverse = reverse)
+    values = np.moveaxis(values, axis, -1)
+    n = values.shape[-1]
+    order = np.argsort(values, axis = -1, kind = 'mergesort')
+    if reverse:
+        order = order[..., ::-1]
+    positions = np.broadcast_to(np.arange(1, n + 1), values.shape)
     if ties == 'arbitrary':
-        ranks = [pos + 1 for pos, (item, i) in enumerate(data)]
+        sorted_ranks = positions
     else:
-        ranks = []
-        current_ties, ties_end = [], False
-        for pos, (item, i) in enumerate(data):
-            try:
-                if item == data[pos + 1][0]:
-                    current_ties.append(pos + 1)
-                else:
-                    if current_ties:
-                        ties_end = True
-            except:
-                if current_ties:
-                    ties_end = True
-            if len(current_ties) > 0 and ties_end:
-                if ties == 'notallowed':
-                    raise Exception('No ties allowed!')
-                current_ties.append(pos + 1)
-                if ties == 'midrank':
-                    ranks += [np.mean(current_ties)] * len(current_ties)
-                else:
-                    ranks += [min(current_ties)] * len(current_ties)
-                current_ties, ties_end = [], False
-            elif not current_ties:
-                ranks.append(pos + 1)
-    return [rank for i, rank in sorted(
-        zip([item_i[1] for item_i in data], ranks))]
+        sorted_values = np.take_along_axis(values, order, axis = -1)
+        starts = np.ones(values.shape, dtype = bool)
+        starts[..., 1:] = sorted_values[..., 1:] != sorted_values[..., :-1]
+        if ties == 'notallowed':
+            if not starts.all():
+                raise Exception('No ties allowed!')
+            sorted_ranks = positions
+        else:
+            first = np.maximum.accumulate(np.where(starts, positions, 0),
+                                          axis = -1)
+            if ties == 'same':
+                sorted_ranks = first
+            else:
+                ends = np.ones(values.shape, dtype = bool)
+                ends[..., :-1] = starts[..., 1:]
+                last = np.minimum.accumulate(
+                    np.where(ends, positions, n + 1)[..., ::-1], axis = -1)
+                sorted_ranks = (first + last[..., ::-1]) / 2
+    ranks = np.empty(values.shape, dtype = sorted_ranks.dtype)
+    np.put_along_axis(ranks, order, sorted_ranks, axis = -1)
+    return np.moveaxis(ranks, -1, axis)
 
 
 def used_midranks(ranks):
     """Given a set of rankings from 1, ..., len(ranks), returns True if the
-    midrank method was used to create the ranks.
+    midrank method was used to create the ranks. For a 2-D array, True if it was
+    used for every row.
     """
-    return sum(range(1, len(ranks) + 1)) == sum(ranks)
+    ranks = np.asarray(ranks)
+    n = ranks.shape[-1]
+    return bool(np.all(np.sum(ranks, axis = -1) == n * (n + 1) / 2))
 
 
 def sign(num):
     """Sign function - is a number positive, negative, or 0?
     """
-    return num and (1, -1)[num < 0]
+    return num and (1, -1)[bool(num < 0)]
 
 
 def choose(n, k):
@@ -103,6 +126,14 @@ def choose(n, k):
     return math.factorial(n) / (math.factorial(k) * math.factorial(n - k))
 
 
+def tied_pairs(counts):
+    """Number of tied pairs given the sizes of each group of tied values, the
+    sum of count choose 2 over the groups.
+    """
+    counts = np.asarray(counts, dtype = np.int64)
+    return int((counts * (counts - 1) // 2).sum())
+
+
 def odd(num):
     """True if a number if odd, False if even.
     """
@@ -117,6 +148,7 @@ def reciprocal_sum(start, end):
     return sum([1.0 / number for number in range(start, end + 1)])
 
 
+@instrumented
 def to_savage_scores(ranks):
     """Generate savage scores for a set of rankings. Ties will be assigned the
     mean of the savage scores for the rank positions that make up the tie. Ex.
@@ -124,36 +156,30 @@ def to_savage_scores(ranks):
     positions 2 and 3 will be assigned the mean of savage(2, 4) and savage(3,
     4).Ranks must be generated using the midrank method to handle ties.
 
+    The savage scores of every position come from one reverse cumulative sum of
+    the reciprocals 1/n, ..., 1/1. A group of t ties w/ midrank r covers the
+    positions r - (t - 1) / 2, ..., r + (t - 1) / 2, so its mean savage score is
+    a difference of the cumulative sums of those scores, and t is found by
+    counting the (doubled, so integer) midranks. This is all O(n).
+
     Parameters
     ----------
-    ranks : list
-        List of ranks (can be ints or floats)
+    ranks : list or array
+        List of ranks (can be ints or floats), or a 2-D array of ranks, where
+        each row is a set of rankings
 
     Returns
     -------
-    a list of savage scores corresponding to the inputted ranks
+    an array of savage scores corresponding to the inputted ranks
     """
     assert used_midranks(ranks), 'ranks not generated using the midrank method!'
-    ranks_positions = sorted([[rank, pos] for pos, rank in enumerate(ranks)])
-    savage_scores = []
-    current_ties, ties_end, num_ranks = [], False, len(ranks)
-    for pos, (rank, _) in enumerate(ranks_positions):
-        try:
-            if rank == ranks_positions[pos + 1][0]:
-                current_ties.append(pos + 1)
-            else:
-                if current_ties:
-                    ties_end = True
-        except:
-            if current_ties:
-                ties_end = True
-        if len(current_ties) > 0 and ties_end:
-            current_ties.append(pos + 1)
-            savage_scores += [np.mean(
-                [reciprocal_sum(x, num_ranks)
-                 for x in current_ties])] * len(current_ties)
-            current_ties, ties_end = [], False
-        elif not current_ties:
-            savage_scores.append(reciprocal_sum(pos + 1, num_ranks))
-    return [savage_score for pos, savage_score in sorted(
-        zip([rnk_pos[1] for rnk_pos in ranks_positions], savage_scores))]
+    ranks = np.asarray(ranks)
+    n = ranks.shape[-1]
+    scores = np.cumsum(1 / np.arange(n, 0, -1))[::-1]
+    cumulative_scores = np.concatenate([[0], np.cumsum(scores)])
+    rows = np.arange(ranks.size) // n if ranks.size else np.arange(0)
+    doubled = (2 * ranks).astype(np.int64).ravel() - 2 + rows * 2 * n
+    counts = np.bincount(doubled)[doubled].reshape(ranks.shape)
+    start = (ranks - (counts - 1) / 2).astype(np.int64)
+    return (cumulative_scores[start + counts - 1] -
+            cumulative_scores[start - 1]) / counts
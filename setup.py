@@ -9,7 +9,12 @@ setup(
     url = 'https://github.com/jakesherman/rankingscompare',
     author = 'Jake Sherman',
     author_email = 'jake@jakesherman.com',
+    packages = ['rankingscompare'],
+    python_requires = '>=3.7',
     install_requires = [
         'numpy',
     ],
+    entry_points = {
+        'console_scripts': ['rankingscompare = rankingscompare.__main__:main'],
+    },
     zip_safe = False)
@@ -1,9 +1,17 @@
 import functools
+import itertools
+import json
 import numpy as np
+import os
 import random
 import rankingscompare as rc
-from scipy.stats import kendalltau
+from scipy.stats import kendalltau, rankdata, spearmanr, weightedtau
+import shutil
+import subprocess
+import sys
+import tempfile
 import unittest
+import warnings
 
 
 def generate_test_case(max_length = 100, ties = False):
@@ -42,9 +50,9 @@ def test_rank_func(func1, func2, test_func, num_tests = 100):
     for test_case in [func() for func in [test_func] * num_tests]:
         func1val, func2val = func1(*test_case), func2(*test_case)
         if not approx_equal(func1val, func2val):
-            print 'Different values (func1, func2): {0} != {1}'.format(
-                func1val, func2val)
-            print '> Number of successes: {0}'.format(str(successes))
+            print('Different values (func1, func2): {0} != {1}'.format(
+                func1val, func2val))
+            print('> Number of successes: {0}'.format(str(successes)))
             return False
         successes += 1
     return True
@@ -56,6 +64,12 @@ def scipy_kendalltau(*args, **kwargs):
     return kendalltau(*args, **kwargs)[0]
 
 
+def scipy_spearmanr(*args, **kwargs):
+    """Return just the correlation, not a tuple of that and the p-value.
+    """
+    return spearmanr(*args, **kwargs)[0]
+
+
 def _spearman_rho(l1, l2, reverse = True):
     """Not for export, just using to validate the results of the spearman_rho
     function. _spearman_rho only works if all n ranks are distinct integers.
@@ -117,6 +131,983 @@ class TauTestCases(unittest.TestCase):
         self.assertTrue(test_rank_func(rc.tau_b, scipy_kendalltau,
             generate_test_case_ties))
 
+    # Long lists, where the product of the untied pairs overflows an int64
+    def test_tau_b_long(self):
+        l1, l2 = np.random.rand(200000), np.random.rand(200000)
+        expected = kendalltau(l1, l2)[0]
+        np.testing.assert_allclose(rc.tau_b(l1, l2), expected)
+        np.testing.assert_allclose(rc.compare_all(l1, l2).tau_b, expected)
+
+    # Knight's algorithm -------------------------------------------------------
+
+    # Same statistics as the O(n^2) pairwise loop, with and without ties
+    def test_knights_algorithm_same_stats(self):
+        for test_func in [generate_test_case, generate_test_case_ties]:
+            for _ in range(50):
+                l1, l2 = test_func()
+                self.assertEqual(rc.tau_stats(l1, l2, 'knight'),
+                                 rc.tau_stats(l1, l2, 'pairwise'))
+
+    # Joint ties are counted, and included in the ties of each list
+    def test_knights_algorithm_joint_ties(self):
+        self.assertEqual(rc.tau_stats([1, 1, 2, 2], [3, 3, 3, 4]),
+                         (6, 2, 0, 2, 3, 1, 2))
+
+    # Swaps made by a merge sort, equal values are not swapped
+    def test_count_swaps(self):
+        self.assertEqual(rc.count_swaps([2, 1, 1, 0, 2]), 5)
+        np.testing.assert_equal(
+            rc.count_swaps([[2, 1, 1, 0, 2], [0, 1, 1, 2, 2]]), [5, 0])
+
+    # Long enough to be merged in blocks, w/ a shorter block left over at the
+    # end of each pass
+    def test_count_swaps_long(self):
+        for codes in [np.random.choice(1000, (3, 1000)),
+                      np.random.choice(3, (3, 1000))]:
+            expected = [np.triu(row[:, None] > row[None, :]).sum()
+                        for row in codes]
+            np.testing.assert_equal(rc.count_swaps(codes), expected)
+
+    # Every tau-family statistic gives the same value with either backend
+    def test_same_values_both_backends(self):
+        l1, l2 = np.random.choice(10, 50), np.random.choice(10, 50)
+        for func in [rc.tau_b, rc.gamma, rc.sommers_d]:
+            np.testing.assert_equal(func(l1, l2, backend = 'knight'),
+                                    func(l1, l2, backend = 'pairwise'))
+
+    # Unsigned ints and bools are compared, not subtracted, by every backend
+    def test_unsigned_and_bool(self):
+        l1 = np.array([1, 2, 3], dtype = np.uint8)
+        for backend in ['auto', 'knight', 'pairwise']:
+            self.assertEqual(rc.tau_b(l1, l1[::-1], backend), -1.0)
+        l1, l2 = np.array([1, 0, 1, 0], dtype = bool), \
+            np.array([1, 1, 0, 0], dtype = bool)
+        self.assertEqual(rc.tau_stats(l1, l2, 'pairwise'),
+                         rc.tau_stats(l1, l2, 'knight'))
+
+    # AP correlation -----------------------------------------------------------
+
+    # Identical to a reversed list, should be 1 and -1
+    def test_ap_correlation_1(self):
+        self.assertTrue(rc.ap_correlation(self.a, self.a) == 1.0 and
+                        rc.ap_correlation(self.a, self.d) == -1.0)
+
+    # Same values as the O(n^2) loop, both directions and symmetric, with ties
+    def test_ap_correlation_same_values_both_backends(self):
+        for test_func in [generate_test_case, generate_test_case_ties]:
+            for _ in range(20):
+                l1, l2 = test_func()
+                for symmetric in [False, True]:
+                    np.testing.assert_equal(
+                        rc.ap_correlation(l1, l2, symmetric),
+                        rc.ap_correlation(l1, l2, symmetric,
+                                          backend = 'pairwise'))
+
+    # W/o ties, every random order gives the same value as ap_correlation
+    def test_ap_correlation_ties_no_ties(self):
+        l1, l2 = generate_test_case()
+        for symmetric in [False, True]:
+            np.testing.assert_allclose(
+                rc.ap_correlation_ties(l1, l2, 10, 5, symmetric = symmetric),
+                rc.ap_correlation(l1, l2, symmetric))
+
+    # Close to the mean over every order of the ties (0.23, and 0.0925 for the
+    # symmetric version), and the same w/ a pool of processes
+    def test_ap_correlation_ties(self):
+        l1, l2 = [3, 2, 2, 1, 1, 0], [2, 2, 1, 0, 3, 1]
+        for symmetric, expected in [(False, 0.23), (True, 0.0925)]:
+            sampled = rc.ap_correlation_ties(l1, l2, 5000, seed = 0,
+                                             symmetric = symmetric)
+            self.assertTrue(abs(sampled - expected) < 0.02)
+            self.assertEqual(
+                sampled, rc.ap_correlation_ties(l1, l2, 5000, seed = 0,
+                                                processes = 2,
+                                                symmetric = symmetric))
+
+    # Items ranked strictly above each item in both lists
+    def test_count_lower_left(self):
+        np.testing.assert_equal(rc.count_lower_left([2, 0, 2, 1, 3, 1]),
+                                [0, 0, 1, 1, 4, 1])
+        np.testing.assert_equal(
+            rc.count_lower_left([[2, 0, 2, 1, 3, 1], [0, 1, 2, 3, 4, 5]]),
+            [[0, 0, 1, 1, 4, 1], [0, 1, 2, 3, 4, 5]])
+
+    # weighted tau -------------------------------------------------------------
+
+    # Agreement w/ scipy's weightedtau function, w/ ties, both ways of weighing
+    def test_weighted_tau_scipy(self):
+        for _ in range(20):
+            l1, l2 = generate_test_case_ties()
+            for additive in [True, False]:
+                # -- w/ an absolute tolerance too, for values that are 0 up
+                # to rounding
+                np.testing.assert_allclose(
+                    rc.weighted_tau(l1, l2, additive = additive),
+                    weightedtau(l1, l2, additive = additive)[0],
+                    atol = 1e-12)
+                np.testing.assert_allclose(
+                    rc.weighted_tau(l1, l2, additive = additive,
+                                    symmetric = False),
+                    weightedtau(l1, l2, rank = None, additive = additive)[0],
+                    atol = 1e-12)
+
+    # Every rank weighing the same is tau-b
+    def test_weighted_tau_constant(self):
+        l1, l2 = generate_test_case_ties()
+        np.testing.assert_allclose(rc.weighted_tau(l1, l2, 'constant'),
+                                   rc.tau_b(l1, l2))
+        np.testing.assert_allclose(
+            rc.weighted_tau(l1, l2, lambda ranks: np.ones(len(ranks)), False),
+            rc.tau_b(l1, l2))
+
+    # compare_all --------------------------------------------------------------
+
+    # Same values as calling each function separately
+    def test_compare_all(self):
+        l1, l2 = np.random.choice(10, 50), np.random.choice(10, 50)
+        comparison = rc.compare_all(l1, l2)
+        for name, func in [('tau_a', rc.tau_a), ('tau_b', rc.tau_b),
+                           ('tau_c', rc.tau_c), ('gamma', rc.gamma),
+                           ('sommers_d', rc.sommers_d),
+                           ('spearman_rho', rc.spearman_rho),
+                           ('spearman_footrule', rc.spearman_footrule)]:
+            np.testing.assert_equal(getattr(comparison, name), func(l1, l2))
+        np.testing.assert_equal(comparison.sommers_d_l1,
+                                rc.sommers_d(l1, l2, 'l1'))
+
+    # Tied lists don't warn about tau-a and tau-c, and every field is a float
+    def test_compare_all_ties_floats(self):
+        l1, l2 = np.random.choice(5, 50), np.random.choice(5, 50)
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            comparison = rc.compare_all(l1, l2)
+        for value in comparison:
+            self.assertIs(type(value), float)
+
+    # contingency tables -------------------------------------------------------
+
+    # Exactly the statistics and values of the lists the table counts
+    def test_from_table(self):
+        for shape in [(1, 3), (3, 1), (4, 4), (5, 7)]:
+            table = np.random.choice(4, shape)
+            table[0, 0] += 2
+            rows, columns = np.nonzero(table)
+            l1 = np.repeat(rows, table[rows, columns])
+            l2 = np.repeat(columns, table[rows, columns])
+            self.assertEqual(rc.tau_stats_from_table(table),
+                             rc.tau_stats(l1, l2))
+            for from_table, func in [(rc.tau_b_from_table, rc.tau_b),
+                                     (rc.tau_c_from_table, rc.tau_c),
+                                     (rc.sommers_d_from_table, rc.sommers_d)]:
+                with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                    np.testing.assert_equal(from_table(table), func(l1, l2))
+        self.assertEqual(rc.gamma_from_table([[3, 1], [0, 2]]),
+                         rc.gamma([0, 0, 0, 0, 1, 1], [0, 0, 0, 1, 1, 1]))
+        self.assertRaises(AssertionError, rc.tau_stats_from_table,
+                          [[1, -1], [0, 2]])
+
+    # Tens of millions to billions of observations, w/ the pairs counted
+    # exactly: the concordant and discordant pairs are quadratic in the counts
+    def test_from_table_large(self):
+        table = np.random.choice(10, (5, 7)) + 1
+        stats = rc.tau_stats_from_table(table)
+        for scale in [10 ** 6, 10 ** 9]:
+            large = rc.tau_stats_from_table(table * scale)
+            self.assertEqual(large[1:3], (stats[1] * scale ** 2,
+                                          stats[2] * scale ** 2))
+            for from_table in [rc.tau_b_from_table, rc.tau_c_from_table,
+                               rc.gamma_from_table, rc.sommers_d_from_table]:
+                value = from_table(table * scale)
+                self.assertTrue(-1 <= value <= 1)
+        self.assertAlmostEqual(rc.gamma_from_table(table * 10 ** 6),
+                               rc.gamma_from_table(table))
+
+    # Agreement w/ scipy's tau-c
+    def test_tau_c(self):
+        l1, l2 = np.random.choice(4, 100), np.random.choice(6, 100)
+        np.testing.assert_allclose(rc.tau_c(l1, l2),
+                                   kendalltau(l1, l2, variant = 'c')[0])
+        self.assertEqual(rc.tau_c(self.a, self.d), -1.0)
+
+
+class UtilitiesTestCases(unittest.TestCase):
+    """Tests for the functions in utilities.py
+    """
+
+    # to_rank ------------------------------------------------------------------
+
+    # Small example of each ties method, in descending order
+    def test_to_rank_ties_methods(self):
+        values = [3, 1, 3, 2, 3]
+        np.testing.assert_equal(rc.to_rank(values), [2, 5, 2, 4, 2])
+        np.testing.assert_equal(rc.to_rank(values, 'same'), [1, 5, 1, 4, 1])
+        np.testing.assert_equal(rc.to_rank(values, 'arbitrary'),
+                                [3, 5, 2, 4, 1])
+        self.assertRaises(Exception, rc.to_rank, values, 'notallowed')
+
+    # Agreement w/ scipy's rankdata function, in ascending order
+    def test_to_rank_same_as_rankdata(self):
+        for _ in range(20):
+            values = generate_test_case_ties()[0]
+            np.testing.assert_equal(rc.to_rank(values, reverse = False),
+                                    rankdata(values))
+            np.testing.assert_equal(rc.to_rank(values, 'same', False),
+                                    rankdata(values, 'min'))
+
+    # Each row or column of a 2-D array is ranked on its own
+    def test_to_rank_axis(self):
+        values = np.random.choice(10, (6, 8))
+        np.testing.assert_equal(rc.to_rank(values),
+                                [rc.to_rank(row) for row in values])
+        np.testing.assert_equal(rc.to_rank(values, axis = 0),
+                                np.transpose([rc.to_rank(column)
+                                              for column in values.T]))
+
+    # to_savage_scores ---------------------------------------------------------
+
+    # Example from the docstring, and ties get the mean of their scores
+    def test_to_savage_scores(self):
+        np.testing.assert_allclose(
+            rc.to_savage_scores([1, 2.5, 2.5, 4]),
+            [25 / 12, (13 / 12 + 7 / 12) / 2, (13 / 12 + 7 / 12) / 2, 1 / 4])
+
+    # Each row of a 2-D array is scored on its own
+    def test_to_savage_scores_rows(self):
+        ranks = rc.to_rank(np.random.choice(5, (6, 9)))
+        np.testing.assert_allclose(rc.to_savage_scores(ranks),
+                                   [rc.to_savage_scores(row) for row in ranks])
+
+
+class SpearmanTestCases(unittest.TestCase):
+    """Tests for the functions in spearman.py
+    """
+
+    # Closed form w/o ties, same as Pearson's correlation on the ranks
+    def test_spearman_rho_tie_free(self):
+        l1, l2 = generate_test_case()
+        rho = rc.spearman_rho(l1, l2)
+        self.assertAlmostEqual(rc.spearman_rho(l1, l2, tie_free = True), rho)
+        self.assertAlmostEqual(
+            rc.spearman_rho(rc.RankedList(l1), rc.RankedList(l2)), rho)
+        self.assertAlmostEqual(rc.spearman_rho(l1, l2, dtype = np.float32),
+                               rho, places = 5)
+
+    # Agreement w/ scipy's spearmanr function, w/ ties
+    def test_same_spearman_rho_values(self):
+        self.assertTrue(test_rank_func(rc.spearman_rho, scipy_spearmanr,
+                                       generate_test_case_ties))
+
+    # Spearman's rho of each pair of rows of 2-D arrays
+    def test_spearman_rho_rows(self):
+        X, Y = np.random.choice(10, (5, 12)), np.random.choice(10, (5, 12))
+        np.testing.assert_allclose(
+            rc.spearman_rho(X, Y),
+            [rc.spearman_rho(x, y) for x, y in zip(X, Y)])
+
+    # Top-down correlation of each pair of rows of 2-D arrays
+    def test_top_down_correlation_rows(self):
+        X, Y = np.random.choice(10, (5, 12)), np.random.choice(10, (5, 12))
+        np.testing.assert_allclose(
+            rc.top_down_correlation(X, Y),
+            [rc.top_down_correlation(x, y) for x, y in zip(X, Y)])
+
+    # Identical lists, should be 1, reversed lists, negative
+    def test_top_down_correlation_1(self):
+        self.assertAlmostEqual(rc.top_down_correlation([1, 2, 3], [1, 2, 3]),
+                               1.0)
+        self.assertTrue(rc.top_down_correlation([1, 2, 3], [3, 2, 1]) < 0)
+
+
+class RboTestCases(unittest.TestCase):
+    """Tests for the functions in _rbo.py
+    """
+
+    a, b, c = ['a', 'b', 'c', 'd'], ['b', 'a', 'e', 'c'], ['e', 'f', 'g', 'h']
+
+    # average overlap ----------------------------------------------------------
+
+    # Same as rebuilding the two prefix sets at every depth
+    def test_average_overlap_same_as_prefix_sets(self):
+        for k in range(1, 5):
+            agreements = [len(set(self.a[:i]) & set(self.b[:i])) / i
+                          for i in range(1, k + 1)]
+            self.assertEqual(rc.average_overlap(self.a, self.b, k),
+                             np.mean(agreements))
+
+    # Overlap curve, w/ a shorter list
+    def test_average_overlap_curve(self):
+        ao, agreements = rc.average_overlap(self.a, ['b', 'e'], curve = True)
+        np.testing.assert_equal(agreements, [0, 1 / 2, 1 / 3, 1 / 4])
+        self.assertEqual(ao, np.mean(agreements))
+
+    # rbo ----------------------------------------------------------------------
+
+    # Identical lists, should be 1, disjoint lists, should be 0
+    def test_rbo_1(self):
+        self.assertAlmostEqual(rc.rbo(self.a, self.a), 1.0)
+        self.assertAlmostEqual(rc.rbo(self.a, self.a, measure = 'min') +
+                               rc.rbo(self.a, self.a, measure = 'res'), 1.0)
+        self.assertEqual(rc.rbo(self.a, self.c), 0.0)
+        self.assertEqual(rc.rbo(self.a, self.c, measure = 'min'), 0.0)
+
+    # RBO_min is RBO when none of the unseen items match
+    def test_rbo_min(self):
+        l1 = self.a + ['x' + str(i) for i in range(1000)]
+        l2 = self.b[:3] + ['y' + str(i) for i in range(1000)]
+        self.assertAlmostEqual(rc.rbo(self.a, self.b[:3], 0.8, 'min'),
+                               rc.rbo(l1, l2, 0.8, 'min'))
+
+    # The extrapolated RBO is within the bounds
+    def test_rbo_bounds(self):
+        for l2 in [self.b, self.b[:2], self.c[:3]]:
+            lower, upper = rc.rbo(self.a, l2, 0.9, 'bounds')
+            self.assertTrue(lower <= rc.rbo(self.a, l2, 0.9) <= upper)
+
+    # encoding -----------------------------------------------------------------
+
+    # Lists encoded by a Vocabulary give the same values as the items
+    def test_encoded_items(self):
+        vocabulary = rc.Vocabulary()
+        for _ in range(20):
+            items1, items2 = [['doc{0}'.format(i) for i in np.random.choice(
+                30, random.randint(1, 25))] for _ in range(2)]
+            codes1, codes2 = vocabulary.encode_batch([items1, items2])
+            self.assertEqual(vocabulary.decode(codes1), items1)
+            for func in [rc.percent_overlap, rc.overlap_at_depth,
+                         rc.average_overlap, rc.rbo, rc.conjoint]:
+                np.testing.assert_allclose(func(codes1, codes2),
+                                           func(items1, items2))
+
+    # Saved and loaded vocabularies keep their codes
+    def test_vocabulary_save_load(self):
+        vocabulary = rc.Vocabulary(['a', 'b', 'c'])
+        handle, path = tempfile.mkstemp()
+        try:
+            vocabulary.save(path)
+            loaded = rc.Vocabulary.load(path)
+        finally:
+            os.close(handle)
+            os.remove(path)
+        self.assertEqual(loaded.items, ['a', 'b', 'c'])
+        np.testing.assert_equal(loaded.encode(['c', 'd', 'a'], grow = False),
+                                [2, -1, 0])
+
+    # Different unknown items get different codes, and aren't in the overlap
+    def test_vocabulary_unknown_items(self):
+        vocabulary = rc.Vocabulary(['a', 'b'])
+        items1, items2 = ['a', 'x', 'b'], ['a', 'y', 'x']
+        codes1, codes2 = vocabulary.encode_batch([items1, items2],
+                                                 grow = False)
+        np.testing.assert_equal(codes1, [0, -1, 1])
+        np.testing.assert_equal(codes2, [0, -2, -1])
+        self.assertEqual(vocabulary.decode(codes2), ['a', None, None])
+        self.assertEqual(len(vocabulary), 2)
+        for func in [rc.percent_overlap, rc.overlap_at_depth, rc.conjoint]:
+            np.testing.assert_equal(func(codes1, codes2),
+                                    func(items1, items2))
+        self.assertEqual(rc.overlap_at_depth(codes1[1:], codes2[1:], 1), 0)
+
+
+class PairwiseTestCases(unittest.TestCase):
+    """Tests for the functions in _pairwise.py
+    """
+
+    rankings = np.random.choice(20, (7, 20))
+
+    # Same values as comparing each pair of rows one at a time
+    def assert_same_as_pairs(self, method, func, **kwargs):
+        matrix = rc.pairwise(self.rankings, method, tile_size = 3, **kwargs)
+        for i, j in itertools.product(range(len(self.rankings)), repeat = 2):
+            self.assertAlmostEqual(matrix[i, j],
+                                   func(self.rankings[i], self.rankings[j]))
+
+    def test_pairwise_spearman_rho(self):
+        self.assert_same_as_pairs('spearman_rho', rc.spearman_rho)
+
+    def test_pairwise_spearman_footrule(self):
+        self.assert_same_as_pairs('spearman_footrule', rc.spearman_footrule)
+
+    # Same values when the columns of each tile are summed a chunk at a time
+    def test_pairwise_footrule_chunks(self):
+        np.testing.assert_equal(
+            rc.pairwise(self.rankings, 'spearman_footrule', tile_size = 3),
+            rc.pairwise(self.rankings, 'spearman_footrule', tile_size = 2048))
+
+    def test_pairwise_tau_b(self):
+        self.assert_same_as_pairs('tau_b', rc.tau_b)
+
+    def test_pairwise_ap_correlation(self):
+        self.assert_same_as_pairs('ap_correlation', rc.ap_correlation)
+
+    # Same values when the tiles are spread across processes
+    def test_pairwise_processes(self):
+        np.testing.assert_equal(
+            rc.pairwise(self.rankings, 'tau_b', tile_size = 2),
+            rc.pairwise(self.rankings, 'tau_b', processes = 2, tile_size = 2))
+
+    # Same values as comparing each candidate to the reference one at a time,
+    # w/ and w/o ties in the reference, in either direction
+    def test_compare_to_reference(self):
+        funcs = {'spearman_rho': rc.spearman_rho, 'spearman_footrule':
+                 rc.spearman_footrule, 'tau_b': rc.tau_b, 'ap_correlation':
+                 rc.ap_correlation}
+        for reference in [self.rankings[0], np.random.permutation(20)]:
+            for method, func in funcs.items():
+                for reverse in [True, False]:
+                    values = rc.compare_to_reference(
+                        reference, self.rankings, method, reverse = reverse)
+                    for candidate, value in zip(self.rankings, values):
+                        kwargs = {} if method == 'tau_b' else \
+                            {'reverse': reverse}
+                        self.assertAlmostEqual(
+                            value, func(candidate, reference, **kwargs))
+
+
+class RankedListTestCases(unittest.TestCase):
+    """Tests for the RankedList in rankedlist.py
+    """
+
+    values = [3, 1, 3, 2, 3, 5]
+
+    # Cached ranks, order and tie groups agree w/ to_rank
+    def test_ranked_list_ranks(self):
+        for reverse in [True, False]:
+            ranked_list = rc.RankedList(self.values, reverse)
+            np.testing.assert_equal(ranked_list.ranks,
+                                    rc.to_rank(self.values, reverse = reverse))
+            np.testing.assert_equal(
+                ranked_list.order,
+                np.argsort(rc.to_rank(self.values, 'arbitrary', reverse)))
+            self.assertTrue(ranked_list.has_ties)
+        np.testing.assert_equal(ranked_list.tie_counts, [1, 1, 3, 1])
+        np.testing.assert_equal(ranked_list.tie_starts, [0, 1, 2, 5])
+
+    # Can't be changed
+    def test_ranked_list_immutable(self):
+        ranked_list = rc.RankedList(self.values)
+        self.assertRaises(AttributeError, setattr, ranked_list, 'reverse', 1)
+        self.assertRaises(ValueError, ranked_list.ranks.__setitem__, 0, 1)
+
+    # Converts to an array w/ numpy's copy semantics, w/o changing the values
+    def test_ranked_list_array(self):
+        ranked_list = rc.RankedList(self.values)
+        copied = np.array(ranked_list, copy = True)
+        copied[0] = 10
+        np.testing.assert_equal(np.asarray(ranked_list), self.values)
+        self.assertTrue(np.shares_memory(np.asarray(ranked_list),
+                                         np.asarray(ranked_list)))
+        np.testing.assert_equal(np.asarray(ranked_list, dtype = float),
+                                self.values)
+        self.assertRaises(ValueError, np.array, ranked_list, dtype = float,
+                          copy = False)
+
+    # Every measure gives the same value for a RankedList as for the values
+    def test_ranked_list_measures(self):
+        l1, l2 = np.random.choice(10, 50), np.random.choice(10, 50)
+        r1, r2 = rc.RankedList(l1), rc.RankedList(l2)
+        for func in [rc.tau_a, rc.tau_b, rc.gamma, rc.sommers_d,
+                     rc.ap_correlation, rc.spearman_rho, rc.spearman_footrule,
+                     rc.top_down_correlation]:
+            np.testing.assert_allclose(func(r1, r2), func(l1, l2))
+            np.testing.assert_allclose(func(r1, l2), func(l1, l2))
+
+
+class TopkTestCases(unittest.TestCase):
+    """Tests for the top-k list distances in topk.py
+    """
+
+    # Identical lists are 0 apart, disjoint lists disagree on every pair
+    def test_topk_identical_disjoint(self):
+        self.assertEqual(rc.kendall_topk(['a', 'b', 'c'], ['a', 'b', 'c']), 0)
+        self.assertEqual(rc.footrule_topk(['a', 'b', 'c'], ['a', 'b', 'c']), 0)
+        self.assertEqual(rc.kendall_topk(['a', 'b'], ['c', 'd'], 0.5), 5)
+        self.assertEqual(rc.footrule_topk(['a', 'b'], ['c', 'd']), 6)
+
+    # Each of Fagin et al.'s cases: a and c are swapped, b is missing from l2
+    # but ahead of c in l1, b and d are only in l1 and e is only in l2
+    def test_kendall_topk_cases(self):
+        l1, l2 = ['a', 'b', 'c', 'd'], ['c', 'a', 'e']
+        self.assertEqual(rc.kendall_topk(l1, l2, 0), 1 + 1 + 2)
+        self.assertEqual(rc.kendall_topk(l1, l2, 1), 1 + 1 + 2 + 1)
+        self.assertEqual(rc.footrule_topk(l1, l2, 5),
+                         1 + 3 + 2 + 1 + 2)
+
+    # A batch gives the same values as each pair on its own
+    def test_topk_batch(self):
+        lists1 = [random.sample(range(20), 6) for _ in range(10)]
+        lists2 = [random.sample(range(20), 6) for _ in range(10)]
+        np.testing.assert_equal(
+            rc.batch_kendall_topk(lists1, lists2, 0.3),
+            [rc.kendall_topk(l1, l2, 0.3) for l1, l2 in zip(lists1, lists2)])
+        np.testing.assert_equal(
+            rc.batch_footrule_topk(lists1, lists2),
+            [rc.footrule_topk(l1, l2) for l1, l2 in zip(lists1, lists2)])
+
+
+class BatchTestCases(unittest.TestCase):
+    """Tests for scoring batches of pairs of lists of different lengths, in
+    batch.py
+    """
+
+    def setUp(self):
+        lengths = np.random.randint(0, 12, 200)
+        self.offsets = np.concatenate([[0], np.cumsum(lengths)])
+        self.x = np.random.choice(5, self.offsets[-1])
+        self.y = np.random.rand(self.offsets[-1]).round(1)
+        self.pairs = [(self.x[start:stop], self.y[start:stop]) for start, stop
+                      in zip(self.offsets[:-1], self.offsets[1:])]
+
+    # The same statistics as tau_stats on each pair, w/ either backend
+    def test_ragged_tau_stats(self):
+        for backend in ['tensor', 'knight']:
+            stats = rc.ragged_tau_stats(self.x, self.y, self.offsets,
+                                        backend = backend)
+            for i, (l1, l2) in enumerate(self.pairs):
+                if len(l1):
+                    self.assertEqual(tuple(stat[i] for stat in stats),
+                                     rc.tau_stats(l1, l2))
+
+    # Same values as each pair one at a time, NaN for fewer than 2 values
+    def test_ragged_measures(self):
+        for ragged, func in [(rc.ragged_tau_b, rc.tau_b),
+                             (rc.ragged_spearman_rho, rc.spearman_rho),
+                             (rc.ragged_spearman_footrule,
+                              rc.spearman_footrule)]:
+            values = ragged(self.x, self.y, self.offsets)
+            for value, (l1, l2) in zip(values, self.pairs):
+                if len(l1) < 2:
+                    self.assertTrue(np.isnan(value) or value == 0)
+                else:
+                    np.testing.assert_allclose(value, func(l1, l2))
+
+    # Padded rows w/ their lengths give the same values as offsets
+    def test_ragged_padded(self):
+        lengths = np.diff(self.offsets)
+        X, Y = np.zeros((2, len(lengths), lengths.max()))
+        for i, (l1, l2) in enumerate(self.pairs):
+            X[i, :len(l1)], Y[i, :len(l2)] = l1, l2
+        for ragged in [rc.ragged_gamma, rc.ragged_sommers_d,
+                       rc.ragged_spearman_rho]:
+            np.testing.assert_allclose(
+                ragged(X, Y, lengths = lengths),
+                ragged(self.x, self.y, self.offsets, backend = 'auto'))
+
+
+class ResamplingTestCases(unittest.TestCase):
+    """Tests for the permutation tests and bootstrap in resampling.py
+    """
+
+    l1, l2 = np.random.choice(30, 60), np.random.choice(30, 60)
+
+    # The batch kernels give the same resamples as calling each function
+    def test_batch_statistics(self):
+        for metric, func in [('tau_b', rc.tau_b), ('gamma', rc.gamma),
+                             ('sommers_d', rc.sommers_d),
+                             ('spearman_rho', rc.spearman_rho),
+                             ('spearman_footrule', rc.spearman_footrule)]:
+            np.testing.assert_allclose(
+                rc.permutation_test(metric, self.l1, self.l2, 200, seed = 0),
+                rc.permutation_test(func, self.l1, self.l2, 200, seed = 0))
+            np.testing.assert_allclose(
+                rc.bootstrap_ci(metric, self.l1, self.l2, 200, seed = 0),
+                rc.bootstrap_ci(func, self.l1, self.l2, 200, seed = 0))
+
+    # Lists w/o ties are shuffled already sorted by the first list, w/ the
+    # same resamples as calling the function
+    def test_batch_statistics_no_ties(self):
+        l1, l2 = np.random.permutation(60), np.random.permutation(60)
+        np.testing.assert_allclose(
+            rc.permutation_test('tau_b', l1, l2, 200, seed = 0),
+            rc.permutation_test(rc.tau_b, l1, l2, 200, seed = 0))
+
+    # Strongly associated lists are significant, and the interval is around
+    # the observed value
+    def test_permutation_test_bootstrap_ci(self):
+        l2 = self.l1 + np.random.choice(10, 60)
+        observed, p_value = rc.permutation_test('tau_b', self.l1, l2, 999,
+                                                'greater')
+        self.assertEqual(observed, rc.tau_b(self.l1, l2))
+        self.assertEqual(p_value, 0.001)
+        low, high = rc.bootstrap_ci('tau_b', self.l1, l2, 999)
+        self.assertTrue(low < observed < high)
+
+    # Same resamples w/ a pool of processes
+    def test_resampling_processes(self):
+        self.assertEqual(
+            rc.permutation_test('tau_b', self.l1, self.l2, 300, seed = 1),
+            rc.permutation_test('tau_b', self.l1, self.l2, 300, seed = 1,
+                                processes = 2))
+
+
+class RollingTestCases(unittest.TestCase):
+    """Tests for the sliding window measures in rolling.py
+    """
+
+    # Every window's statistics match tau_stats on that window alone
+    def test_rolling_tau_stats(self):
+        x, y = np.random.choice(20, 200), np.random.choice(20, 200)
+        for window in [2, 7, 50, 200]:
+            stats = rc.rolling_tau_stats(x, y, window)
+            self.assertEqual(len(stats), len(x) - window + 1)
+            for start, window_stats in enumerate(stats):
+                self.assertEqual(window_stats, rc.tau_stats(
+                    x[start:start + window], y[start:start + window]))
+
+    # Windows longer than the nodes compared pairwise, w/ and w/o ties
+    def test_rolling_tau_stats_long(self):
+        for x, y in [(np.random.rand(700), np.random.rand(700)),
+                     (np.random.choice(5, 700), np.random.choice(40, 700))]:
+            for window in [64, 129, 500]:
+                stats = rc.rolling_tau_stats(x, y, window)
+                for start in [0, 1, 100, len(x) - window]:
+                    self.assertEqual(stats[start], rc.tau_stats(
+                        x[start:start + window], y[start:start + window]))
+
+    # Rolling tau-b and Spearman's rho match each window's tau_b, spearman_rho
+    def test_rolling_correlations(self):
+        x, y = np.random.choice(30, 120), np.random.rand(120)
+        window = 25
+        windows = [(x[i:i + window], y[i:i + window])
+                   for i in range(len(x) - window + 1)]
+        np.testing.assert_allclose(rc.rolling_tau_b(x, y, window),
+                                   [rc.tau_b(*pair) for pair in windows])
+        np.testing.assert_allclose(
+            rc.rolling_spearman_rho(x, y, window, chunk_size = 100),
+            [rc.spearman_rho(*pair) for pair in windows])
+
+
+class InstrumentationTestCases(unittest.TestCase):
+    """Tests for the opt-in call records in instrumentation.py
+    """
+
+    # Nothing is recorded unless instrumentation is turned on
+    def test_disabled(self):
+        rc.instrumentation.reset()
+        if not rc.instrumentation.enabled():
+            rc.tau_b([1, 2, 3], [3, 1, 2])
+            self.assertEqual(rc.instrumentation.snapshot(), {})
+
+    # Calls, sizes and backends are recorded for measures and their kernels
+    def test_records(self):
+        l1, l2 = np.random.rand(100), np.random.rand(100)
+        with rc.instrument() as snapshot:
+            rc.tau_b(l1, l2)
+            rc.tau_b(l1[:10], l2[:10], backend = 'pairwise')
+            rc.spearman_rho(l1, l2)
+        records = snapshot()
+        self.assertEqual(records['tau_b']['calls'], 2)
+        self.assertEqual(records['tau_b']['items'], 110)
+        self.assertEqual(records['tau_b']['max_size'], 100)
+        self.assertEqual(records['tau_stats']['backends'],
+                         {'knight': 1, 'pairwise': 1})
+        self.assertEqual(records['knights_algorithm']['calls'], 1)
+        self.assertEqual(records['spearman_rho']['backends'], {'pearson': 1})
+        self.assertTrue(records['tau_b']['seconds'] >=
+                        records['tau_stats']['seconds'] > 0)
+
+    # The hook sees every recorded call, and profile runs cProfile around them
+    def test_hook_and_profile(self):
+        calls = []
+        rc.instrumentation.set_hook(lambda *call: calls.append(call))
+        try:
+            with rc.instrumentation.profile() as profiler:
+                rc.rbo([1, 2, 3], [2, 3, 4])
+        finally:
+            rc.instrumentation.set_hook(None)
+        self.assertEqual([call[0] for call in calls],
+                         ['overlap_at_depth', 'rbo'])
+        profiler.create_stats()
+        self.assertTrue(any(function == 'rbo'
+                            for _, _, function in profiler.stats))
+
+
+class BackendsTestCases(unittest.TestCase):
+    """Tests for choosing backends automatically, in backends.py
+    """
+
+    def setUp(self):
+        self.thresholds = rc.get_thresholds()
+
+    def tearDown(self):
+        rc.set_thresholds(self.thresholds)
+
+    # The fast backend is chosen from the threshold for the type of input on
+    def test_choose_backend(self):
+        rc.set_thresholds({'tau_stats': {'list': 10, 'array': 5}})
+        self.assertEqual(rc.choose_backend('tau_stats', [0] * 9), 'pairwise')
+        self.assertEqual(rc.choose_backend('tau_stats', list(range(10))),
+                         'knight')
+        self.assertEqual(rc.choose_backend('tau_stats', np.arange(5)),
+                         'knight')
+        self.assertEqual(rc.choose_backend('overlap_at_depth', [1], 10 ** 6),
+                         'numpy')
+
+    # auto gives the same values as the explicit backends, on either side
+    def test_auto_same_values(self):
+        rc.set_thresholds({'tau_stats': {'list': 20, 'array': 20},
+                           'ap_correlation': {'list': 20, 'array': 20},
+                           'overlap_at_depth': {'list': 20, 'array': 20}})
+        for n in [10, 30]:
+            l1, l2 = list(np.random.choice(8, n)), list(np.random.rand(n))
+            self.assertAlmostEqual(rc.tau_b(l1, l2),
+                                   rc.tau_b(l1, l2, backend = 'pairwise'))
+            self.assertAlmostEqual(rc.ap_correlation(l1, l2),
+                                   rc.ap_correlation(l1, l2,
+                                                     backend = 'pairwise'))
+            items1 = list(np.random.permutation(2 * n)[:n])
+            items2 = list(np.random.permutation(2 * n)[:n])
+            for items in [(items1, items2), ([str(i) for i in items1],
+                                             [str(i) for i in items2])]:
+                self.assertEqual(
+                    rc.rbo(*items), rc.rbo(*items, backend = 'python'))
+        self.assertRaises(AssertionError, rc.overlap_at_depth, ['a'], ['b'],
+                          backend = 'numpy')
+
+    # Calibrated thresholds are saved, and loaded back
+    def test_calibrate(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'thresholds.json')
+            calibrated = rc.calibrate(sizes = [2, 4, 8], path = path)
+            self.assertEqual(rc.get_thresholds(), calibrated)
+            self.assertTrue(all(threshold in [2, 4, 8, 16]
+                                for by_kind in calibrated.values()
+                                for threshold in by_kind.values()))
+            rc.set_thresholds({'tau_stats': {'list': 1000}})
+            self.assertEqual(rc.load_thresholds(path), calibrated)
+
+
+
+class StoreTestCases(unittest.TestCase):
+    """Tests for scoring memory mapped stores of rankings, in store.py
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.paths = [os.path.join(self.directory, name)
+                      for name in ['a.npy', 'b.npy', 'scores.npy']]
+        self.A = np.random.choice(10, (300, 20))
+        self.B = np.random.rand(300, 20)
+        np.save(self.paths[0], self.A)
+        np.save(self.paths[1], self.B)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    # Every row is scored the same as by the measure on its own
+    def test_score_stores(self):
+        for metric in ['tau_b', 'spearman_rho', 'spearman_footrule']:
+            scores = rc.score_stores(*self.paths, metric = metric,
+                                     chunk_size = 64)
+            np.testing.assert_allclose(
+                scores, [getattr(rc, metric)(a, b)
+                         for a, b in zip(self.A, self.B)])
+        self.assertFalse(os.path.exists(self.paths[2] + '.progress'))
+
+    # An interrupted run resumes from the chunk it stopped at
+    def test_resume(self):
+        scored = []
+
+        def interrupted(x, y):
+            assert len(scored) < 150, 'interrupted'
+            scored.append(1)
+            return rc.tau_b(x, y)
+
+        self.assertRaises(AssertionError, rc.score_stores, *self.paths,
+                          metric = interrupted, chunk_size = 64)
+        with open(self.paths[2] + '.progress') as f:
+            self.assertEqual(f.read(), '128')
+        scores = rc.score_stores(*self.paths, metric = rc.tau_b,
+                                 chunk_size = 64)
+        self.assertEqual(len(scored), 150)
+        np.testing.assert_allclose(
+            scores, [rc.tau_b(a, b) for a, b in zip(self.A, self.B)])
+
+    # Or w/ a different chunk size, w/o skipping or scoring rows again
+    def test_resume_chunk_size(self):
+        scored = []
+
+        def counted(x, y):
+            scored.append(1)
+            return rc.tau_b(x, y)
+
+        def interrupted(x, y):
+            assert len(scored) < 100, 'interrupted'
+            return counted(x, y)
+
+        self.assertRaises(AssertionError, rc.score_stores, *self.paths,
+                          metric = interrupted, chunk_size = 50)
+        scores = rc.score_stores(*self.paths, metric = counted,
+                                 chunk_size = 64)
+        self.assertEqual(len(scored), 300)
+        np.testing.assert_allclose(
+            scores, [rc.tau_b(a, b) for a, b in zip(self.A, self.B)])
+
+
+class ExternalTestCases(unittest.TestCase):
+    """Tests for Knight's algorithm w/ an external merge sort, in external.py
+    """
+
+    # Same statistics as the in-memory Knight's algorithm, however many runs
+    # and blocks the memory ceiling cuts the lists into
+    def test_external_tau_stats(self):
+        for n, distinct in [(1, 1), (2, 2), (50, 3), (1000, 20), (1000, 1000)]:
+            x, y = np.random.rand(n).round(2), np.random.choice(distinct, n)
+            for memory in [1000, 5000, 2 ** 20]:
+                self.assertEqual(rc.external_tau_stats(x, y, memory),
+                                 rc.knights_algorithm(x, y))
+
+    # .npy files are read as memory maps, w/ the same result as tau_stats
+    def test_external_files(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        x, y = np.random.choice(30, 500), np.random.rand(500)
+        np.save(os.path.join(directory, 'x.npy'), x)
+        np.save(os.path.join(directory, 'y.npy'), y)
+        self.assertEqual(rc.external_tau_stats(
+            os.path.join(directory, 'x.npy'), os.path.join(directory, 'y.npy'),
+            memory = 5000, directory = directory), rc.tau_stats(x, y))
+        self.assertEqual(sorted(os.listdir(directory)), ['x.npy', 'y.npy'])
+        self.assertEqual(rc.tau_b(x, y, backend = 'external'), rc.tau_b(x, y))
+
+    # Python ints, like the other backends, so long lists don't overflow
+    def test_external_long(self):
+        x, y = np.random.rand(200000), np.random.choice(1000, 200000)
+        stats = rc.external_tau_stats(x, y, memory = 2 ** 22)
+        self.assertEqual(stats, rc.knights_algorithm(x, y))
+        self.assertTrue(all(type(stat) is int for stat in stats))
+        np.testing.assert_allclose(rc.tau_b(x, y, backend = 'external'),
+                                   kendalltau(x, y)[0])
+
+    # Integers that float64s would round are refused rather than merged
+    def test_external_large_integers(self):
+        self.assertRaises(AssertionError, rc.external_tau_stats,
+                          np.array([2 ** 53 + 1, 2 ** 53]), np.array([0, 1]))
+        self.assertEqual(rc.external_tau_stats(np.array([2 ** 53, 0]),
+                                               np.array([0, 1]))[2], 1)
+
+
+class PipelineTestCases(unittest.TestCase):
+    """Tests for the streaming evaluation of pairs of lists, in pipeline.py
+    """
+
+    def setUp(self):
+        items = ['doc{0}'.format(i) for i in range(30)]
+        self.records = [{'query': i, 'list1': random.sample(items, 10),
+                         'list2': random.sample(items, 8)} for i in range(50)]
+
+    # The same scores as the measures themselves, in the order of the input,
+    # inline or from a pool w/ a bound on the batches in flight
+    def test_evaluate(self):
+        measures = ['rbo', 'kendall_topk', 'footrule_topk']
+        for processes, max_in_flight in [(1, None), (2, 1), (2, 3)]:
+            results = list(rc.evaluate(iter(self.records), measures,
+                                       batch_size = 7, processes = processes,
+                                       max_in_flight = max_in_flight))
+            self.assertEqual([result['query'] for result in results],
+                             list(range(50)))
+            for record, result in zip(self.records, results):
+                self.assertEqual(sorted(result), ['footrule_topk',
+                                                  'kendall_topk', 'query',
+                                                  'rbo'])
+                self.assertAlmostEqual(result['rbo'], rc.rbo(
+                    record['list1'], record['list2']))
+                self.assertEqual(result['kendall_topk'], rc.kendall_topk(
+                    record['list1'], record['list2']))
+
+    # The correlations are of the ranks of the shared items, NaN if there are
+    # fewer than two
+    def test_correlations(self):
+        result = next(rc.evaluate([{'list1': ['a', 'b', 'x', 'c'],
+                                    'list2': ['c', 'y', 'b', 'a']}],
+                                  ['tau_b', 'spearman_rho']))
+        self.assertEqual(result, {'tau_b': -1.0, 'spearman_rho': -1.0})
+        result = next(rc.evaluate([{'list1': ['a'], 'list2': ['a', 'b']}],
+                                  ['tau_b']))
+        self.assertTrue(np.isnan(result['tau_b']))
+
+    # A record w/ an item listed twice gets NaN scores, and the rest of the
+    # stream is still scored
+    def test_duplicate_items(self):
+        results = list(rc.evaluate([{'list1': ['a', 'b', 'a'],
+                                     'list2': ['a', 'b']},
+                                    {'list1': ['a', 'b'], 'list2': ['a', 'b']}],
+                                   ['rbo', 'tau_b']))
+        self.assertTrue(np.isnan(results[0]['rbo']) and
+                        np.isnan(results[0]['tau_b']))
+        self.assertEqual(results[1], {'rbo': 1.0, 'tau_b': 1.0})
+
+    # CSV in, JSONL out w/ NaN as null, through the command line
+    def test_command_line(self):
+        from rankingscompare.__main__ import main
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        input, output = os.path.join(directory, 'pairs.csv'), \
+            os.path.join(directory, 'results.jsonl')
+        with open(input, 'w') as f:
+            f.write('query,ranking,judged\nq1,a b c,c b a\nq2,a,b\n')
+        self.assertEqual(main(['evaluate', input, output, '--measures', 'rbo',
+                               'tau_b', '--list1', 'ranking', '--list2',
+                               'judged']), 0)
+        with open(output) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(lines[0]['query'], 'q1')
+        self.assertEqual(lines[0]['tau_b'], -1.0)
+        self.assertEqual(lines[1], {'query': 'q2', 'rbo': 0.0, 'tau_b': None})
+
+    # JSONL in, CSV out, w/ records whose other fields differ
+    def test_csv_different_fields(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        input, output = os.path.join(directory, 'pairs.jsonl'), \
+            os.path.join(directory, 'results.csv')
+        with open(input, 'w') as f:
+            f.write('{"query": "q1", "list1": ["a"], "list2": ["a"]}\n'
+                    '{"user": "u2", "list1": ["a"], "list2": ["b"]}\n')
+        rc.run_pipeline(input, output, ['percent_overlap'], processes = 1)
+        with open(output) as f:
+            self.assertEqual(f.read(), 'query,percent_overlap,user\n'
+                             'q1,1.0,\n,0.0,u2\n')
+
+
+class PackageTestCases(unittest.TestCase):
+    """Tests for loading the package lazily, in __init__.py
+    """
+
+    # Importing the package doesn't import numpy, or any of its submodules
+    def test_lazy_import(self):
+        code = ('import sys, rankingscompare; print(sorted(module for module '
+                'in sys.modules if module.split(".")[0] in '
+                '["numpy", "rankingscompare"]))')
+        output = subprocess.check_output(
+            [sys.executable, '-c', code], universal_newlines = True,
+            cwd = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               '..'))
+        self.assertEqual(output.strip(), "['rankingscompare']")
+
+    # Every public name loads, and functions aren't shadowed by their modules
+    def test_public_names(self):
+        for name in rc.__all__:
+            self.assertFalse(getattr(rc, name) is None)
+        self.assertTrue(callable(rc.rbo) and callable(rc.pairwise) and
+                        callable(rc.calibrate))
+        self.assertTrue(rc.instrumentation.enabled() in [False, True])
+        self.assertRaises(AttributeError, getattr, rc, 'not_a_measure')
+
+    # Or when their submodules are imported first, ex. by another submodule,
+    # and the submodules are still modules
+    def test_import_then_call(self):
+        code = ('import types, rankingscompare as rc; '
+                'from rankingscompare import pipeline; '
+                'import rankingscompare._rbo as module; '
+                'print(rc.rbo([1, 2, 3], [1, 2, 3]), callable(rc.pairwise), '
+                'callable(rc.calibrate), isinstance(module, types.ModuleType), '
+                'callable(module.overlap_at_depth))')
+        output = subprocess.check_output(
+            [sys.executable, '-c', code], universal_newlines = True,
+            cwd = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               '..'))
+        self.assertEqual(output.strip(), '1.0 True True True True')
+
 
 if __name__ == '__main__':
     unittest.main()